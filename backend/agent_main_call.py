@@ -5,7 +5,7 @@ import os
 import pathlib
 import sys
 import argparse
-from typing import List
+from typing import List, Optional, Callable, Any
 from crewai import Crew, Task
 
 # Setup path resolution
@@ -22,9 +22,11 @@ from backend.utils.agent_tools import (
     generate_sector_map, compute_statistics,
     forecast_prices
 )
+from backend.utils.artifact_store import get_artifact_store, current_run_id
+from backend.utils.fast_pipeline import run_fast_pipeline
 
 
-def create_crew(tickers: List[str], usr_pov: str) -> Crew:
+def create_crew(tickers: List[str], usr_pov: str, task_callback: Optional[Callable] = None) -> Crew:
     research_agent = ResearchAgent()
     processor_agent = DataProcessorAgent()
     recommendor = LLMRecommendationAgent()
@@ -95,21 +97,37 @@ def create_crew(tickers: List[str], usr_pov: str) -> Crew:
             collect_task, research_task, fetching_task,
             process_task, forecast_task, recommend_task
         ],
-        verbose=True
+        verbose=True,
+        task_callback=task_callback
     )
 
 
-def run_crew(tickers: List[str], usr_pov: str):
+def run_crew(tickers: List[str], usr_pov: str, on_task: Optional[Callable[[int, int, Any], None]] = None,
+             fast: bool = False):
+    """
+    Run the crew and save its result as the crew_result.json artifact of
+    the current run. `on_task(done, total, output)` is called after each
+    task finishes. With fast=True the tools are called directly in
+    dependency order and the LLM only writes the recommendations
+    (backend/utils/fast_pipeline.py); `output` is then the stage name.
+    """
+    if fast:
+        return run_fast_pipeline(tickers, usr_pov, on_stage=on_task)
+
     print("🚀 Running Crew pipeline...")
-    crew = create_crew(tickers, usr_pov)
+    task_callback = None
+    if on_task:
+        finished = []
+
+        def task_callback(output):
+            finished.append(output)
+            on_task(len(finished), len(crew.tasks), output)
+
+    crew = create_crew(tickers, usr_pov, task_callback)
     result = crew.kickoff(inputs={"tickers": tickers, "user_pov": usr_pov})
     print("✅ Crew execution finished.")
 
     # Save result
-    output_dir = "../backend/outputs"
-    os.makedirs(output_dir, exist_ok=True)
-    output_file = os.path.join(output_dir, "crew_result.json")
-
     try:
         result_str = str(result)
         json_start = result_str.find("```json") + 7
@@ -117,14 +135,12 @@ def run_crew(tickers: List[str], usr_pov: str):
         json_content = result_str[json_start:json_end].strip()
         result_dict = json.loads(json_content)
 
-        with open(output_file, "w") as f:
-            json.dump(result_dict, f, indent=2)
+        get_artifact_store().put_json("crew_result.json", result_dict, indent=2)
 
-        print(f"📁 Crew result saved to {output_file}")
+        print(f"📁 Crew result saved to run '{current_run_id()}'")
     except Exception as e:
         print("❌ Failed to save crew result:", str(e))
-        with open(output_file, "w") as f:
-            f.write(str(result))  # Fallback to raw string
+        get_artifact_store().put_bytes("crew_result.json", str(result).encode())  # Fallback to raw string
 
     return result
 
@@ -133,17 +149,12 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--symbols", type=str, required=True)
     parser.add_argument("--user_pov", type=str, required=True)
+    parser.add_argument("--fast", action="store_true",
+                        help="Call the tools directly instead of through the crew; the LLM only writes the recommendations")
     args = parser.parse_args()
 
     tickers = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
-    research, analysis, recs = run_crew(tickers, args.user_pov)
-    out = {
-        "research":        research,
-        "analysis":        analysis,
-        "recommendations": recs,
-    }
-    out_path = pathlib.Path("backend/outputs/crew_result.json")
-    out_path.parent.mkdir(parents=True, exist_ok=True)
-    out_path.write_text(json.dumps(out, indent=2))
+    # run_crew saves the result as the crew_result.json artifact of the current run
+    run_crew(tickers, args.user_pov, fast=args.fast)
 
 
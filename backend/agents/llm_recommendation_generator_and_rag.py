@@ -1,27 +1,29 @@
 import os
-import yfinance as yf
-import google.generativeai as genai
 from crewai import LLM, Agent
 from dotenv import load_dotenv
-from langchain_community.embeddings import HuggingFaceEmbeddings
-import duckdb
 import pandas as pd
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Callable
 from pydantic import ConfigDict
 
+from backend.utils.sector_index import get_sector_index
+from backend.utils import duckdb_store
+from backend.utils.llm_engine import GenerationEngine
+from backend.utils.llm_cache import get_response_cache
+from backend.utils.company_metadata import get_metadata_service
+from backend.utils.price_rag import get_price_index
+from backend.utils.artifact_store import load_artifact
+
 # Load API key from environment
 load_dotenv()
 api_key = os.getenv("GEMINI_API_KEY")
 
-duckdb_file = "../backend/input/stock_data.db"
-
-gemini_pro = "gemini/gemini-1.5-pro"  # has 15 requests limit per day
-gemini_flash = "gemini/gemini-2.0-flash"  # has 1500 requests limit per day
+gemini_pro = "gemini/gemini-1.5-pro"  # has 15 requests limit per day (2 per minute)
+gemini_flash = "gemini/gemini-2.0-flash"  # has 1500 requests limit per day (15 per minute)
+# Company metadata the prompt uses; only these decide when it is refreshed
+COMPANY_FIELDS = ["company_name", "sector", "industry", "market_cap", "pe_ratio", "52_week_low", "52_week_high"]
 
 
 class LLMRecommendationAgent(Agent):
-    duckdb_con: Optional[duckdb.DuckDBPyConnection] = None
-
     # Pydantic V2 model config
     model_config = ConfigDict(
         arbitrary_types_allowed=True,
@@ -38,88 +40,98 @@ class LLMRecommendationAgent(Agent):
             ),
             llm=LLM(model=gemini_flash, api_key=api_key),
         )
-        self._initialize_duckdb()
 
-    def _initialize_duckdb(self):
-        """Connect to the DuckDB database."""
+    def _get_duckdb_contexts(self, symbols) -> Dict[str, str]:
+        """Prompt context per symbol with stored history, fetched from the shared `prices` table in one query."""
         try:
-            self.duckdb_con = duckdb.connect(database=duckdb_file, read_only=True)
-            print(f"[DuckDB Init] Successfully connected to '{duckdb_file}'.")
+            rows = duckdb_store.rag_context(symbols)
         except Exception as e:
-            print(f"[DuckDB Init Error] {e}")
-
-    def _get_duckdb_context(self, symbol: str, sector: str) -> str:
-        if not self.duckdb_con:
-            return ""
+            print(f"[DuckDB Retrieval Error] {e}")
+            return {}
 
-        table_name = f"{symbol.lower()}_historical"
+        contexts = {}
+        for symbol in symbols:
+            row = rows.get(symbol)
+            if not row:
+                continue
+            latest_closes = ", ".join(f"{c:.2f}" for c in row["latest_closes"])
+            fmt = lambda v, spec=".2f": format(v, spec) if v is not None else "N/A"
+            contexts[symbol] = (
+                f"\nHistorical Stock Data (from DuckDB, as of {row['last_date']}):\n"
+                f"- Latest {len(row['latest_closes'])} Closing Prices: {latest_closes}\n"
+                f"- Average Volume: {fmt(row['avg_volume'])} (last 21 days: {fmt(row['avg_volume_21d'])})\n"
+                f"- 52-Week Range (close): {fmt(row['low_52w'])} - {fmt(row['high_52w'])}\n"
+                f"- 21-Day Return: {fmt(row['return_21d'], '.2%')}, 21-Day Volatility: {fmt(row['volatility_21d'], '.2%')}"
+            )
+        return contexts
+
+    @staticmethod
+    def _rag_query(symbol: str, forecast: dict) -> str:
+        """Query phrased like the indexed summaries: past periods with a move like the forecast one."""
         try:
-            # Construct a query to get relevant information. You might need to adjust this
-            # based on what kind of "RAG" context you want to extract from the historical data.
-            # This example fetches the latest 5 closing prices and the average volume.
-            query = f"""
-                SELECT Close FROM {table_name} ORDER BY Date DESC LIMIT 5;
-                SELECT AVG(Volume) FROM {table_name};
-            """
-            results = self.duckdb_con.execute(query).fetchall()
-
-            if results:
-                latest_closes = ", ".join(str(r[0]) for r in results[0])
-                avg_volume = results[1][0] if results[1] else "N/A"
-                context = (
-                    f"\nHistorical Stock Data (from DuckDB):\n"
-                    f"- Latest 5 Closing Prices: {latest_closes}\n"
-                    f"- Average Volume: {avg_volume:.2f}\n"
-                    f"- Note: This is a basic example. You can create more sophisticated "
-                    f"queries to extract more meaningful context."
-                )
-                return context
-            else:
-                return f"\nNo historical data found in DuckDB for '{symbol}'."
+            change = float(forecast["LSTM"]["forecast"]) / float(forecast["actual_price"]) - 1
+            return f"{symbol} week closed at {float(forecast['LSTM']['forecast']):.2f} ({change:+.1%})"
+        except (KeyError, TypeError, ValueError, ZeroDivisionError):
+            return f"{symbol} week with a large price move"
 
+    def _get_rag_contexts(self, queries: Dict[str, str]) -> Dict[str, str]:
+        """Top-k retrieved weekly/monthly price summaries per symbol, as prompt context."""
+        try:
+            hits = get_price_index().context(queries)
         except Exception as e:
-            print(f"[DuckDB Retrieval Error] {e}")
-            return ""
+            print(f"[RAG Retrieval Error] {e}")
+            return {}
+        return {
+            symbol: "\nRelevant Past Periods (retrieved):\n" + "\n".join(f"- {h['document']}" for h in found)
+            for symbol, found in hits.items() if found
+        }
 
-    def _get_yfinance_info(self, symbol: str) -> Dict[str, Any]:
+    def _get_yfinance_info(self, symbols) -> Dict[str, Dict[str, Any]]:
+        """Company info per symbol from the cached metadata service (fetched concurrently when missing)."""
         try:
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            return {
-                "company_name": info.get("longName", "N/A"),
-                "sector": info.get("sector", "N/A"),
-                "industry": info.get("industry", "N/A"),
-                "current_price": info.get("currentPrice", info.get("regularMarketPrice", "N/A")),
-                "market_cap": info.get("marketCap", "N/A"),
-                "pe_ratio": info.get("trailingPE", "N/A"),
-                "dividend_yield": info.get("dividendYield", "N/A"),
-                "52_week_high": info.get("fiftyTwoWeekHigh", "N/A"),
-                "52_week_low": info.get("fiftyTwoWeekLow", "N/A"),
-                "beta": info.get("beta", "N/A")
-            }
+            return get_metadata_service().get_many(symbols, COMPANY_FIELDS)
         except Exception as e:
             print(f"[yfinance Error] {e}")
             return {}
 
-    def generate_recommendations(self,user_pov: str = "moderate investor") -> dict:
+    def generate_recommendations(self, tickers: Optional[List[str]] = None, user_pov: str = "moderate investor",
+                                 on_result: Optional[Callable[[str, dict], None]] = None,
+                                 engine: Optional[GenerationEngine] = None) -> dict:
+        """
+        Buy/Hold/Sell advice for `tickers` (default: every forecast ticker).
+        All prompts are sent concurrently through the rate-limited generation
+        engine; `on_result(symbol, entry)` is called as each one completes.
+        Prompts answered before are served from the local response cache.
+        """
         output = {}
-        with open("../backend/outputs/forecast_results.json") as f1, open("../backend/outputs/ticker_analysis.json") as f2:
-            forecast_data_u = json.load(f1)
-            forecast_data_u = json.load(f2)
+        forecast_data_u = load_artifact("forecast_results.json")
+        analysis_data_u = load_artifact("ticker_analysis.json")
 
-            # Filter data for our target tickers
+        # Filter data for our target tickers
+        tickers = tickers or list(forecast_data_u)
         forecast_data = {k: v for k, v in forecast_data_u.items() if k in tickers}
-        analysis_data = {k: v for k, v in forecast_data_u.items() if k in tickers}
+        analysis_data = {k: v for k, v in analysis_data_u.items() if k in tickers}
 
+        sector_index = get_sector_index()
+        duckdb_contexts = self._get_duckdb_contexts(list(forecast_data))
+        company_info = self._get_yfinance_info(list(forecast_data))
+        rag_contexts = self._get_rag_contexts(
+            {symbol: self._rag_query(symbol, forecast) for symbol, forecast in forecast_data.items()}
+        )
+        prompts = {}
         for symbol, forecast in forecast_data.items():
             analysis = analysis_data.get(symbol)
             if not analysis:
                 output[symbol] = {"error": "Missing analysis data"}
                 continue
 
-            yfinance_info = self._get_yfinance_info(symbol)
+            yfinance_info = company_info.get(symbol, {})
             sector = yfinance_info.get("sector", "N/A")
-            duckdb_context = self._get_duckdb_context(symbol, sector)
+            industry_tag = sector_index.sector(symbol, "N/A")
+            if sector == "N/A":
+                sector = industry_tag
+            peers = ", ".join(sector_index.peers(symbol)[:5]) or "N/A"
+            duckdb_context = duckdb_contexts.get(symbol, f"\nNo historical data found in DuckDB for '{symbol}'.")
 
             actual_price = forecast.get("actual_price", "N/A")
             target_date = forecast.get("target_date", "N/A")
@@ -140,13 +152,14 @@ class LLMRecommendationAgent(Agent):
             low = analysis.get("lowest_price", "N/A")
             growth = analysis.get("growth_2020_percent", "N/A")
 
-            prompt = f'''
-                You're a trusted financial advisor helping an investor decide what to do with their {symbol} stock.
+            prompts[symbol] = f'''
+                You're a trusted financial advisor helping an investor ({user_pov}) decide what to do with their {symbol} stock.
 
                 **Stock Information (from yfinance)**:
                 - Company: {yfinance_info.get('company_name')}
                 - Sector: {sector}
                 - Industry: {yfinance_info.get('industry')}
+                - Dataset Industry Tag: {industry_tag} (peers: {peers})
                 - Current Price: {round(float(actual_price), 2) if actual_price != 'N/A' else 'N/A'}
                 - Market Cap: {yfinance_info.get('market_cap')}
                 - P/E Ratio: {yfinance_info.get('pe_ratio')}
@@ -160,23 +173,17 @@ class LLMRecommendationAgent(Agent):
                 - Growth during 2020: {growth}%
 
                 {duckdb_context}
+                {rag_contexts.get(symbol, "")}
 
                 **Instructions**:
                 1. Provide clear recommendation: **Buy**, **Hold**, or **Sell**
                 2. Explain reasoning in 2-4 sentences
-                3. Consider: price trends, valuation metrics, sector outlook, and historical data from DuckDB.
+                3. Consider: price trends, valuation metrics, sector outlook, historical data from DuckDB and the retrieved past periods.
                 4. Use simple, non-technical language.
             '''
 
-            try:
-                model = genai.GenerativeModel(gemini_flash)
-                response = model.generate_content(prompt)
-                llm_text = response.text.strip() if response.text else "No response"
-            except Exception as e:
-                llm_text = f"Gemini API error: {e}"
-
             output[symbol] = {
-                "recommendation": llm_text,
+                "recommendation": None,
                 "yfinance_info": yfinance_info,
                 "technical_analysis": {
                     "best_model": best_model,
@@ -187,7 +194,19 @@ class LLMRecommendationAgent(Agent):
                     "historical_low": low,
                     "growth_2020": growth
                 },
-                "duckdb_used": bool(duckdb_context)
+                "duckdb_used": symbol in duckdb_contexts,
+                "rag_used": symbol in rag_contexts
             }
 
+        def collect_result(symbol, text, error):
+            output[symbol]["recommendation"] = text if error is None else f"Gemini API error: {error}"
+            if on_result:
+                on_result(symbol, output[symbol])
+
+        engine = engine or GenerationEngine(gemini_flash, cache=get_response_cache())
+        before = dict(engine.cache.session) if engine.cache is not None else None
+        engine.generate_all(prompts, on_result=collect_result)
+        if before is not None:
+            hits, misses = (engine.cache.session[k] - before[k] for k in ("hits", "misses"))
+            print(f"✓ LLM response cache: {hits} hits, {misses} misses")
         return output
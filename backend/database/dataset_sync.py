@@ -0,0 +1,191 @@
+"""
+Delta-aware sync of the raw World-Stock-Prices dataset.
+
+The version token reported by the remote and the hash of every downloaded
+file are kept in a small state file next to the data. A sync skips the
+download when the remote version is unchanged, skips everything after the
+download when the files hash the same, and otherwise streams the new CSV to
+find the rows newer than what the stores already hold. Only those rows are
+appended to the raw store and handed to incremental preprocessing.
+
+A remote is anything with `version()` (a token, or None when unknown) and
+`download(dest)`. `LocalDirRemote` serves a plain directory so the whole flow
+runs offline; the Kaggle remote lives in pipeline_dataset.py.
+"""
+import os
+import sys
+import json
+import shutil
+import hashlib
+import pathlib
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import (
+    append_store, read_store, store_exists, store_version, normalize_types,
+    RAW_CSV_PATH, RAW_COLUMNS, RAW_DTYPES, INGEST_CHUNK_ROWS,
+)
+from backend.utils.incremental import load_state, preprocess_incremental
+
+DEST = os.path.dirname(RAW_CSV_PATH)
+RAW_FILE = os.path.basename(RAW_CSV_PATH)
+SYNC_STATE_PATH = os.path.join(DEST, ".sync_state.json")
+
+
+def file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hash_files(root):
+    files = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            files[os.path.relpath(path, root)] = {"sha1": file_hash(path), "size": os.path.getsize(path)}
+    return files
+
+
+class LocalDirRemote:
+    """A directory standing in for the remote dataset (offline runs and tests)."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def version(self):
+        digest = hashlib.sha1()
+        for dirpath, _, names in sorted(os.walk(self.root)):
+            for name in sorted(names):
+                stat = os.stat(os.path.join(dirpath, name))
+                digest.update(f"{os.path.relpath(os.path.join(dirpath, name), self.root)}:{stat.st_size}:{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def download(self, dest):
+        shutil.copytree(self.root, dest, dirs_exist_ok=True)
+
+
+def load_sync_state(path=SYNC_STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_sync_state(state, path=SYNC_STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp, path)
+
+
+def raw_store_current(dest=DEST, state_path=SYNC_STATE_PATH):
+    """True when the raw store was last built from exactly the files now in `dest`."""
+    state = load_sync_state(state_path)
+    if not state.get("raw_store_version") or state["raw_store_version"] != store_version("raw"):
+        return False
+    for name, meta in state.get("files", {}).items():
+        path = os.path.join(dest, name)
+        if not os.path.exists(path) or os.path.getsize(path) != meta["size"]:
+            return False
+    return bool(state.get("files"))
+
+
+def _watermark(dataset):
+    """Last stored date per ticker of a store dataset ({} when it does not exist)."""
+    if dataset == "processed":
+        return load_state()
+    if not store_exists(dataset):
+        return {}
+    df = read_store(dataset, columns=["ticker", "date"])
+    return df.groupby(df["ticker"].astype(str))["date"].max().to_dict()
+
+
+def _newer_than(df, watermark):
+    cutoff = pd.to_datetime(df["ticker"].astype(str).map(watermark), utc=True)
+    return df[cutoff.isna() | (df["date"] > cutoff)]
+
+
+def compute_delta(csv_path, chunksize=None):
+    """
+    Stream `csv_path` and return (new_rows, raw_rows): rows newer than the
+    processed store's last date per ticker, and the subset of those that
+    the raw store does not hold yet.
+    """
+    processed_mark = _watermark("processed")
+    raw_mark = _watermark("raw")
+    new_parts, raw_parts = [], []
+    reader = pd.read_csv(csv_path, usecols=RAW_COLUMNS, dtype=RAW_DTYPES,
+                         chunksize=chunksize or INGEST_CHUNK_ROWS)
+    for chunk in reader:
+        chunk = normalize_types(chunk[RAW_COLUMNS].dropna())
+        chunk["ticker"] = chunk["ticker"].astype(str)
+        new = _newer_than(chunk, processed_mark)
+        if not new.empty:
+            new_parts.append(new)
+            raw_parts.append(_newer_than(new, raw_mark))
+    if not new_parts:
+        empty = pd.DataFrame(columns=[c.lower() for c in RAW_COLUMNS])
+        return empty, empty
+    return pd.concat(new_parts, ignore_index=True), pd.concat(raw_parts, ignore_index=True)
+
+
+def sync_dataset(remote, dest=DEST, state_path=SYNC_STATE_PATH, apply=True, min_rows=20):
+    """
+    Bring `dest` and the stores up to date with `remote`.
+
+    Returns a dict with `status` ("unchanged", "same-files" or "updated"),
+    the remote `version` and, when updated, the number of `new_rows` and the
+    `tickers` they touch. With `apply=False` the delta is computed (and the
+    new rows returned under `delta`) but nothing is written to the stores.
+    """
+    state = load_sync_state(state_path)
+    version = remote.version()
+    if version is not None and version == state.get("version") and raw_store_current(dest, state_path):
+        print("✓ Dataset unchanged - skipping download")
+        return {"status": "unchanged", "version": version}
+
+    incoming = dest.rstrip("/\\") + ".incoming"
+    shutil.rmtree(incoming, ignore_errors=True)
+    os.makedirs(incoming)
+    try:
+        remote.download(incoming)
+        files = _hash_files(incoming)
+        if files == state.get("files") and raw_store_current(dest, state_path):
+            print("✓ Downloaded files are identical - nothing to update")
+            state["version"] = version
+            save_sync_state(state, state_path)
+            return {"status": "same-files", "version": version}
+
+        os.makedirs(dest, exist_ok=True)
+        for name in files:
+            target = os.path.join(dest, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(os.path.join(incoming, name), target)
+    finally:
+        shutil.rmtree(incoming, ignore_errors=True)
+
+    new_rows, raw_rows = compute_delta(os.path.join(dest, RAW_FILE))
+    result = {
+        "status": "updated",
+        "version": version,
+        "new_rows": len(new_rows),
+        "tickers": sorted(new_rows["ticker"].unique().tolist()),
+    }
+    print(f"✓ Dataset changed: {len(new_rows)} new rows for {len(result['tickers'])} tickers")
+    if not apply:
+        result["delta"] = new_rows
+        return result
+
+    append_store(raw_rows, "raw")
+    preprocess_incremental(new_rows=new_rows, min_rows=min_rows)
+    save_sync_state(
+        {"version": version, "files": files, "raw_store_version": store_version("raw")},
+        state_path,
+    )
+    return result
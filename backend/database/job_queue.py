@@ -0,0 +1,190 @@
+import sqlite3
+import json
+import os
+import time
+import uuid
+from typing import Optional, List, Dict, Any
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobQueue:
+    """
+    SQLite-backed queue of pipeline jobs and their progress events.
+    Safe to share between the API process and the worker processes.
+    """
+
+    def __init__(self, db_path: str = os.path.join(os.path.dirname(__file__), "jobs.db")):
+        """Initialize the database connection"""
+        self.db_path = db_path
+        self._create_tables()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _create_tables(self):
+        """Create necessary tables if they don't exist"""
+        conn = self._connect()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            status TEXT NOT NULL,
+            params TEXT NOT NULL,
+            output_dir TEXT NOT NULL,
+            progress REAL NOT NULL DEFAULT 0,
+            stage TEXT,
+            error TEXT,
+            cancel_requested INTEGER NOT NULL DEFAULT 0,
+            worker_pid INTEGER,
+            heartbeat REAL,
+            created REAL NOT NULL,
+            started REAL,
+            finished REAL
+        )
+        ''')
+        conn.execute('''
+        CREATE TABLE IF NOT EXISTS job_events (
+            event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id TEXT NOT NULL,
+            timestamp REAL NOT NULL,
+            stage TEXT,
+            message TEXT,
+            progress REAL,
+            FOREIGN KEY (job_id) REFERENCES jobs (job_id)
+        )
+        ''')
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_job_events_job ON job_events (job_id, event_id)")
+        conn.close()
+
+    @staticmethod
+    def _row(row) -> Optional[Dict[str, Any]]:
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    def submit(self, params: Dict[str, Any], output_root: str) -> Dict[str, Any]:
+        """Queue a job; its outputs go to a fresh directory under `output_root`."""
+        job_id = uuid.uuid4().hex[:12]
+        output_dir = os.path.join(output_root, job_id)
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO jobs (job_id, status, params, output_dir, created) VALUES (?, ?, ?, ?, ?)",
+            (job_id, QUEUED, json.dumps(params), output_dir, time.time())
+        )
+        conn.close()
+        self.add_event(job_id, QUEUED, "Job queued", 0.0)
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        conn.close()
+        return self._row(row)
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        conn.close()
+        return [self._row(r) for r in rows]
+
+    def claim(self, worker_pid: int) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it (None if the queue is empty)."""
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT job_id FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started = ?, heartbeat = ?, worker_pid = ? WHERE job_id = ?",
+                (RUNNING, now, now, worker_pid, row["job_id"])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        self.add_event(row["job_id"], RUNNING, "Job started", 0.0)
+        return self.get(row["job_id"])
+
+    def add_event(self, job_id: str, stage: str, message: str, progress: Optional[float] = None):
+        """Record a progress event and update the job's current stage/progress."""
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO job_events (job_id, timestamp, stage, message, progress) VALUES (?, ?, ?, ?, ?)",
+            (job_id, now, stage, message, progress)
+        )
+        if progress is None:
+            conn.execute("UPDATE jobs SET stage = ? WHERE job_id = ?", (stage, job_id))
+        else:
+            conn.execute("UPDATE jobs SET stage = ?, progress = ? WHERE job_id = ?", (stage, progress, job_id))
+        conn.close()
+
+    def events(self, job_id: str, after: int = 0) -> List[Dict[str, Any]]:
+        """Events of `job_id` with an id greater than `after`, oldest first."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT * FROM job_events WHERE job_id = ? AND event_id > ? ORDER BY event_id", (job_id, after)
+        ).fetchall()
+        conn.close()
+        return [dict(r) for r in rows]
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None):
+        """Mark a running job finished; a job already finished keeps its status."""
+        conn = self._connect()
+        updated = conn.execute(
+            "UPDATE jobs SET status = ?, error = ?, finished = ?, progress = CASE WHEN ? = ? THEN 1 ELSE progress END "
+            "WHERE job_id = ? AND status IN (?, ?)",
+            (status, error, time.time(), status, SUCCEEDED, job_id, QUEUED, RUNNING)
+        ).rowcount
+        conn.close()
+        if updated:
+            self.add_event(job_id, status, error or f"Job {status}")
+        return bool(updated)
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued job at once; flag a running one for its worker to stop."""
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        if job["status"] == QUEUED and self.finish(job_id, CANCELLED, "Cancelled before start"):
+            return self.get(job_id)
+        conn = self._connect()
+        conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE job_id = ?", (job_id,))
+        conn.close()
+        self.add_event(job_id, "cancelling", "Cancellation requested")
+        return self.get(job_id)
+
+    def heartbeat(self, job_id: str) -> bool:
+        """Record that the job's worker is alive; returns whether cancellation was requested."""
+        conn = self._connect()
+        conn.execute("UPDATE jobs SET heartbeat = ? WHERE job_id = ?", (time.time(), job_id))
+        row = conn.execute("SELECT cancel_requested FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        conn.close()
+        return bool(row and row["cancel_requested"])
+
+    def fail_stale(self, max_age: float = 60.0) -> int:
+        """Fail running jobs whose worker stopped sending heartbeats (crash or restart)."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT job_id FROM jobs WHERE status = ? AND coalesce(heartbeat, started) < ?",
+            (RUNNING, time.time() - max_age)
+        ).fetchall()
+        conn.close()
+        for row in rows:
+            self.finish(row["job_id"], FAILED, "Worker stopped before the job finished")
+        return len(rows)
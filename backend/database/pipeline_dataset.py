@@ -1,14 +1,21 @@
 """
 Download - or update - the World-Stock-Prices dataset from Kaggle.
 Falls back to the CLI if the user’s kaggle wheel is too old.
+
+Only changed data is processed: see dataset_sync.py. Set DATASET_REMOTE_DIR
+(or pass --remote-dir) to sync from a local directory instead of Kaggle.
 """
 
-import os, subprocess, shutil
+import os, subprocess, shutil, hashlib, argparse, pathlib
 from dotenv import load_dotenv
-from kaggle.api.kaggle_api_extended import KaggleApi
 import sys
 sys.stdout.reconfigure(encoding='utf-8')
 
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.database.dataset_sync import LocalDirRemote, sync_dataset
+
 load_dotenv()
 
 os.environ["KAGGLE_USERNAME"] = os.getenv("KAGGLE_USERNAME", "")
@@ -19,31 +26,71 @@ DEST       = "../backend/data/raw"
 os.makedirs(DEST, exist_ok=True)
 
 
-def download_api():
+def _api():
+    from kaggle.api.kaggle_api_extended import KaggleApi
+
     api = KaggleApi()
     api.authenticate()                                   # uses env vars
-    api.dataset_download_files(DATASET_ID, path=DEST, unzip=True)
+    return api
 
 
-def download_cli():
+def download_api(dest=DEST):
+    _api().dataset_download_files(DATASET_ID, path=dest, unzip=True)
+
+
+def download_cli(dest=DEST):
     if shutil.which("kaggle") is None:
         raise RuntimeError("Kaggle CLI not found - run  pip install kaggle")
     subprocess.run(
-        ["kaggle", "datasets", "download", "-d", DATASET_ID, "-p", DEST, "--unzip"],
+        ["kaggle", "datasets", "download", "-d", DATASET_ID, "-p", dest, "--unzip"],
         check=True,
     )
 
 
+class KaggleRemote:
+    """The Kaggle dataset; its version token is derived from the remote file listing."""
+
+    def version(self):
+        try:
+            files = _api().dataset_list_files(DATASET_ID).files
+        except Exception as e:
+            print(f"Could not read dataset version → {e}")
+            return None
+        listing = sorted(
+            f"{getattr(f, 'name', f)}:{getattr(f, 'totalBytes', getattr(f, 'size', ''))}:"
+            f"{getattr(f, 'creationDate', '')}"
+            for f in files
+        )
+        return hashlib.sha1("\n".join(listing).encode()).hexdigest()
+
+    def download(self, dest):
+        try:
+            download_api(dest)
+            print("✓ Download via kaggle-API succeeded")
+        except AttributeError as e:                # very old wheel
+            print(f"API attr error → {e}  ➜ trying CLI")
+            download_cli(dest)
+        except Exception as e:
+            print(f"API failed → {e}  ➜ trying CLI")
+            download_cli(dest)
+
+
+def default_remote(remote_dir=None):
+    remote_dir = remote_dir or os.getenv("DATASET_REMOTE_DIR")
+    return LocalDirRemote(remote_dir) if remote_dir else KaggleRemote()
+
+
+def sync(remote_dir=None):
+    """Sync the raw data and stores with the remote dataset; returns the sync summary."""
+    print("⇣ Checking dataset on Kaggle …" if not (remote_dir or os.getenv("DATASET_REMOTE_DIR"))
+          else "⇣ Checking local dataset directory …")
+    return sync_dataset(default_remote(remote_dir), dest=DEST)
+
+
 if __name__ == "__main__":
-    print("⇣ Checking dataset on Kaggle …")
-    try:
-        download_api()
-        print("✓ Download via kaggle-API succeeded")
-    except AttributeError as e:                # very old wheel
-        print(f"API attr error → {e}  ➜ trying CLI")
-        download_cli()
-    except Exception as e:
-        print(f"API failed → {e}  ➜ trying CLI")
-        download_cli()
-
-    print("Dataset ready under", DEST)
+    parser = argparse.ArgumentParser(description="Download or update the World-Stock-Prices dataset.")
+    parser.add_argument("--remote-dir", type=str, default=None, help="local directory to use instead of Kaggle")
+    args = parser.parse_args()
+
+    summary = sync(args.remote_dir)
+    print("Dataset ready under", DEST, f"({summary['status']})")
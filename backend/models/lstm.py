@@ -1,8 +1,8 @@
-from keras.models import Sequential
-from keras.layers import Input, LSTM, Dense
+from keras.models import Sequential, Model
+from keras.layers import Input, LSTM, Dense, Embedding, Flatten, Concatenate
 
 
-def build_lstm_model(trial, input_shape, params=None):
+def build_lstm_model(trial, input_shape, params=None, n_outputs=1):
     model = Sequential()
     model.add(Input(shape=input_shape))
 
@@ -10,6 +10,26 @@ def build_lstm_model(trial, input_shape, params=None):
     units = params["units"] if params else trial.suggest_int("units", 32, 128)
 
     model.add(LSTM(units=units))
-    model.add(Dense(1))  # Output layer
+    model.add(Dense(n_outputs))  # Output layer (one unit per forecast horizon)
 
     return model
+
+
+def build_global_lstm_model(input_shape, n_tickers, n_sectors, params):
+    """
+    One LSTM shared by every ticker. Ticker and sector ids (0 = unknown) are
+    embedded and joined with the LSTM state before the output layer, so a new
+    ticker is served through its sector embedding alone.
+    """
+    window = Input(shape=input_shape, name="window")
+    ticker_id = Input(shape=(1,), dtype="int32", name="ticker_id")
+    sector_id = Input(shape=(1,), dtype="int32", name="sector_id")
+
+    ticker_vec = Flatten()(Embedding(n_tickers + 1, params.get("ticker_dim", 8))(ticker_id))
+    sector_vec = Flatten()(Embedding(n_sectors + 1, params.get("sector_dim", 4))(sector_id))
+
+    hidden = LSTM(units=params["units"])(window)
+    hidden = Concatenate()([hidden, ticker_vec, sector_vec])
+    output = Dense(1)(hidden)  # Output layer
+
+    return Model(inputs=[window, ticker_id, sector_id], outputs=output)
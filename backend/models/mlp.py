@@ -1,8 +1,8 @@
-from keras.models import Sequential
-from keras.layers import Input, Dense
+from keras.models import Sequential, Model
+from keras.layers import Input, Dense, Embedding, Flatten, Concatenate
 
 
-def build_mlp_model(trial, input_shape, params=None):
+def build_mlp_model(trial, input_shape, params=None, n_outputs=1):
     model = Sequential()
     model.add(Input(shape=(input_shape[1],)))  # Ensure input shape is correct
 
@@ -10,6 +10,25 @@ def build_mlp_model(trial, input_shape, params=None):
     units = params["units"] if params else trial.suggest_int("units", 32, 128)
 
     model.add(Dense(units=units, activation="relu"))
-    model.add(Dense(1))  # Output layer
+    model.add(Dense(n_outputs))  # Output layer (one unit per forecast horizon)
 
     return model
+
+
+def build_global_mlp_model(input_shape, n_tickers, n_sectors, params):
+    """
+    One MLP shared by every ticker, fed the flattened window plus ticker and
+    sector embeddings (id 0 = unknown).
+    """
+    window = Input(shape=(input_shape[1],), name="window")
+    ticker_id = Input(shape=(1,), dtype="int32", name="ticker_id")
+    sector_id = Input(shape=(1,), dtype="int32", name="sector_id")
+
+    ticker_vec = Flatten()(Embedding(n_tickers + 1, params.get("ticker_dim", 8))(ticker_id))
+    sector_vec = Flatten()(Embedding(n_sectors + 1, params.get("sector_dim", 4))(sector_id))
+
+    hidden = Concatenate()([window, ticker_vec, sector_vec])
+    hidden = Dense(units=params["units"], activation="relu")(hidden)
+    output = Dense(1)(hidden)  # Output layer
+
+    return Model(inputs=[window, ticker_id, sector_id], outputs=output)
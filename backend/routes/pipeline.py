@@ -0,0 +1,54 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from typing import List
+
+from ..database.job_queue import JobQueue
+from ..utils.pipeline_jobs import JOBS_OUTPUT_ROOT
+
+router = APIRouter()
+queue = JobQueue()
+
+
+class JobRequest(BaseModel):
+    symbols: List[str]
+    user_pov: str = "I'm a conservative investor looking for stable growth with low risk."
+    fast: bool = False  # call the tools directly; the LLM only writes the recommendations
+
+
+def _get_job(job_id: str):
+    job = queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs", status_code=202)
+def create_job(request: JobRequest):
+    """Queue an analysis pipeline run; poll GET /pipeline/jobs/{job_id} for progress."""
+    symbols = [s.strip().upper() for s in request.symbols if s.strip()]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No valid symbols supplied")
+    return queue.submit({"symbols": symbols, "user_pov": request.user_pov, "fast": request.fast}, JOBS_OUTPUT_ROOT)
+
+
+@router.get("/jobs")
+def list_jobs(limit: int = 50):
+    return queue.list(limit)
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, after: int = 0):
+    """
+    Job status, progress and output directory, plus its progress events
+    newer than event id `after` (pass the last id seen to only get new ones).
+    """
+    job = _get_job(job_id)
+    job["events"] = queue.events(job_id, after)
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancel a queued job, or stop a running one."""
+    _get_job(job_id)
+    return queue.request_cancel(job_id)
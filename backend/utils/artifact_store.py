@@ -0,0 +1,210 @@
+"""
+Run-scoped artifact store.
+
+Every pipeline run writes its outputs (ticker_analysis.json,
+sector_summary.json, forecast_results.json, crew_result.json, ...) under its
+own run ID instead of fixed files in backend/outputs, so concurrent runs
+never overwrite each other.
+
+Layout under ARTIFACTS_DIR:
+
+- objects/ab/<sha256> holds artifact contents, stored once however many runs
+  produce identical bytes;
+- runs/<run_id>/manifest.json maps each artifact name to its hash, size and
+  write time;
+- runs/<run_id>/<name> is a hard link to the object (a copy where links are
+  unsupported), so a run's files can still be opened by path.
+
+All writes go to a temp file first and are swapped in with os.replace. The
+current run is PIPELINE_RUN_ID (set by the job workers to the job ID), or
+"local" for runs started by hand.
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/artifact_store.py list
+    python ../backend/utils/artifact_store.py show <run_id>
+    python ../backend/utils/artifact_store.py prune --keep 20
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import pathlib
+import threading
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+ARTIFACTS_DIR = str(BASE_DIR / "backend" / "outputs" / "artifacts")
+RUNS_DIR = os.path.join(ARTIFACTS_DIR, "runs")
+DEFAULT_RUN_ID = "local"
+MANIFEST_FILE = "manifest.json"
+
+
+def current_run_id():
+    return os.getenv("PIPELINE_RUN_ID") or DEFAULT_RUN_ID
+
+
+def _atomic_write(path, data):
+    tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class ArtifactStore:
+    def __init__(self, root=ARTIFACTS_DIR):
+        self.root = root
+        self.objects_dir = os.path.join(root, "objects")
+        self.runs_dir = os.path.join(root, "runs")
+        self._lock = threading.Lock()
+
+    def run_dir(self, run_id):
+        return os.path.join(self.runs_dir, run_id)
+
+    def _object_path(self, sha):
+        return os.path.join(self.objects_dir, sha[:2], sha)
+
+    def manifest(self, run_id):
+        path = os.path.join(self.run_dir(run_id), MANIFEST_FILE)
+        if not os.path.exists(path):
+            return {}
+        with open(path, "r") as f:
+            return json.load(f)
+
+    def put_bytes(self, name, data, run_id=None):
+        """Store `data` as artifact `name` of the run; returns its SHA-256."""
+        run_id = run_id or current_run_id()
+        sha = hashlib.sha256(data).hexdigest()
+        obj = self._object_path(sha)
+        if not os.path.exists(obj):
+            os.makedirs(os.path.dirname(obj), exist_ok=True)
+            _atomic_write(obj, data)
+
+        run_dir = self.run_dir(run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        target = os.path.join(run_dir, name)
+        tmp = f"{target}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            os.link(obj, tmp)
+        except OSError:
+            shutil.copyfile(obj, tmp)
+        os.replace(tmp, target)
+
+        with self._lock:
+            # Re-read so entries written by other writers of this run survive
+            manifest = self.manifest(run_id)
+            manifest[name] = {"sha256": sha, "size": len(data), "written": time.time()}
+            _atomic_write(os.path.join(run_dir, MANIFEST_FILE), json.dumps(manifest, indent=4).encode())
+        return sha
+
+    def put_json(self, name, obj, run_id=None, **dump_kwargs):
+        dump_kwargs.setdefault("indent", 4)
+        return self.put_bytes(name, json.dumps(obj, **dump_kwargs).encode(), run_id)
+
+    def path(self, name, run_id=None):
+        """Readable path of artifact `name` of the run (it may not exist)."""
+        return os.path.join(self.run_dir(run_id or current_run_id()), name)
+
+    def get_bytes(self, name, run_id=None):
+        """Contents of artifact `name`; FileNotFoundError if the run has no such artifact."""
+        entry = self.manifest(run_id or current_run_id()).get(name)
+        if entry is None:
+            raise FileNotFoundError(f"No artifact '{name}' in run '{run_id or current_run_id()}'")
+        with open(self._object_path(entry["sha256"]), "rb") as f:
+            return f.read()
+
+    def get_json(self, name, run_id=None):
+        return json.loads(self.get_bytes(name, run_id))
+
+    def exists(self, name, run_id=None):
+        return name in self.manifest(run_id or current_run_id())
+
+    def runs(self):
+        """Run IDs, most recently written first."""
+        if not os.path.isdir(self.runs_dir):
+            return []
+        found = []
+        for run_id in os.listdir(self.runs_dir):
+            manifest = self.manifest(run_id)
+            if manifest:
+                found.append((max(e["written"] for e in manifest.values()), run_id))
+        return [run_id for _, run_id in sorted(found, reverse=True)]
+
+    def runs_with(self, sha):
+        """Runs holding an artifact with content hash `sha`."""
+        return [r for r in self.runs() if any(e["sha256"] == sha for e in self.manifest(r).values())]
+
+    def delete_run(self, run_id):
+        shutil.rmtree(self.run_dir(run_id), ignore_errors=True)
+
+    def gc(self):
+        """Delete objects no run refers to; returns how many were removed."""
+        referenced = {e["sha256"] for r in self.runs() for e in self.manifest(r).values()}
+        removed = 0
+        if not os.path.isdir(self.objects_dir):
+            return removed
+        for prefix in os.listdir(self.objects_dir):
+            for sha in os.listdir(os.path.join(self.objects_dir, prefix)):
+                if sha not in referenced and ".tmp-" not in sha:
+                    os.remove(os.path.join(self.objects_dir, prefix, sha))
+                    removed += 1
+        return removed
+
+    def prune(self, keep):
+        """Keep the `keep` most recent runs (plus the default one), then collect garbage."""
+        removed = [r for r in self.runs()[keep:] if r != DEFAULT_RUN_ID]
+        for run_id in removed:
+            self.delete_run(run_id)
+        return removed, self.gc()
+
+
+_store = ArtifactStore()
+
+
+def get_artifact_store():
+    return _store
+
+
+def save_artifact(name, obj, run_id=None):
+    """Save a JSON-serializable artifact of the current run."""
+    return _store.put_json(name, obj, run_id)
+
+
+def load_artifact(name, run_id=None):
+    """Load a JSON artifact of the current (or given) run; FileNotFoundError if missing."""
+    return _store.get_json(name, run_id)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune run artifacts.")
+    parser.add_argument("--root", default=ARTIFACTS_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    show = sub.add_parser("show")
+    show.add_argument("run_id")
+    prune = sub.add_parser("prune")
+    prune.add_argument("--keep", type=int, required=True)
+    args = parser.parse_args(argv)
+
+    store = ArtifactStore(args.root)
+    if args.command == "list":
+        for run_id in store.runs():
+            manifest = store.manifest(run_id)
+            written = max(e["written"] for e in manifest.values())
+            print(f"{run_id:<16} {len(manifest):>3} artifacts  "
+                  f"last write {time.strftime('%Y-%m-%d %H:%M', time.localtime(written))}")
+    elif args.command == "show":
+        for name, entry in sorted(store.manifest(args.run_id).items()):
+            shared = len(store.runs_with(entry["sha256"])) - 1
+            print(f"{name:<28} {entry['size']:>9} B  {entry['sha256'][:12]}  shared with {shared} other runs")
+    else:
+        removed, objects = store.prune(args.keep)
+        print(f"Removed {len(removed)} runs and {objects} unreferenced objects")
+
+
+if __name__ == "__main__":
+    main()
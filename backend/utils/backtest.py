@@ -0,0 +1,229 @@
+"""
+Walk-forward backtest of the LSTM and MLP forecasters.
+
+For each ticker the feature rows are loaded and scaled once (scaler fitted on
+the rows before the first cutoff, so nothing leaks), windowed once as a
+strided view, and then walked forward over the cutoff dates. The model is
+fitted at the first cutoff and only fine-tuned on the windows that became
+available at each later cutoff. Each model predicts every horizon at once.
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/backtest.py --start 2024-01 --end 2025-01 --horizons 1,5,21 --workers 4
+"""
+import pathlib
+import sys
+import os
+import json
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import StandardScaler
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.models.lstm import build_lstm_model
+from backend.models.mlp import build_mlp_model
+from backend.utils.cache_utils import load_cached_params
+from backend.utils.data_processor import (
+    _coerce_params, _optimizer, _init_worker, FINE_TUNE_EPOCHS, SEQUENCE_LENGTH
+)
+from backend.utils.data_store import list_tickers
+from backend.utils.dataset_cache import get_dataset
+from backend.utils.sequence_generator import FEATURES, sliding_windows, flatten_windows
+
+HORIZONS = (1, 5, 21)
+EPOCHS = 10
+DEFAULT_PARAMS = {"units": 64, "batch_size": 32, "optimizer": "adam"}
+OUTPUT_DIR = "../backend/outputs"
+
+
+def make_cutoffs(start, end, freq="MS"):
+    """Cutoff dates between `start` and `end` (month starts by default)."""
+    return list(pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq=freq, tz="UTC"))
+
+
+def _targets(scaled, horizons):
+    """
+    Multi-horizon targets for every window: column k of row i is the scaled
+    close `horizons[k]` rows after the window's last row (NaN past the end).
+    """
+    n = len(scaled)
+    close = scaled[:, 0]
+    n_windows = n - SEQUENCE_LENGTH + 1
+    last_rows = np.arange(n_windows) + SEQUENCE_LENGTH - 1
+    y = np.full((n_windows, len(horizons)), np.nan, dtype=scaled.dtype)
+    for k, h in enumerate(horizons):
+        ok = last_rows + h < n
+        y[ok, k] = close[last_rows[ok] + h]
+    return y
+
+
+def backtest_ticker(ticker, cutoffs, horizons=HORIZONS, params=None):
+    """
+    Walk `ticker` forward over `cutoffs`. Returns a list of prediction records
+    (ticker, model, cutoff, horizon, last_close, actual, forecast).
+    """
+    params = params or {}
+    df = get_dataset("processed").ticker_frame(ticker, columns=["date"] + FEATURES).dropna()
+    dates = df["date"]
+    values = df[FEATURES].to_numpy(dtype=np.float64)
+    positions = [int(dates.searchsorted(c)) for c in cutoffs]
+    usable = [(c, p) for c, p in zip(cutoffs, positions) if SEQUENCE_LENGTH + max(horizons) < p < len(df)]
+    if not usable:
+        return []
+
+    # Scale and window once; every cutoff below only moves index bounds
+    scaler = StandardScaler().fit(values[:usable[0][1]])
+    scaled = scaler.transform(values).astype(np.float32)
+    windows = sliding_windows(scaled, SEQUENCE_LENGTH)
+    targets = _targets(scaled, horizons)
+    close = values[:, 0]
+    h_max = max(horizons)
+
+    records = []
+    for model_type in ("lstm", "mlp"):
+        best = _coerce_params(params.get(model_type, DEFAULT_PARAMS))
+        X_all = windows if model_type == "lstm" else flatten_windows(windows)
+        builder = build_lstm_model if model_type == "lstm" else build_mlp_model
+        model = builder(None, X_all.shape[1:] if model_type == "lstm" else X_all.shape, best,
+                        n_outputs=len(horizons))
+        model.compile(optimizer=_optimizer(best), loss="mse")
+
+        trained_upto = 0
+        for cutoff, pos in usable:
+            # Window i is trainable once all of its targets (up to h_max) lie before the cutoff
+            n_train = pos - SEQUENCE_LENGTH - h_max + 1
+            if n_train > trained_upto:
+                model.fit(
+                    X_all[trained_upto:n_train],
+                    targets[trained_upto:n_train],
+                    epochs=EPOCHS if trained_upto == 0 else FINE_TUNE_EPOCHS,
+                    batch_size=best["batch_size"],
+                    verbose=0,
+                )
+                trained_upto = n_train
+
+            # The window ending on the last row before the cutoff forecasts rows pos - 1 + h
+            window = X_all[pos - SEQUENCE_LENGTH:pos - SEQUENCE_LENGTH + 1]
+            scaled_pred = np.asarray(model.predict_on_batch(window)).ravel()
+            forecasts = scaled_pred * scaler.scale_[0] + scaler.mean_[0]
+            for h, forecast in zip(horizons, forecasts):
+                row = pos - 1 + h
+                if row >= len(df):
+                    continue
+                records.append({
+                    "ticker": ticker,
+                    "model": model_type.upper(),
+                    "cutoff": str(cutoff.date()),
+                    "horizon": h,
+                    "last_close": float(close[pos - 1]),
+                    "actual": float(close[row]),
+                    "forecast": float(forecast),
+                })
+    return records
+
+
+def _backtest_job(ticker, cutoffs, horizons, params):
+    try:
+        return ticker, backtest_ticker(ticker, cutoffs, horizons, params), None
+    except Exception as e:
+        return ticker, [], str(e)
+
+
+def summarize(records, by=("model", "horizon")):
+    """Aggregate RMSE, MAPE (%) and directional accuracy (%) over the prediction records."""
+    df = pd.DataFrame(records)
+    if df.empty:
+        return df
+    err = df["forecast"] - df["actual"]
+    df["sq_err"] = err ** 2
+    df["ape"] = (err / df["actual"]).abs() * 100
+    df["direction_hit"] = (
+        np.sign(df["forecast"] - df["last_close"]) == np.sign(df["actual"] - df["last_close"])
+    ) * 100.0
+    out = df.groupby(list(by)).agg(
+        n=("sq_err", "size"),
+        rmse=("sq_err", lambda s: float(np.sqrt(s.mean()))),
+        mape=("ape", "mean"),
+        directional_accuracy=("direction_hit", "mean"),
+    )
+    return out.round(4).reset_index()
+
+
+def run_backtest(tickers=None, cutoffs=None, horizons=HORIZONS, n_workers=1, tf_threads=None,
+                 output_dir=OUTPUT_DIR):
+    """
+    Backtest every ticker (default: all tickers in the store), in parallel
+    when `n_workers` > 1. Writes backtest_predictions.csv and
+    backtest_summary.json (overall and per-ticker tables) to `output_dir`
+    and returns (records, overall_summary).
+    """
+    tickers = tickers or list_tickers("processed")
+    if cutoffs is None:
+        end = pd.Timestamp.now(tz="UTC").normalize().replace(day=1)
+        cutoffs = make_cutoffs(end - pd.DateOffset(months=12), end)
+    param_cache = load_cached_params()
+    n_workers = max(1, min(n_workers, len(tickers)))
+    tf_threads = tf_threads or max(1, (os.cpu_count() or 1) // n_workers)
+
+    records = []
+    if n_workers == 1:
+        outcomes = (_backtest_job(t, cutoffs, horizons, param_cache.get(t)) for t in tickers)
+        pool = None
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),  # TensorFlow is not fork-safe
+            initializer=_init_worker,
+            initargs=(tf_threads,),
+        )
+        futures = [pool.submit(_backtest_job, t, cutoffs, horizons, param_cache.get(t)) for t in tickers]
+        outcomes = (f.result() for f in as_completed(futures))
+
+    try:
+        for ticker, ticker_records, error in outcomes:
+            if error:
+                print(f"Skipping {ticker} due to error: {error}")
+                continue
+            print(f"   ✓ {ticker}: {len(ticker_records)} predictions")
+            records.extend(ticker_records)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    overall = summarize(records)
+    per_ticker = summarize(records, by=("ticker", "model", "horizon"))
+
+    os.makedirs(output_dir, exist_ok=True)
+    pd.DataFrame(records).to_csv(os.path.join(output_dir, "backtest_predictions.csv"), index=False)
+    with open(os.path.join(output_dir, "backtest_summary.json"), "w") as f:
+        json.dump({
+            "cutoffs": [str(c.date()) for c in cutoffs],
+            "horizons": list(horizons),
+            "overall": overall.to_dict(orient="records"),
+            "per_ticker": per_ticker.to_dict(orient="records"),
+        }, f, indent=4)
+    print(f"Backtest summary saved to {output_dir}/backtest_summary.json")
+    return records, overall
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the LSTM and MLP forecasters.")
+    parser.add_argument("--tickers", type=str, default="")
+    parser.add_argument("--start", type=str, required=True, help="first cutoff month, e.g. 2024-01")
+    parser.add_argument("--end", type=str, required=True, help="last cutoff month, e.g. 2025-01")
+    parser.add_argument("--freq", type=str, default="MS")
+    parser.add_argument("--horizons", type=str, default=",".join(map(str, HORIZONS)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("FORECAST_WORKERS", "1")))
+    args = parser.parse_args()
+
+    tickers = [s.strip().upper() for s in args.tickers.split(",") if s.strip()] or None
+    horizons = tuple(int(h) for h in args.horizons.split(","))
+    _, overall = run_backtest(
+        tickers, make_cutoffs(args.start, args.end, args.freq), horizons, n_workers=args.workers
+    )
+    print(overall.to_string(index=False))
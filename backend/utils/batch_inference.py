@@ -0,0 +1,198 @@
+import pathlib
+import sys
+import json
+import os
+import threading
+from collections import defaultdict, OrderedDict
+import numpy as np
+import tensorflow as tf
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = BASE_DIR / "backend"
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.cache_utils import load_cached_params
+from backend.utils.data_processor import (
+    first_trading_days, inverse_scale_close_only, _coerce_params, SEQUENCE_LENGTH
+)
+from backend.utils.dataset_cache import get_dataset
+from backend.utils.model_registry import ModelRegistry, row_hashes
+from backend.utils.sequence_generator import load_feature_frame, build_sequences
+
+# Bounds for the per-process caches below (long-running API/Streamlit processes)
+MODEL_CACHE_SIZE = int(os.getenv("BATCH_MODEL_CACHE_SIZE", "64"))
+HASH_CACHE_SIZE = int(os.getenv("BATCH_HASH_CACHE_SIZE", "1024"))
+
+
+class _LRU:
+    """Thread-safe mapping that drops the least recently used items beyond `size`."""
+
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+# Models and weights of registry entries, keyed by entry directory (named by params + data fingerprint)
+_WEIGHTS = _LRU(MODEL_CACHE_SIZE)
+# Row hashes of each ticker's feature frame per target date and dataset version, so
+# unchanged data is not re-hashed on every request; a new store version misses
+_HASHES = _LRU(HASH_CACHE_SIZE)
+
+
+def _load_weights(registry, entry):
+    key = entry["path"]
+    cached = _WEIGHTS.get(key)
+    if cached is None:
+        model, scaler = registry.load(entry)
+        cached = (model, [w.astype(np.float32) for w in model.get_weights()], scaler)
+        _WEIGHTS.put(key, cached)
+    return cached
+
+
+def _frame_hashes(ticker, target_date, version, frame):
+    key = (ticker, target_date, version)
+    hashes = _HASHES.get(key)
+    if hashes is None:
+        hashes = row_hashes(frame)
+        _HASHES.put(key, hashes)
+    return hashes
+
+
+@tf.function(reduce_retracing=True)
+def _mlp_forward(x, w1, b1, w2, b2):
+    """Dense(relu) -> Dense(1) for a stack of independent MLPs; row k uses weights k."""
+    h = tf.nn.relu(tf.einsum("bd,bdu->bu", x, w1) + b1)
+    return tf.einsum("bu,bu->b", h, w2[..., 0]) + b2[:, 0]
+
+
+@tf.function(reduce_retracing=True)
+def _lstm_forward(x, kernel, recurrent, bias, w, b):
+    """LSTM -> Dense(1) for a stack of independent LSTMs (Keras gate order i, f, c, o)."""
+    units = tf.shape(recurrent)[1]
+    h = tf.zeros((tf.shape(x)[0], units), dtype=x.dtype)
+    c = tf.zeros_like(h)
+    for t in tf.range(tf.shape(x)[1]):
+        z = tf.einsum("bf,bfk->bk", x[:, t, :], kernel) + tf.einsum("bu,buk->bk", h, recurrent) + bias
+        i, f, g, o = tf.split(z, 4, axis=1)
+        c = tf.sigmoid(f) * c + tf.sigmoid(i) * tf.tanh(g)
+        h = tf.sigmoid(o) * tf.tanh(c)
+    return tf.einsum("bu,bu->b", h, w[..., 0]) + b[:, 0]
+
+
+_FORWARD = {"lstm": (_lstm_forward, 5), "mlp": (_mlp_forward, 4)}
+
+
+def _signature(model_type, weights, window):
+    """Models can share a batched pass when their layer shapes and input shapes match."""
+    return (model_type, window.shape, tuple(w.shape for w in weights))
+
+
+def predict_batch(items):
+    """
+    Run many single-window predictions at once.
+
+    `items` is a list of (model_type, model, weights, window). Compatible
+    models are grouped and their weights stacked so each group is a single
+    compiled forward pass; anything else falls back to `predict_on_batch`.
+    Returns the scaled predictions in input order.
+    """
+    preds = np.empty(len(items), dtype=np.float32)
+    groups = defaultdict(list)
+    for idx, (model_type, model, weights, window) in enumerate(items):
+        forward, n_weights = _FORWARD[model_type]
+        if len(weights) == n_weights:
+            groups[_signature(model_type, weights, window)].append(idx)
+        else:
+            preds[idx] = np.asarray(model.predict_on_batch(window[None, ...])).ravel()[0]
+
+    for (model_type, _, _), idxs in groups.items():
+        forward, n_weights = _FORWARD[model_type]
+        x = tf.constant(np.stack([items[i][3] for i in idxs]), dtype=tf.float32)
+        stacked = [
+            tf.constant(np.stack([items[i][2][k] for i in idxs]))
+            for k in range(n_weights)
+        ]
+        preds[idxs] = forward(x, *stacked).numpy()
+    return preds
+
+
+def batch_forecast(tickers, target_month="2025-01", registry=None, output_path=None):
+    """
+    Forecast the first trading day of `target_month` for many tickers from
+    models already in the registry, without any training.
+
+    Each ticker's latest window is prepared with its stored scaler, then all
+    windows go through `predict_batch` together. Returns a dict in the
+    forecast_results.json shape; tickers without both a stored LSTM and a
+    stored MLP for the current data and params are left out. If `output_path` is given the
+    results are also written there.
+    """
+    registry = registry or ModelRegistry()
+    param_cache = load_cached_params()
+    items, slots, results = [], [], {}
+    first_days = first_trading_days(tickers, target_month)
+    version = get_dataset("processed").version
+
+    for ticker in tickers:
+        target_date, actual_price = first_days.get(ticker, (None, None))
+        if actual_price is None:
+            continue
+        frame = load_feature_frame(ticker, forecast_target_date=target_date)
+        hashes = _frame_hashes(ticker, target_date, version, frame)
+        # Both models or neither: consumers expect an LSTM and an MLP entry per ticker
+        ticker_items = []
+        for model_type in ("lstm", "mlp"):
+            params = param_cache.get(ticker, {}).get(model_type)
+            if not params:
+                break
+            entry, kind = registry.lookup(ticker, model_type, _coerce_params(params), hashes)
+            if kind != "hit":
+                break
+            model, weights, scaler = _load_weights(registry, entry)
+            # Only the last window is needed: the SEQUENCE_LENGTH + 1 most recent rows
+            X, _, _ = build_sequences(
+                frame.iloc[-(SEQUENCE_LENGTH + 1):], model_type, SEQUENCE_LENGTH, scaler=scaler
+            )
+            if len(X) == 0:
+                break
+            ticker_items.append(((model_type, model, weights, X[-1]), (ticker, model_type, scaler)))
+        else:
+            for item, slot in ticker_items:
+                items.append(item)
+                slots.append(slot)
+            results[ticker] = {"target_date": target_date, "actual_price": actual_price}
+
+    if items:
+        preds = predict_batch(items)
+        for (ticker, model_type, scaler), scaled_pred in zip(slots, preds):
+            forecast = float(inverse_scale_close_only(scaler, scaled_pred))
+            mse = (forecast - results[ticker]["actual_price"]) ** 2
+            results[ticker][model_type.upper()] = {
+                "forecast": forecast,
+                "mse": float(mse),
+                "rmse": float(np.sqrt(mse)),
+            }
+
+    missing = [t for t in tickers if t not in results]
+    if missing:
+        print(f"No stored models (LSTM and MLP) for {len(missing)} tickers: {', '.join(missing)}")
+
+    if output_path:
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path, "w") as f:
+            json.dump(results, f, indent=4)
+    return results
@@ -1,7 +1,9 @@
 import os
 import json
+import threading
 
 PARAM_CACHE_PATH = "../backend/outputs/cached_params.json"
+_cache_lock = threading.Lock()
 
 def load_cached_params():
     if os.path.exists(PARAM_CACHE_PATH):
@@ -12,5 +14,20 @@ def load_cached_params():
 
 def save_cached_params(cache):
     os.makedirs(os.path.dirname(PARAM_CACHE_PATH), exist_ok=True)
-    with open(PARAM_CACHE_PATH, "w") as f:
+    # Write to a temp file and swap it in so readers never see a partial file
+    tmp_path = f"{PARAM_CACHE_PATH}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
         json.dump(cache, f, indent=4)
+    os.replace(tmp_path, PARAM_CACHE_PATH)
+
+def merge_cached_params(updates):
+    """
+    Merge {ticker: {model_type: params}} into the cache on disk. The file is
+    re-read first so entries written by other runs since we loaded it survive.
+    """
+    with _cache_lock:
+        cache = load_cached_params()
+        for ticker, params in updates.items():
+            cache.setdefault(ticker, {}).update(params)
+        save_cached_params(cache)
+        return cache
@@ -3,6 +3,7 @@ import chromadb
 from chromadb.utils import embedding_functions
 import datetime
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from chromadb.config import Settings # Import Settings
 import chromadb
 tickers = ['PTON', 'AMD', 'ADDYY', 'AXP', 'PMMAF', 'V', 'ADBE', 'UL', 'CSCO',
@@ -13,24 +14,26 @@ tickers = ['PTON', 'AMD', 'ADDYY', 'AXP', 'PMMAF', 'V', 'ADBE', 'UL', 'CSCO',
            'MSFT', 'COST', 'AEO', 'HSY', 'TSLA', 'PINS', 'BAMXF', 'CMG',
            'POAHY', 'LOGI', 'CL', 'CRM', 'NVDA', 'SBUX', 'HMC', 'SQ']
 
-def get_yfinance_data(tickers):
+def _fetch_history(ticker, period):
+    try:
+        print(f"Fetching data for {ticker}...")
+        return yf.Ticker(ticker).history(period=period)
+    except Exception as e:
+        print(f"Error fetching data for {ticker}: {e}")
+        return None  # None indicates failure
+
+
+def get_yfinance_data(tickers, period="1y", max_workers=8):
     """
-    Fetches historical stock data for the given tickers from yfinance.
+    Fetches historical stock data for the given tickers from yfinance,
+    `max_workers` tickers at a time.
 
     Returns:
     A dictionary where keys are tickers and values are Pandas DataFrames.
     """
-    data = {}
-    for ticker in tickers:
-        try:
-            print(f"Fetching data for {ticker}...")
-            ticker_data = yf.Ticker(ticker)
-            historical_data = ticker_data.history(period="1y")  # Adjust the period as needed
-            data[ticker] = historical_data
-        except Exception as e:
-            print(f"Error fetching data for {ticker}: {e}")
-            data[ticker] = None  # Store None to indicate failure
-    return data
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        frames = pool.map(lambda t: _fetch_history(t, period), tickers)
+        return dict(zip(tickers, frames))
 
 def create_chroma_collection(client, collection_name="stock_data"):
     """
@@ -64,7 +67,7 @@ def add_data_to_chroma(collection, data):
             for i, record in enumerate(records):
                 record_id = f"{ticker}_{i}"
                 ids.append(record_id)
-                document_string = f"Date: {record['Open']}, Open: {record['Open']}, High: {record['High']}, Low: {record['Low']}, Close: {record['Close']}, Volume: {record['Volume']}"
+                document_string = f"Date: {df.index[i]}, Open: {record['Open']}, High: {record['High']}, Low: {record['Low']}, Close: {record['Close']}, Volume: {record['Volume']}"
                 documents.append(document_string)
                 metadatas.append({
                     "ticker": ticker,
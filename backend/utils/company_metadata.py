@@ -0,0 +1,249 @@
+"""
+Company metadata service.
+
+Company info (name, sector, valuation numbers...) changes slowly, but
+`yf.Ticker(symbol).info` is one of the slowest calls in the pipeline. This
+service fetches it for many symbols at once on a thread pool and keeps it in
+backend/outputs/company_metadata.json with a fetch time per field. Every
+field has its own TTL (prices hourly, valuation daily, sector and names
+monthly), and only the fields a caller asks for decide whether a symbol
+needs refreshing:
+
+- fresh symbols are served from the file;
+- stale ones are served from the file immediately and refreshed in the
+  background (stale-while-revalidate);
+- unknown ones are fetched before returning.
+
+A failed or partial fetch never overwrites a good value. A field's "fetched"
+time is when its value was last received; "checked" is when the provider
+was last asked, so a field the provider never reports is retried once per
+TTL instead of on every call. Set
+COMPANY_METADATA_FIXTURE to a JSON file of {symbol: yfinance-style info} to
+run offline (tests, CI).
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/company_metadata.py AAPL MSFT --refresh
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import pathlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+METADATA_PATH = "../backend/outputs/company_metadata.json"
+METADATA_WORKERS = int(os.getenv("METADATA_WORKERS", "8"))
+
+HOUR, DAY = 3600, 86400
+# field -> (yfinance info keys tried in order, TTL in seconds)
+FIELDS = {
+    "company_name": (["longName", "shortName"], 30 * DAY),
+    "sector": (["sector"], 30 * DAY),
+    "industry": (["industry"], 30 * DAY),
+    "current_price": (["currentPrice", "regularMarketPrice"], HOUR),
+    "market_cap": (["marketCap"], DAY),
+    "pe_ratio": (["trailingPE"], DAY),
+    "dividend_yield": (["dividendYield"], DAY),
+    "52_week_high": (["fiftyTwoWeekHigh"], DAY),
+    "52_week_low": (["fiftyTwoWeekLow"], DAY),
+    "beta": (["beta"], 30 * DAY),
+}
+
+
+def extract_fields(info):
+    """Map a yfinance info dict to FIELDS, leaving out the ones it lacks."""
+    out = {}
+    for field, (keys, _) in FIELDS.items():
+        for key in keys:
+            if info.get(key) is not None:
+                out[field] = info[key]
+                break
+    return out
+
+
+def _value(entry, field):
+    value = entry.get(field, {}).get("value")
+    return "N/A" if value is None else value
+
+
+class YFinanceProvider:
+    def __call__(self, symbol):
+        import yfinance as yf
+
+        return yf.Ticker(symbol).info
+
+
+class FixtureProvider:
+    """Serves yfinance-style info dicts from a JSON file or dict, for offline runs."""
+
+    def __init__(self, fixture):
+        if isinstance(fixture, (str, os.PathLike)):
+            with open(fixture, "r") as f:
+                fixture = json.load(f)
+        self.fixture = fixture
+        self.calls = 0
+
+    def __call__(self, symbol):
+        self.calls += 1
+        if symbol not in self.fixture:
+            raise KeyError(f"no fixture for {symbol}")
+        return self.fixture[symbol]
+
+
+def default_provider():
+    fixture = os.getenv("COMPANY_METADATA_FIXTURE")
+    return FixtureProvider(fixture) if fixture else YFinanceProvider()
+
+
+class MetadataService:
+    def __init__(self, provider=None, path=METADATA_PATH, max_workers=METADATA_WORKERS, clock=time.time):
+        self.provider = provider or default_provider()
+        self.path = path
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="metadata")
+        # Revalidations fan out on _pool themselves, so they are queued on their own worker
+        self._revalidator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="metadata-revalidate")
+        self._revalidating = set()
+        self._background = []
+        self._entries = self._load()
+
+    def _load(self):
+        if os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                return json.load(f)
+        return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = f"{self.path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp, "w") as f:
+            json.dump(self._entries, f, indent=4, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def _state(self, symbol, now, fields=FIELDS):
+        """'missing', 'stale' (one of `fields` past its TTL) or 'fresh'."""
+        entry = self._entries.get(symbol)
+        if not entry:
+            return "missing"
+        for field in fields:
+            ttl = FIELDS[field][1]
+            state = entry.get(field)
+            if state is None:
+                return "stale"
+            last = max(state.get("fetched") or 0, state.get("checked") or 0)
+            if now - last > ttl:
+                return "stale"
+        return "fresh"
+
+    def _fetch(self, symbol):
+        try:
+            return symbol, extract_fields(self.provider(symbol))
+        except Exception as e:
+            print(f"[metadata] {symbol}: {e}")
+            return symbol, {}
+
+    def _store(self, results):
+        now = self.clock()
+        with self._lock:
+            for symbol, fields in results:
+                if not fields:
+                    continue  # failed fetch: keep what we have, retry next time
+                entry = self._entries.setdefault(symbol, {})
+                for field in FIELDS:
+                    if field in fields:
+                        entry[field] = {"value": fields[field], "fetched": now, "checked": now}
+                    else:
+                        # Not reported: keep the last known value and when it was fetched
+                        entry.setdefault(field, {"value": None, "fetched": None})["checked"] = now
+            self._save()
+
+    def refresh(self, symbols):
+        """Fetch `symbols` concurrently and store whatever fields came back."""
+        symbols = list(dict.fromkeys(symbols))
+        if symbols:
+            # list(): fetch everything before _store takes the lock, so readers are not blocked on the network
+            self._store(list(self._pool.map(self._fetch, symbols)))
+
+    def _revalidate(self, symbols):
+        try:
+            self.refresh(symbols)
+        finally:
+            with self._lock:
+                self._revalidating.difference_update(symbols)
+
+    def get_many(self, symbols, fields=None):
+        """
+        {symbol: {field: value}} for every symbol (fields it lacks are "N/A";
+        an empty dict when nothing is known). Unknown symbols are fetched
+        first, stale ones are returned as is and refreshed in the background.
+        Only `fields` (default: all) are checked against their TTLs, so a
+        caller that does not use the price is not refreshed hourly.
+        """
+        symbols = [str(s) for s in dict.fromkeys(symbols)]
+        fields = list(fields) if fields is not None else list(FIELDS)
+        unknown = set(fields) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown metadata fields: {sorted(unknown)}")
+        now = self.clock()
+        with self._lock:
+            states = {s: self._state(s, now, fields) for s in symbols}
+            stale = [s for s, state in states.items() if state == "stale" and s not in self._revalidating]
+            self._revalidating.update(stale)
+        self.refresh([s for s, state in states.items() if state == "missing"])
+        if stale:
+            future = self._revalidator.submit(self._revalidate, stale)
+            with self._lock:
+                # Keep only unfinished revalidations so a long-running process does not accumulate futures
+                self._background = [f for f in self._background if not f.done()]
+                self._background.append(future)
+
+        out = {}
+        with self._lock:
+            for symbol in symbols:
+                entry = self._entries.get(symbol)
+                out[symbol] = {f: _value(entry, f) for f in FIELDS} if entry else {}
+        return out
+
+    def get(self, symbol, fields=None):
+        return self.get_many([symbol], fields)[str(symbol)]
+
+    def wait(self):
+        """Block until background revalidations have finished."""
+        while self._background:
+            self._background.pop().result()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_metadata_service():
+    """Process-wide service, so concurrent callers share one file and one pool."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = MetadataService()
+        return _service
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch and cache company metadata.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--refresh", action="store_true", help="fetch even when the cached values are fresh")
+    args = parser.parse_args()
+
+    service = MetadataService()
+    start = time.perf_counter()
+    if args.refresh:
+        service.refresh(args.symbols)
+    info = service.get_many(args.symbols)
+    service.wait()
+    print(json.dumps(info, indent=4))
+    print(f"✓ {len(info)} symbols in {time.perf_counter() - start:.2f}s")
@@ -1,7 +1,9 @@
 import pathlib
 import sys
 import os
-import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from numbers import Number
 import numpy as np
@@ -12,11 +14,21 @@ BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
 BACKEND_DIR = BASE_DIR / "backend"
 sys.path.insert(0, str(BASE_DIR))
 
-from backend.utils.tuning import optimize_model
-from backend.utils.sequence_generator import generate_sequences
+from backend.utils.tuning import optimize_model, DEFAULT_PARAMS as TUNING_DEFAULTS
+from backend.utils.sequence_generator import load_feature_frame, build_sequences, flatten_windows
 from backend.models.lstm import build_lstm_model
 from backend.models.mlp import build_mlp_model
-from backend.utils.cache_utils import load_cached_params, save_cached_params
+from backend.utils.cache_utils import load_cached_params, merge_cached_params
+from backend.utils.dataset_cache import get_dataset
+from backend.utils import duckdb_store
+from backend.utils.model_registry import ModelRegistry, row_hashes
+from backend.utils.artifact_store import save_artifact, current_run_id
+
+# How many times a crashed worker pool is rebuilt before giving up on the rest.
+MAX_POOL_RESTARTS = 2
+SEQUENCE_LENGTH = 10
+# Epochs used when a stored model is fine-tuned on newly appended rows.
+FINE_TUNE_EPOCHS = 3
 
 
 def inverse_scale_close_only(scaler, scaled_close):
@@ -33,22 +45,16 @@ def get_first_trading_day_and_price(ticker, target_month="2025-01"):
     Return (<first_date>, <close_price>) for the *earliest* trading day in
     `target_month` for `ticker`. If none exists, returns (None, None).
     """
-    
-    #data_file = BASE_DIR / "data" / "processed" / "cleaned_stock_data.csv"
-    
-    #if not data_file.exists():
-        #raise FileNotFoundError(f"Required data file not found: {data_file}")
-        
-    #df = pd.read_csv(data_file)
+    if duckdb_store.use_duckdb():
+        return duckdb_store.first_trading_day(ticker, target_month)
 
-    df = pd.read_csv("../backend/data/processed/cleaned_stock_data.csv")
-    
-    df["date"] = pd.to_datetime(df["date"], utc=True)
-
-    month_df = df[
-        (df["ticker"] == ticker)
-        & (df["date"].dt.strftime("%Y-%m") == target_month)
-    ]
+    month_start = pd.Timestamp(f"{target_month}-01", tz="UTC")
+    month_df = get_dataset("processed").ticker_frame(
+        ticker,
+        columns=["date", "close"],
+        start=month_start,
+        end=month_start + pd.offsets.MonthBegin(1),
+    )
 
     if month_df.empty:
         return None, None
@@ -59,143 +65,285 @@ def get_first_trading_day_and_price(ticker, target_month="2025-01"):
     return first_date, first_close
 
 
-def train_and_forecast(tickers=None, target_month="2025-01"):
+def first_trading_days(tickers, target_month="2025-01"):
     """
-    For each ticker, find the first trading day in `target_month`,
-    train LSTM & MLP up to *but not including* that day, then forecast it.
+    `get_first_trading_day_and_price` for many tickers in one query:
+    {ticker: (first_date, close)}, leaving out tickers with no rows that month.
     """
-    
-    if tickers is None:
-        tickers = ["AAPL", "MSFT"]
+    if duckdb_store.use_duckdb():
+        return duckdb_store.first_trading_days(tickers, target_month)
 
-    final_results = {}
-    param_cache = load_cached_params()
+    month_start = pd.Timestamp(f"{target_month}-01", tz="UTC")
+    month_df = get_dataset("processed").tickers_frame(
+        tickers,
+        columns=["ticker", "date", "close"],
+        start=month_start,
+        end=month_start + pd.offsets.MonthBegin(1),
+    )
+    firsts = month_df.sort_values("date").groupby("ticker", observed=True).first()
+    return {
+        str(ticker): (str(row["date"].date()), float(row["close"]))
+        for ticker, row in firsts.iterrows()
+    }
+
+
+def _coerce_params(params):
+    return {
+        k: int(v) if isinstance(v, Number) and not isinstance(v, bool) else v
+        for k, v in params.items()
+    }
 
-    for ticker in tickers:
-        print(f"Processing {ticker}...")
 
-        # ---- NEW: dynamically choose the first available date in the month
-        target_date, actual_price = get_first_trading_day_and_price(
-            ticker, target_month=target_month
+def _optimizer(params):
+    return Adam() if params["optimizer"] == "adam" else RMSprop()
+
+
+def _build_model(model_type, input_shape, params):
+    builder = build_lstm_model if model_type == "lstm" else build_mlp_model
+    model = builder(None, input_shape, params)
+    model.compile(optimizer=_optimizer(params), loss="mse")
+    return model
+
+
+def _fit_or_load(ticker, model_type, params, frame, hashes, X, y, scaler, target_date, registry):
+    """
+    Return (model, scaler, X) for `model_type`. An exact registry hit is loaded
+    as-is; an entry trained on a prefix of `frame` is fine-tuned on the new
+    windows only (keeping its scaler); otherwise a fresh model is fitted on
+    (X, y). Newly fitted models are written back to the registry.
+    """
+    entry, kind = registry.lookup(ticker, model_type, params, hashes) if registry else (None, None)
+
+    if kind == "hit":
+        print(f"      ↳ loaded {model_type.upper()} model from registry")
+        model, scaler = registry.load(entry)
+        X, _, _ = build_sequences(frame, model_type, SEQUENCE_LENGTH, scaler=scaler)
+        return model, scaler, X
+
+    if kind == "warm":
+        print(f"      ↳ fine-tuning {model_type.upper()} model on {len(frame) - entry['n_rows']} new rows")
+        model, scaler = registry.load(entry)
+        model.compile(optimizer=_optimizer(params), loss="mse")
+        X, y, _ = build_sequences(frame, model_type, SEQUENCE_LENGTH, scaler=scaler)
+        # Window i predicts row i + SEQUENCE_LENGTH; keep those whose target is a new row
+        first_new = max(entry["n_rows"] - SEQUENCE_LENGTH, 0)
+        model.fit(
+            X[first_new:],
+            y[first_new:],
+            epochs=FINE_TUNE_EPOCHS,
+            batch_size=params["batch_size"],
+            verbose=0
+        )
+    else:
+        input_shape = X.shape[1:] if model_type == "lstm" else X.shape
+        model = _build_model(model_type, input_shape, params)
+        model.fit(
+            X,
+            y,
+            epochs=10,
+            batch_size=params["batch_size"],
+            verbose=0
         )
-        if actual_price is None:
-            print(f"No price found for {ticker} in {target_month}, skipping.")
-            continue
 
-        print(f"   • forecasting {target_date}")
+    if registry:
+        registry.save(
+            ticker, model_type, params, hashes, model, scaler,
+            cutoff=target_date, parent=entry["fingerprint"] if entry else None,
+        )
+    return model, scaler, X
 
-        try:
 
-            X_lstm, _, y_train, _, lstm_scaler = generate_sequences(
-                ticker=ticker,
-                model_type="lstm",
-                forecast_target_date=target_date
-            )
-            X_mlp, _, _, _, mlp_scaler = generate_sequences(
-                ticker=ticker,
-                model_type="mlp",
-                forecast_target_date=target_date
+def forecast_ticker(ticker, target_month="2025-01", cached_params=None, use_registry=True, new_params=None):
+    """
+    Train LSTM & MLP for one ticker up to *but not including* the first trading
+    day of `target_month`, then forecast it. Trained models are reused from the
+    model registry when the ticker's rows and params are unchanged.
+
+    Returns (result, new_params): `result` is the ticker's entry in
+    forecast_results.json (None if skipped) and `new_params` holds any
+    hyperparameters tuned here, for the caller to merge into the param cache.
+    Pass your own `new_params` dict to keep what was tuned even if a later
+    step raises.
+    """
+    cached_params = cached_params or {}
+    new_params = {} if new_params is None else new_params
+    registry = ModelRegistry() if use_registry else None
+    print(f"Processing {ticker}...")
+
+    # ---- NEW: dynamically choose the first available date in the month
+    target_date, actual_price = get_first_trading_day_and_price(
+        ticker, target_month=target_month
+    )
+    if actual_price is None:
+        print(f"No price found for {ticker} in {target_month}, skipping.")
+        return None, new_params
+
+    print(f"   • forecasting {target_date}")
+
+    frame = load_feature_frame(ticker, forecast_target_date=target_date)
+    hashes = row_hashes(frame)
+    X_lstm, y_train, scaler = build_sequences(frame, "lstm", SEQUENCE_LENGTH)
+    # Same rows and scaler for both models: flatten the LSTM windows once
+    windows = {"lstm": X_lstm, "mlp": flatten_windows(X_lstm)}
+
+    result = {
+        "target_date": target_date,
+        "actual_price": actual_price,
+    }
+    for model_type in ("lstm", "mlp"):
+        X = windows[model_type]
+        if model_type in cached_params:
+            best = cached_params[model_type]
+            print(f"      ↳ loaded cached {model_type.upper()} params")
+        else:
+            best = optimize_model(
+                model_type, X, y_train, study_name=f"{ticker}-{model_type}-{target_date}"
             )
+            # A fallback to the defaults is not cached, so the next run tunes again
+            if best != TUNING_DEFAULTS:
+                new_params[model_type] = best
+        best = _coerce_params(best)
 
-            lstm_input_shape = X_lstm.shape[1:]
-            mlp_input_shape = X_mlp.shape
+        model, model_scaler, X_model = _fit_or_load(
+            ticker, model_type, best, frame, hashes, X, y_train, scaler, target_date, registry
+        )
 
+        scaled_pred = model.predict(X_model[-1:], verbose=0).flatten()[0]
+        forecast = float(
+            inverse_scale_close_only(model_scaler, scaled_pred)
+        )
+        mse = (forecast - actual_price) ** 2
+        result[model_type.upper()] = {
+            "forecast": forecast,
+            "mse": float(mse),
+            "rmse": float(np.sqrt(mse)),
+        }
 
-            if ticker in param_cache and "lstm" in param_cache[ticker]:
-                lstm_best = param_cache[ticker]["lstm"]
-                print("      ↳ loaded cached LSTM params")
-            else:
-                lstm_best = optimize_model(
-                    "lstm", X_lstm, y_train, X_lstm, y_train
-                )
-                param_cache.setdefault(ticker, {})["lstm"] = lstm_best
+    return result, new_params
 
-            lstm_best = {
-                k: int(v) if isinstance(v, Number) and not isinstance(v, bool) else v
-                for k, v in lstm_best.items()
-            }
-            lstm_opt = Adam() if lstm_best["optimizer"] == "adam" else RMSprop()
 
-            lstm_model = build_lstm_model(
-                None, lstm_input_shape, lstm_best
-            )
-            lstm_model.compile(optimizer=lstm_opt, loss="mse")
-            lstm_model.fit(
-                X_lstm,
-                y_train,
-                epochs=10,
-                batch_size=lstm_best["batch_size"],
-                verbose=0
-            )
+def _init_worker(tf_threads):
+    """Process-pool initializer: cap TensorFlow's thread pools so workers don't oversubscribe cores."""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
 
-            lstm_scaled_pred = lstm_model.predict(X_lstm[-1:]).flatten()[0]
-            lstm_forecast = float(
-                inverse_scale_close_only(lstm_scaler, lstm_scaled_pred)
-            )
-            lstm_mse = (lstm_forecast - actual_price) ** 2
-            lstm_rmse = np.sqrt(lstm_mse)
-
-
-            if ticker in param_cache and "mlp" in param_cache[ticker]:
-                mlp_best = param_cache[ticker]["mlp"]
-                print("      ↳ loaded cached MLP params")
-            else:
-                mlp_best = optimize_model(
-                    "mlp", X_mlp, y_train, X_mlp, y_train
-                )
-                param_cache.setdefault(ticker, {})["mlp"] = mlp_best
-
-            mlp_best = {
-                k: int(v) if isinstance(v, Number) and not isinstance(v, bool) else v
-                for k, v in mlp_best.items()
-            }
-            mlp_opt = Adam() if mlp_best["optimizer"] == "adam" else RMSprop()
 
-            mlp_model = build_mlp_model(
-                None, mlp_input_shape, mlp_best
-            )
-            mlp_model.compile(optimizer=mlp_opt, loss="mse")
-            mlp_model.fit(
-                X_mlp,
-                y_train,
-                epochs=10,
-                batch_size=mlp_best["batch_size"],
-                verbose=0
-            )
+def _forecast_job(ticker, target_month, cached_params, use_registry=True):
+    """Pool entry point: never raises, so one bad ticker can't take the pool down."""
+    new_params = {}
+    try:
+        result, _ = forecast_ticker(ticker, target_month, cached_params, use_registry, new_params)
+        return ticker, result, new_params, None
+    except Exception as e:
+        # Params tuned before the failure are still returned, so the tuning is not repeated
+        return ticker, None, new_params, str(e)
 
-            mlp_scaled_pred = mlp_model.predict(X_mlp[-1:]).flatten()[0]
-            mlp_forecast = float(
-                inverse_scale_close_only(mlp_scaler, mlp_scaled_pred)
-            )
-            mlp_mse = (mlp_forecast - actual_price) ** 2
-            mlp_rmse = np.sqrt(mlp_mse)
-
-
-            final_results[ticker] = {
-                "target_date": target_date,
-                "actual_price": actual_price,
-                "LSTM": {
-                    "forecast": lstm_forecast,
-                    "mse": lstm_mse,
-                    "rmse": lstm_rmse,
-                },
-                "MLP": {
-                    "forecast": mlp_forecast,
-                    "mse": mlp_mse,
-                    "rmse": mlp_rmse,
-                },
+
+def _run_parallel(tickers, target_month, param_cache, n_workers, tf_threads, use_registry):
+    """
+    Yield (ticker, result, new_params, error) as workers finish. If a worker
+    process dies outright, the pool is rebuilt for the tickers still pending.
+    """
+    ctx = multiprocessing.get_context("spawn")  # TensorFlow is not fork-safe
+    pending = list(tickers)
+    restarts = 0
+    while pending:
+        with ProcessPoolExecutor(
+            max_workers=min(n_workers, len(pending)),
+            mp_context=ctx,
+            initializer=_init_worker,
+            initargs=(tf_threads,),
+        ) as pool:
+            futures = {
+                pool.submit(_forecast_job, t, target_month, param_cache.get(t, {}), use_registry): t
+                for t in pending
             }
+            try:
+                for future in as_completed(futures):
+                    outcome = future.result()
+                    pending.remove(outcome[0])
+                    yield outcome
+            except BrokenProcessPool:
+                restarts += 1
+                if restarts > MAX_POOL_RESTARTS:
+                    for t in pending:
+                        yield t, None, {}, "worker process died"
+                    return
+                print(f"Worker pool crashed, restarting for {len(pending)} pending tickers")
+
+
+def train_and_forecast(tickers=None, target_month="2025-01", n_workers=None, tf_threads=None,
+                       on_result=None, use_registry=True, mode=None):
+    """
+    For each ticker, find the first trading day in `target_month`,
+    train LSTM & MLP up to *but not including* that day, then forecast it.
 
-        except Exception as e:
-            print(f"Skipping {ticker} due to error: {e}")
+    With `n_workers` > 1 (default: $FORECAST_WORKERS, else 1) tickers are
+    trained in a process pool, each worker limited to `tf_threads` TensorFlow
+    threads (default: cores / workers). `on_result(ticker, result)` is called
+    as each ticker finishes. `use_registry=False` forces every model to be
+    refitted instead of loaded from the model registry.
+
+    `mode="global"` (default: $FORECAST_MODE, else "per_ticker") trains one
+    LSTM and one MLP on windows pooled across all tickers instead of one
+    pair per ticker; see backend.utils.global_model.
+    """
+    
+    if tickers is None:
+        tickers = ["AAPL", "MSFT"]
+    if n_workers is None:
+        n_workers = int(os.getenv("FORECAST_WORKERS", "1"))
+    n_workers = max(1, min(n_workers, len(tickers)))
+    if tf_threads is None:
+        tf_threads = max(1, (os.cpu_count() or 1) // n_workers)
+
+    final_results = {}
+    param_cache = load_cached_params()
+    tuned_params = {}
+    mode = mode or os.getenv("FORECAST_MODE", "per_ticker")
+
+    if mode == "global":
+        # Imported here: global_model builds on this module
+        from backend.utils.global_model import train_and_forecast_global
+
+        final_results = train_and_forecast_global(tickers, target_month, param_cache)
+        if on_result:
+            for ticker, result in final_results.items():
+                on_result(ticker, result)
+        outcomes = ()
+    elif n_workers == 1:
+        outcomes = (
+            _forecast_job(t, target_month, param_cache.get(t, {}), use_registry) for t in tickers
+        )
+    else:
+        print(f"Training {len(tickers)} tickers on {n_workers} workers ({tf_threads} TF threads each)")
+        outcomes = _run_parallel(
+            tickers, target_month, param_cache, n_workers, tf_threads, use_registry
+        )
+
+    for ticker, result, new_params, error in outcomes:
+        if new_params:
+            tuned_params[ticker] = new_params
+        if error:
+            print(f"Skipping {ticker} due to error: {error}")
+            continue
+        if result is None:
+            continue
+        final_results[ticker] = result
+        print(f"   ✓ {ticker} done")
+        if on_result:
+            on_result(ticker, result)
 
+    # Keep the requested ticker order in the output file
+    final_results = {t: final_results[t] for t in tickers if t in final_results}
 
-    save_cached_params(param_cache)
+    if tuned_params:
+        merge_cached_params(tuned_params)
+        # The shared cache keeps being merged across runs; the run records what it tuned
+        save_artifact("tuned_params.json", tuned_params)
 
-    os.makedirs("../backend/outputs", exist_ok=True)
-    out_file = f"../backend/outputs/forecast_results.json"
-    with open(out_file, "w") as f:
-        json.dump(final_results, f, indent=4)
+    save_artifact("forecast_results.json", final_results)
 
-    print(f"\nResults saved to {out_file}")
+    print(f"\nResults saved to run '{current_run_id()}'")
     return final_results
@@ -0,0 +1,307 @@
+import os
+import shutil
+import time
+from urllib.parse import unquote
+import hashlib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# The CSV files are kept as plain exports; every backend reader goes through the
+# ticker-partitioned parquet datasets below (<root>/ticker=AAPL/part-*.parquet).
+RAW_CSV_PATH = "../backend/data/raw/World-Stock-Prices-Dataset.csv"
+PROCESSED_CSV_PATH = "../backend/data/processed/cleaned_stock_data.csv"
+STORE_ROOT = "../backend/data/store"
+STORE_PATHS = {
+    "raw": os.path.join(STORE_ROOT, "raw"),
+    "processed": os.path.join(STORE_ROOT, "processed"),
+}
+VERSION_FILE = "_VERSION"
+PARTITION_COLUMN = "ticker"
+
+# Columns kept from the Kaggle CSV and how to parse them while streaming it in.
+RAW_COLUMNS = ['Industry_Tag', 'Date', 'Open', 'High', 'Low', 'Close', 'Volume', 'Ticker']
+RAW_DTYPES = {
+    'Industry_Tag': 'category',
+    'Date': 'string',
+    'Open': 'float64',
+    'High': 'float64',
+    'Low': 'float64',
+    'Close': 'float64',
+    'Volume': 'float64',
+    'Ticker': 'category',
+}
+INGEST_CHUNK_ROWS = int(os.getenv("INGEST_CHUNK_ROWS", "250000"))
+
+
+def normalize_columns(df):
+    """Lower-case and snake-case column names ('Industry_Tag' -> 'industry_tag')."""
+    df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
+    return df
+
+
+def normalize_types(df):
+    """
+    Coerce the frame to the store schema: `date` as UTC timestamps, `ticker`
+    as a category and float prices, so readers never re-parse strings.
+    """
+    df = normalize_columns(df)
+    if "date" in df.columns and not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        df["date"] = pd.to_datetime(df["date"], utc=True)
+    if "ticker" in df.columns:
+        df["ticker"] = df["ticker"].astype(str).astype("category")
+    if "industry_tag" in df.columns:
+        df["industry_tag"] = df["industry_tag"].astype("category")
+    for col in ("open", "high", "low", "close"):
+        if col in df.columns:
+            df[col] = df[col].astype("float64")
+    return df
+
+
+def store_path(dataset="processed"):
+    return STORE_PATHS[dataset]
+
+
+def store_exists(dataset="processed"):
+    return os.path.exists(os.path.join(store_path(dataset), VERSION_FILE))
+
+
+def store_version(dataset="processed"):
+    """Return the content version written alongside the dataset, or None."""
+    version_file = os.path.join(store_path(dataset), VERSION_FILE)
+    if not os.path.exists(version_file):
+        return None
+    with open(version_file, "r") as f:
+        return f.read().strip()
+
+
+def to_utc(value):
+    """Timestamp in UTC whether `value` is naive, tz-aware or a date string."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+
+def _content_hash(df, previous=""):
+    digest = hashlib.sha1(previous.encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def _write_version(root, version):
+    tmp = os.path.join(root, VERSION_FILE + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(version)
+    os.replace(tmp, os.path.join(root, VERSION_FILE))
+
+
+def _to_table(df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Categorical codes are int8/int16 depending on the number of categories; pin
+    # the index type so files written in separate batches share one schema.
+    for i, field in enumerate(table.schema):
+        if pa.types.is_dictionary(field.type) and field.name != PARTITION_COLUMN:
+            dict_type = pa.dictionary(pa.int32(), field.type.value_type)
+            table = table.set_column(i, field.name, table.column(i).cast(dict_type))
+    # Partition values live in the directory names; store them as plain strings.
+    return table.set_column(
+        table.schema.get_field_index(PARTITION_COLUMN),
+        PARTITION_COLUMN,
+        table.column(PARTITION_COLUMN).cast(pa.string()),
+    )
+
+
+def write_store(df, dataset="processed", csv_path=None):
+    """
+    Replace the `dataset` store with `df`, partitioned by ticker.
+
+    The new dataset is written next to the old one and swapped in, so readers
+    never observe a half-written store. If `csv_path` is given the frame is also
+    exported there as CSV.
+    """
+    df = normalize_types(df.copy())
+    df = df.sort_values(["ticker", "date"]).reset_index(drop=True)
+
+    root = store_path(dataset)
+    tmp_root = root + ".tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root, exist_ok=True)
+
+    pq.write_to_dataset(
+        _to_table(df),
+        root_path=tmp_root,
+        partition_cols=[PARTITION_COLUMN],
+        basename_template="part-0-{i}.parquet",
+    )
+    _write_version(tmp_root, _content_hash(df))
+    _swap_in(tmp_root, root)
+
+    if csv_path:
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        df.to_csv(csv_path, index=False)
+    return df
+
+
+def _swap_in(tmp_root, root):
+    shutil.rmtree(root, ignore_errors=True)
+    os.replace(tmp_root, root)
+
+
+def ingest_csv(path=RAW_CSV_PATH, dataset="raw", chunksize=None, csv_path=None):
+    """
+    Stream the raw Kaggle CSV into the `dataset` store in chunks of
+    `chunksize` rows, reading only RAW_COLUMNS with fixed dtypes, so peak
+    memory stays at about one chunk whatever the file size. Like
+    `write_store` the new dataset replaces the old one atomically; if
+    `csv_path` is given the kept rows are exported there chunk by chunk.
+    Returns a summary dict (rows, chunks, tickers, version).
+    """
+    chunksize = chunksize or INGEST_CHUNK_ROWS
+    root = store_path(dataset)
+    tmp_root = root + ".tmp"
+    shutil.rmtree(tmp_root, ignore_errors=True)
+    os.makedirs(tmp_root, exist_ok=True)
+    if csv_path:
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+
+    version, rows, chunks, tickers = "", 0, 0, set()
+    reader = pd.read_csv(path, usecols=RAW_COLUMNS, dtype=RAW_DTYPES, chunksize=chunksize)
+    for i, chunk in enumerate(reader):
+        chunk = normalize_types(chunk[RAW_COLUMNS].dropna())
+        if chunk.empty:
+            continue
+        pq.write_to_dataset(
+            _to_table(chunk),
+            root_path=tmp_root,
+            partition_cols=[PARTITION_COLUMN],
+            basename_template=f"part-{i}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        version = _content_hash(chunk, previous=version)
+        if csv_path:
+            chunk.to_csv(csv_path, mode="w" if chunks == 0 else "a", index=False, header=chunks == 0)
+        rows += len(chunk)
+        chunks += 1
+        tickers.update(chunk["ticker"].cat.categories)
+
+    _write_version(tmp_root, version)
+    _swap_in(tmp_root, root)
+    print(f"✓ Ingested {rows} rows for {len(tickers)} tickers in {chunks} chunks into {root}")
+    return {"rows": rows, "chunks": chunks, "tickers": len(tickers), "version": version}
+
+
+def append_store(df, dataset="processed", csv_path=None):
+    """
+    Append new rows to the `dataset` store as extra files in each ticker's
+    partition, without rewriting existing data. The version is chained from
+    the previous one so caches notice the change. If `csv_path` is given the
+    rows are appended to that CSV export as well.
+    """
+    if df.empty:
+        return df
+    if not store_exists(dataset):
+        return write_store(df, dataset, csv_path=csv_path)
+
+    df = normalize_types(df.copy())
+    df = df.sort_values(["ticker", "date"]).reset_index(drop=True)
+    root = store_path(dataset)
+
+    pq.write_to_dataset(
+        _to_table(df),
+        root_path=root,
+        partition_cols=[PARTITION_COLUMN],
+        basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    _write_version(root, _content_hash(df, previous=store_version(dataset) or ""))
+
+    if csv_path:
+        os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+        df.to_csv(csv_path, mode="a", index=False, header=not os.path.exists(csv_path))
+    return df
+
+
+def _dataset(dataset="processed"):
+    return ds.dataset(
+        store_path(dataset),
+        format="parquet",
+        partitioning="hive",
+        exclude_invalid_files=True,
+    )
+
+
+def read_store(dataset="processed", tickers=None, columns=None, start=None, end=None):
+    """
+    Read from the columnar store with predicate pushdown.
+
+    `tickers` prunes whole partitions, so a single-ticker read only touches that
+    ticker's files. `start` (inclusive) and `end` (exclusive) filter on `date`
+    using the parquet row-group statistics.
+    """
+    if not store_exists(dataset):
+        raise FileNotFoundError(
+            f"No '{dataset}' store under {store_path(dataset)} - run collect/preprocess first"
+        )
+
+    flt = None
+    if tickers is not None:
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        flt = ds.field(PARTITION_COLUMN).isin([str(t) for t in tickers])
+    if start is not None:
+        cond = ds.field("date") >= to_utc(start)
+        flt = cond if flt is None else flt & cond
+    if end is not None:
+        cond = ds.field("date") < to_utc(end)
+        flt = cond if flt is None else flt & cond
+
+    table = _dataset(dataset).to_table(columns=columns, filter=flt)
+    df = table.to_pandas()
+
+    if PARTITION_COLUMN in df.columns:
+        df[PARTITION_COLUMN] = df[PARTITION_COLUMN].astype(str).astype("category")
+    if "date" in df.columns:
+        df = df.sort_values(
+            [PARTITION_COLUMN, "date"] if PARTITION_COLUMN in df.columns else ["date"]
+        ).reset_index(drop=True)
+    return df
+
+
+def price_history(tickers, dataset="raw"):
+    """Date/Ticker/Close rows for `tickers`, with the column names the frontend and PDF report use."""
+    df = read_store(dataset, tickers=tickers, columns=["date", "ticker", "close"])
+    return df.rename(columns={"date": "Date", "ticker": "Ticker", "close": "Close"})
+
+
+def list_tickers(dataset="processed"):
+    """Ticker symbols present in the store, read from the partition layout only."""
+    root = store_path(dataset)
+    prefix = PARTITION_COLUMN + "="
+    if not os.path.isdir(root):
+        return []
+    # Partition directory names are URI-encoded by pyarrow.
+    return sorted(
+        unquote(name[len(prefix):]) for name in os.listdir(root) if name.startswith(prefix)
+    )
+
+
+def export_csv(dataset="processed", path=PROCESSED_CSV_PATH):
+    """Write the whole store back out as a single CSV file."""
+    df = read_store(dataset)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_csv(path, index=False)
+    return path
+
+
+def describe_store(dataset="processed"):
+    """Small summary used for logging: version, tickers and on-disk size."""
+    root = store_path(dataset)
+    size = 0
+    for dirpath, _, files in os.walk(root):
+        size += sum(os.path.getsize(os.path.join(dirpath, f)) for f in files)
+    return {
+        "dataset": dataset,
+        "version": store_version(dataset),
+        "tickers": len(list_tickers(dataset)),
+        "bytes": size,
+    }
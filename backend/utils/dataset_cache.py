@@ -0,0 +1,190 @@
+import os
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+from backend.utils.data_store import read_store, store_path, store_version, to_utc, VERSION_FILE
+
+# Upper bound for cached per-ticker slices (and for keeping the full frame resident).
+DEFAULT_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_MB", "1024")) * 1024 * 1024
+
+
+class DatasetCache:
+    """
+    Process-wide handle on one store dataset.
+
+    The full frame is loaded at most once per store version and indexed by
+    ticker, so per-ticker lookups are O(1) slices. When the full frame has not
+    been requested (or is too large to keep), single-ticker reads go to the
+    store with partition pushdown and the resulting slices are kept in an LRU
+    bounded by `max_bytes`. Everything is dropped when the store's version
+    file changes (mtime or content hash).
+    """
+
+    def __init__(self, dataset="processed", max_bytes=DEFAULT_MAX_BYTES):
+        self.dataset = dataset
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._stamp = None
+        self._version = None
+        self._frame = None
+        self._index = {}
+        self._slices = OrderedDict()
+        self._slice_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    # -- invalidation -----------------------------------------------------
+
+    def _check_version(self):
+        version_file = os.path.join(store_path(self.dataset), VERSION_FILE)
+        try:
+            st = os.stat(version_file)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._stamp:
+            return
+        version = store_version(self.dataset)
+        if version != self._version:
+            self.invalidate()
+            self._version = version
+        self._stamp = stamp
+
+    def invalidate(self):
+        with self._lock:
+            self._frame = None
+            self._index = {}
+            self._slices.clear()
+            self._slice_bytes = 0
+
+    @property
+    def version(self):
+        with self._lock:
+            self._check_version()
+            return self._version
+
+    # -- full frame -------------------------------------------------------
+
+    def frame(self):
+        """
+        The whole dataset sorted by (ticker, date). The returned frame is
+        shared, so callers must treat it as read-only.
+        """
+        with self._lock:
+            self._check_version()
+            if self._frame is not None:
+                return self._frame
+            df = read_store(self.dataset)
+            if df.memory_usage(deep=True).sum() <= self.max_bytes:
+                self._frame = df
+                self._index = self._build_index(df)
+                # Resident frame serves every ticker; cached slices are redundant now.
+                self._slices.clear()
+                self._slice_bytes = 0
+            return df
+
+    @staticmethod
+    def _build_index(df):
+        if df.empty:
+            return {}
+        codes = df["ticker"].cat.codes.to_numpy()
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(codes)) + 1))
+        stops = np.append(starts[1:], len(df))
+        names = df["ticker"].cat.categories[codes[starts]]
+        return {str(t): (int(a), int(b)) for t, a, b in zip(names, starts, stops)}
+
+    # -- per-ticker slices ------------------------------------------------
+
+    def _remember(self, ticker, df):
+        size = int(df.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+        self._slices[ticker] = (df, size)
+        self._slice_bytes += size
+        while self._slice_bytes > self.max_bytes:
+            _, (_, evicted) = self._slices.popitem(last=False)
+            self._slice_bytes -= evicted
+
+    def _slice(self, ticker):
+        if self._frame is not None:
+            bounds = self._index.get(ticker)
+            if bounds is None:
+                return self._frame.iloc[0:0]
+            self.hits += 1
+            return self._frame.iloc[bounds[0]:bounds[1]]
+        if ticker in self._slices:
+            self.hits += 1
+            self._slices.move_to_end(ticker)
+            return self._slices[ticker][0]
+        return None
+
+    def tickers_frame(self, tickers, columns=None, start=None, end=None):
+        """
+        Rows for `tickers` (in the given order), optionally restricted to
+        `columns` and to `start <= date < end`. Returns a new frame.
+        """
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        tickers = [str(t) for t in tickers]
+        with self._lock:
+            self._check_version()
+            parts = {t: self._slice(t) for t in tickers}
+            missing = [t for t, part in parts.items() if part is None]
+            if missing:
+                self.misses += len(missing)
+                fetched = read_store(self.dataset, tickers=missing)
+                for t, group in fetched.groupby("ticker", observed=True, sort=False):
+                    group = group.reset_index(drop=True)
+                    self._remember(str(t), group)
+                    parts[str(t)] = group
+                for t in missing:
+                    if parts[t] is None:
+                        # Remember unknown tickers too so they don't re-hit the store
+                        parts[t] = fetched.iloc[0:0]
+                        self._remember(t, parts[t])
+
+        if not tickers:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat([self._window(parts[t], start, end) for t in tickers], ignore_index=True)
+        df["ticker"] = df["ticker"].astype(str).astype("category")
+        if columns is not None:
+            df = df[list(columns)]
+        return df
+
+    def ticker_frame(self, ticker, columns=None, start=None, end=None):
+        """Rows for one ticker; see `tickers_frame`."""
+        return self.tickers_frame([ticker], columns=columns, start=start, end=end)
+
+    @staticmethod
+    def _window(df, start, end):
+        if start is None and end is None:
+            return df
+        lo = 0 if start is None else df["date"].searchsorted(to_utc(start), side="left")
+        hi = len(df) if end is None else df["date"].searchsorted(to_utc(end), side="left")
+        return df.iloc[lo:hi]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "dataset": self.dataset,
+                "version": self._version,
+                "frame_loaded": self._frame is not None,
+                "cached_slices": len(self._slices),
+                "cached_bytes": self._slice_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_CACHES = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_dataset(dataset="processed"):
+    """Return the shared `DatasetCache` for `dataset` ('raw' or 'processed')."""
+    with _CACHES_LOCK:
+        if dataset not in _CACHES:
+            _CACHES[dataset] = DatasetCache(dataset)
+        return _CACHES[dataset]
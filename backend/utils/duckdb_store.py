@@ -0,0 +1,308 @@
+"""
+DuckDB query layer over the processed store.
+
+The processed parquet store is loaded into one `prices` table (sorted by
+ticker and date, indexed on both) in the persistent database at
+DUCKDB_PATH, reloaded whenever the store version changes. The analytics
+tools run as SQL against it, so they execute out-of-core on all cores.
+
+A DuckDB file has a single writer. When another process already holds it
+(e.g. forecast workers next to the main process) the connection falls back
+to an in-memory database where `prices` is a view over the parquet files,
+so the same SQL still works.
+
+Select it with QUERY_ENGINE=duckdb (default: pandas). Benchmark against the
+pandas paths from frontend/:
+
+    python ../backend/utils/duckdb_store.py --benchmark
+"""
+import pathlib
+import sys
+import os
+import time
+import argparse
+import threading
+import duckdb
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import store_path, store_version, to_utc
+
+DUCKDB_PATH = "../backend/input/stock_data.db"
+QUERY_ENGINE = os.getenv("QUERY_ENGINE", "pandas").lower()
+
+_con = None
+_persistent = False
+_loaded_version = None
+_lock = threading.Lock()
+
+
+def use_duckdb():
+    return QUERY_ENGINE == "duckdb"
+
+
+def _parquet_glob(dataset="processed"):
+    return os.path.join(store_path(dataset), "*", "*.parquet").replace("\\", "/")
+
+
+def _source(dataset="processed"):
+    return f"read_parquet('{_parquet_glob(dataset)}', hive_partitioning = true)"
+
+
+def _load_prices(con, version):
+    """(Re)build the `prices` table from the processed store."""
+    con.execute("BEGIN TRANSACTION")
+    con.execute(f"CREATE OR REPLACE TABLE prices AS SELECT * FROM {_source()} ORDER BY ticker, date")
+    con.execute("CREATE INDEX IF NOT EXISTS idx_prices_ticker_date ON prices (ticker, date)")
+    con.execute("CREATE TABLE IF NOT EXISTS meta (key VARCHAR PRIMARY KEY, value VARCHAR)")
+    con.execute("INSERT OR REPLACE INTO meta VALUES ('source_version', ?)", [version])
+    con.execute("COMMIT")
+
+
+def _stored_version(con):
+    try:
+        row = con.execute("SELECT value FROM meta WHERE key = 'source_version'").fetchone()
+    except duckdb.CatalogException:
+        return None
+    return row[0] if row else None
+
+
+def get_connection():
+    """
+    Cursor on the shared connection with an up-to-date `prices` relation.
+    Each call returns a new cursor, so threads can query concurrently.
+    """
+    global _con, _persistent, _loaded_version
+    with _lock:
+        version = store_version("processed")
+        if version is None:
+            raise FileNotFoundError("No 'processed' store - run collect/preprocess first")
+        if _con is None:
+            try:
+                os.makedirs(os.path.dirname(DUCKDB_PATH), exist_ok=True)
+                _con = duckdb.connect(DUCKDB_PATH)
+                _persistent = True
+            except duckdb.Error:
+                # Another process (or connection) owns the database file; query the parquet store directly
+                _con = duckdb.connect()
+                _con.execute(f"CREATE VIEW prices AS SELECT * FROM {_source()}")
+                _persistent = False
+        if _persistent and version != _loaded_version:
+            if _stored_version(_con) != version:
+                start = time.perf_counter()
+                _load_prices(_con, version)
+                print(f"✓ Loaded prices into {DUCKDB_PATH} ({time.perf_counter() - start:.2f}s)")
+            _loaded_version = version
+        return _con.cursor()
+
+
+def query(sql, params=None):
+    """Run `sql` with bound `params` and return a DataFrame."""
+    return get_connection().execute(sql, params or []).df()
+
+
+def _categorize(df):
+    if "ticker" in df.columns:
+        df["ticker"] = df["ticker"].astype(str).astype("category")
+    return df
+
+
+def show_ticker(tickers):
+    """All processed rows of `tickers`, sorted by ticker and date."""
+    df = query(
+        "SELECT * FROM prices WHERE ticker IN (SELECT unnest(?)) ORDER BY ticker, date",
+        [[str(t) for t in tickers]],
+    )
+    return _categorize(df)
+
+
+def ticker_statistics(tickers, year=2020):
+    """Highest/lowest price over the full history and growth (%) within `year`, per ticker."""
+    start, end = pd.Timestamp(f"{year}-01-01", tz="UTC"), pd.Timestamp(f"{year + 1}-01-01", tz="UTC")
+    return query(
+        f"""
+        WITH wanted AS (SELECT unnest(?) AS ticker),
+        overall AS (
+            SELECT ticker, max(high) AS highest_price, min(low) AS lowest_price
+            FROM prices WHERE ticker IN (SELECT ticker FROM wanted)
+            GROUP BY ticker
+        ),
+        in_year AS (
+            SELECT ticker, arg_min(close, date) AS first_close, arg_max(close, date) AS last_close
+            FROM prices
+            WHERE ticker IN (SELECT ticker FROM wanted) AND date >= ? AND date < ?
+            GROUP BY ticker
+        )
+        SELECT overall.ticker, highest_price, lowest_price,
+               (last_close - first_close) / first_close * 100 AS growth_{int(year)}_percent
+        FROM overall LEFT JOIN in_year USING (ticker)
+        ORDER BY overall.ticker
+        """,
+        [[str(t) for t in tickers], start.to_pydatetime(), end.to_pydatetime()],
+    )
+
+
+def sector_map():
+    """Most frequent industry_tag per ticker (ties to the alphabetically first tag)."""
+    df = query(
+        """
+        SELECT ticker, industry_tag FROM (
+            SELECT ticker, industry_tag,
+                   row_number() OVER (PARTITION BY ticker ORDER BY count(*) DESC, industry_tag) AS rank
+            FROM prices WHERE industry_tag IS NOT NULL
+            GROUP BY ticker, industry_tag
+        ) WHERE rank = 1
+        ORDER BY ticker
+        """
+    )
+    return dict(zip(df["ticker"], df["industry_tag"]))
+
+
+def first_trading_day(ticker, target_month="2025-01"):
+    """(first_date 'YYYY-MM-DD', close) of `ticker` in `target_month`, or (None, None)."""
+    month_start = to_utc(f"{target_month}-01")
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    row = get_connection().execute(
+        "SELECT date, close FROM prices WHERE ticker = ? AND date >= ? AND date < ? ORDER BY date LIMIT 1",
+        [str(ticker), month_start.to_pydatetime(), month_end.to_pydatetime()],
+    ).fetchone()
+    if row is None:
+        return None, None
+    return str(pd.Timestamp(row[0]).tz_convert("UTC").date()), float(row[1])
+
+
+def first_trading_days(tickers, target_month="2025-01"):
+    """{ticker: (first_date 'YYYY-MM-DD', close)} in `target_month` for many tickers in one query."""
+    month_start = to_utc(f"{target_month}-01")
+    month_end = month_start + pd.offsets.MonthBegin(1)
+    rows = get_connection().execute(
+        "SELECT ticker, arg_min(date, date), arg_min(close, date) FROM prices "
+        "WHERE ticker IN (SELECT unnest(?)) AND date >= ? AND date < ? GROUP BY ticker",
+        [[str(t) for t in tickers], month_start.to_pydatetime(), month_end.to_pydatetime()],
+    ).fetchall()
+    return {
+        str(ticker): (str(pd.Timestamp(date).tz_convert("UTC").date()), float(close))
+        for ticker, date, close in rows
+    }
+
+
+_CONTEXT_SQL = """
+    WITH ranked AS (
+        SELECT ticker, date, close, volume, "return",
+               row_number() OVER (PARTITION BY ticker ORDER BY date DESC) AS rn
+        FROM prices
+        WHERE ticker IN (SELECT unnest(?))
+    )
+    SELECT ticker,
+           max(date) AS last_date,
+           list(close ORDER BY date DESC) FILTER (WHERE rn <= ?) AS latest_closes,
+           avg(volume) AS avg_volume,
+           avg(volume) FILTER (WHERE rn <= 21) AS avg_volume_21d,
+           max(close) FILTER (WHERE rn <= 252) AS high_52w,
+           min(close) FILTER (WHERE rn <= 252) AS low_52w,
+           stddev_samp("return") FILTER (WHERE rn <= 21) AS volatility_21d,
+           max(close) FILTER (WHERE rn = 1) / max(close) FILTER (WHERE rn = 22) - 1 AS return_21d,
+           count(*) AS rows
+    FROM ranked
+    GROUP BY ticker
+    ORDER BY ticker
+"""
+
+# Context rows already fetched, keyed by (store version, n_last) and then by ticker.
+_context_cache = {}
+
+
+def rag_context(tickers, n_last=5):
+    """
+    Retrieval context for every ticker in one windowed query: the `n_last`
+    latest closes (newest first), average volume (all rows and last 21),
+    52-week high/low, 21-day volatility and return, last date and row count.
+    Results are cached per store version; only tickers not cached yet are
+    queried. Returns {ticker: dict}; unknown tickers are left out.
+    """
+    version = store_version("processed")
+    with _lock:
+        cached = _context_cache.setdefault((version, n_last), {})
+        for key in [k for k in _context_cache if k[0] != version]:
+            del _context_cache[key]
+        missing = [str(t) for t in dict.fromkeys(tickers) if str(t) not in cached]
+
+    if missing:
+        df = query(_CONTEXT_SQL, [missing, n_last])
+        rows = {}
+        for record in df.to_dict(orient="records"):
+            record["last_date"] = str(pd.Timestamp(record["last_date"]).tz_convert("UTC").date())
+            record["latest_closes"] = [float(c) for c in record["latest_closes"]]
+            ticker = record.pop("ticker")
+            rows[ticker] = {
+                k: (None if isinstance(v, float) and pd.isna(v) else v) for k, v in record.items()
+            }
+        with _lock:
+            cached.update(rows)
+    return {str(t): cached[str(t)] for t in tickers if str(t) in cached}
+
+
+def benchmark(tickers=None, year=2020, repeats=3):
+    """
+    Time the pandas full-scan paths against the SQL ones on the whole
+    processed store. Returns {operation: (pandas_s, duckdb_s)}.
+    """
+    from backend.utils.data_store import read_store
+
+    get_connection()  # load once, outside the timings
+    if tickers is None:
+        tickers = query("SELECT DISTINCT ticker FROM prices ORDER BY ticker")["ticker"].tolist()
+    sample = tickers[:5]
+    month = f"{year}-06"
+
+    def pandas_statistics():
+        df = read_store("processed", tickers=tickers, columns=["ticker", "date", "high", "low", "close"])
+        by_ticker = df.groupby("ticker", observed=True)
+        y = df[df.date.dt.year == year].groupby("ticker", observed=True)["close"]
+        return by_ticker["high"].max(), by_ticker["low"].min(), (y.last() - y.first()) / y.first() * 100
+
+    def pandas_sector_map():
+        df = read_store("processed", columns=["ticker", "industry_tag"])
+        return df.groupby("ticker", observed=True)["industry_tag"].agg(lambda x: x.value_counts().idxmax())
+
+    def pandas_first_days():
+        for t in sample:
+            df = read_store("processed", tickers=[t], columns=["date", "close"],
+                            start=f"{month}-01", end=pd.Timestamp(f"{month}-01") + pd.offsets.MonthBegin(1))
+            df.sort_values("date").head(1)
+
+    cases = {
+        "show_ticker": (lambda: read_store("processed", tickers=sample), lambda: show_ticker(sample)),
+        "compute_statistics": (pandas_statistics, lambda: ticker_statistics(tickers, year)),
+        "sector_map": (pandas_sector_map, sector_map),
+        "first_trading_day x5": (pandas_first_days, lambda: [first_trading_day(t, month) for t in sample]),
+    }
+    results = {}
+    for name, (pandas_fn, sql_fn) in cases.items():
+        timings = []
+        for fn in (pandas_fn, sql_fn):
+            best = float("inf")
+            for _ in range(repeats):
+                start = time.perf_counter()
+                fn()
+                best = min(best, time.perf_counter() - start)
+            timings.append(round(best, 4))
+        results[name] = tuple(timings)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="DuckDB query layer over the processed store.")
+    parser.add_argument("--benchmark", action="store_true")
+    parser.add_argument("--year", type=int, default=2020)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.benchmark:
+        print(f"{'operation':<22}{'pandas (s)':>12}{'duckdb (s)':>12}")
+        for name, (pandas_s, duckdb_s) in benchmark(year=args.year, repeats=args.repeats).items():
+            print(f"{name:<22}{pandas_s:>12}{duckdb_s:>12}")
+    else:
+        get_connection()
+        print(query("SELECT count(*) AS rows, count(DISTINCT ticker) AS tickers FROM prices").to_string(index=False))
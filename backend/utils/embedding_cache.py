@@ -0,0 +1,221 @@
+"""
+Persistent embedding cache.
+
+Vectors are stored per model under EMBEDDING_CACHE_DIR/<model>/ in two
+append-only files:
+
+- vectors.f32 holds a float32 matrix, read through a memory map;
+- keys.txt holds the SHA-1 of each row's text, one per line; the line number
+  is the row.
+
+`EmbeddingCache` wraps an embedder (anything with `model_name` and
+`encode(texts)`). It only sends texts it has never seen to the model, in
+batches of `batch_size`, so re-ingesting unchanged history costs a hash
+lookup per document. Vectors are appended before their keys; rows left
+incomplete by an interrupted run are cut off on the next load.
+
+Several processes (job workers, the app, the CLI) may share a cache, so
+loading and appending happen under an exclusive lock on the model's
+cache.lock file. It is taken once per `encode` call that has misses; the
+rows other processes have added since are read in first (only when the
+vectors file has grown), then every missing batch is embedded and appended.
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/embedding_cache.py
+"""
+import os
+import sys
+import json
+import hashlib
+import argparse
+import contextlib
+import pathlib
+import threading
+import numpy as np
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+EMBEDDING_CACHE_DIR = "../backend/outputs/embedding_cache"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+VECTORS_FILE = "vectors.f32"
+KEYS_FILE = "keys.txt"
+META_FILE = "meta.json"
+LOCK_FILE = "cache.lock"
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def _slug(model_name):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+
+
+@contextlib.contextmanager
+def _exclusive(path):
+    """Hold an exclusive lock on `path` across processes."""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                    continue
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class EmbeddingCache:
+    def __init__(self, embedder, root=EMBEDDING_CACHE_DIR, batch_size=EMBED_BATCH_SIZE):
+        self.embedder = embedder
+        self.model_name = embedder.model_name
+        self.batch_size = batch_size
+        self.dir = os.path.join(root, _slug(self.model_name))
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._rows = {}
+        self.dim = None
+        if os.path.isdir(self.dir):
+            with self._file_lock():
+                self._load()
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _file_lock(self):
+        os.makedirs(self.dir, exist_ok=True)
+        return _exclusive(self._path(LOCK_FILE))
+
+    def _load(self):
+        """(Re)read the rows on disk; call with the file lock held."""
+        if not os.path.exists(self._path(META_FILE)):
+            return
+        with open(self._path(META_FILE), "r") as f:
+            self.dim = json.load(f)["dim"]
+        if not os.path.exists(self._path(VECTORS_FILE)):
+            open(self._path(VECTORS_FILE), "ab").close()
+        keys = []
+        if os.path.exists(self._path(KEYS_FILE)):
+            with open(self._path(KEYS_FILE), "r") as f:
+                keys = [k for k in f.read().split("\n") if len(k) == 40]
+        n_vectors = os.path.getsize(self._path(VECTORS_FILE)) // (4 * self.dim)
+        n_rows = min(len(keys), n_vectors)
+        if n_rows != len(keys) or n_rows * 4 * self.dim != os.path.getsize(self._path(VECTORS_FILE)):
+            # An interrupted write left rows without a key or vector: cut both files back to the complete rows
+            with open(self._path(VECTORS_FILE), "r+b") as f:
+                f.truncate(n_rows * 4 * self.dim)
+            with open(self._path(KEYS_FILE), "w") as f:
+                f.write("".join(f"{key}\n" for key in keys[:n_rows]))
+        self._rows = {key: row for row, key in enumerate(keys[:n_rows])}
+        self._map(n_rows)
+
+    def _map(self, n_rows):
+        self._matrix = (
+            np.memmap(self._path(VECTORS_FILE), dtype=np.float32, mode="r", shape=(n_rows, self.dim))
+            if n_rows else None
+        )
+
+    def _sync(self):
+        """Pick up rows other processes appended since the last load; call with the file lock held."""
+        vectors = self._path(VECTORS_FILE)
+        if self.dim is None or not os.path.exists(vectors) or os.path.getsize(vectors) != len(self._rows) * 4 * self.dim:
+            self._load()
+
+    def _append(self, keys, vectors):
+        """Append rows after the ones on disk; call with the file lock held, after _sync()."""
+        if self.dim is None:
+            self.dim = int(vectors.shape[1])
+            with open(self._path(META_FILE), "w") as f:
+                json.dump({"model": self.model_name, "dim": self.dim}, f, indent=4)
+        start = len(self._rows)
+        with open(self._path(VECTORS_FILE), "ab") as f:
+            f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        with open(self._path(KEYS_FILE), "a") as f:
+            f.write("".join(f"{key}\n" for key in keys))
+        self._rows.update({key: start + i for i, key in enumerate(keys)})
+
+    def encode(self, texts):
+        """float32 matrix with one row per text; only uncached texts reach the model."""
+        texts = list(texts)
+        keys = [text_hash(t) for t in texts]
+        with self._lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self._rows and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                # One lock per call: other processes' rows are read in once, then every batch is appended
+                with self._file_lock():
+                    self._sync()
+                    missing = {k: t for k, t in missing.items() if k not in self._rows}
+                    new_keys = list(missing)
+                    for i in range(0, len(new_keys), self.batch_size):
+                        batch = new_keys[i:i + self.batch_size]
+                        vectors = np.asarray(self.embedder.encode([missing[k] for k in batch]), dtype=np.float32)
+                        self._append(batch, vectors)
+                    self._map(len(self._rows))
+
+            self.misses += sum(1 for k in keys if k in missing)
+            self.hits += len(texts) - sum(1 for k in keys if k in missing)
+
+            if not texts:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            return np.array(self._matrix[[self._rows[k] for k in keys]])
+
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else None
+
+    def stats(self):
+        return {
+            "model": self.model_name,
+            "entries": len(self._rows),
+            "dim": self.dim,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio(), 3) if self.hit_ratio() is not None else None,
+        }
+
+
+def cache_stats(root=EMBEDDING_CACHE_DIR):
+    """Entry count and size of every model's cache under `root`."""
+    stats = {}
+    if not os.path.isdir(root):
+        return stats
+    for name in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, name, META_FILE)
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        size = os.path.getsize(os.path.join(root, name, VECTORS_FILE))
+        stats[meta["model"]] = {"entries": size // (4 * meta["dim"]), "dim": meta["dim"], "mb": round(size / 1e6, 2)}
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show the embedding cache.")
+    parser.add_argument("--root", default=EMBEDDING_CACHE_DIR)
+    args = parser.parse_args()
+    for model, info in cache_stats(args.root).items():
+        print(f"{model:<50} entries={info['entries']:<8} dim={info['dim']:<5} {info['mb']}MB")
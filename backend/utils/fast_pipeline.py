@@ -0,0 +1,151 @@
+"""
+Deterministic fast path for the analysis pipeline.
+
+The crew in agent_main_call.py lets an LLM decide when to call each tool, so
+the collect → preprocess → fetch → statistics → forecast steps cost several
+Gemini round trips before any real work happens. This runner calls the same
+tool functions directly. Each stage starts as soon as the stages it depends
+on have finished, so independent steps run side by side. The LLM is only
+used for the final recommendation stage:
+
+    collect → preprocess ─┬→ sector_map → statistics ─┬→ recommend
+                          └→ sequences* → forecast   ─┘
+
+"sequences" is a cache warm-up: it loads the selected tickers into this
+process's shared dataset cache, which the forecast step builds its training
+windows from. When the forecast runs in spawned worker processes
+(FORECAST_WORKERS > 1 for more than one ticker) they cannot see that cache, so
+the stage is left out and forecast follows preprocess directly.
+
+Every stage's start time and duration are printed, and saved with the
+recommendations as artifacts of the current run (pipeline_timings.json and
+crew_result.json). Use it through run_crew(..., fast=True) or:
+
+    python ../backend/agent_main_call.py --symbols AAPL,MSFT --user_pov "..." --fast
+"""
+import os
+import re
+import sys
+import time
+import pathlib
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.agent_tools import (
+    collect, preprocess, show_ticker,
+    generate_sector_map, compute_statistics,
+    forecast_prices
+)
+from backend.utils.artifact_store import get_artifact_store, current_run_id
+
+STAGE_WORKERS = 2  # widest level of the DAG
+LABEL_PATTERN = re.compile(r"\b(buy|hold|sell)\b", re.IGNORECASE)
+
+
+def _forecast_in_process(tickers):
+    """Whether train_and_forecast will run in this process (and so can use its dataset cache)."""
+    if os.getenv("FORECAST_MODE", "per_ticker") == "global":
+        return True
+    return min(int(os.getenv("FORECAST_WORKERS", "1")), len(tickers)) <= 1
+
+
+def build_stages(tickers, user_pov):
+    """{stage: (dependencies, fn(results))}; `results` maps finished stages to their return values."""
+
+    def recommend(results):
+        # Imported here: the agent sets up the LLM client
+        from backend.agents.llm_recommendation_generator_and_rag import LLMRecommendationAgent
+
+        return LLMRecommendationAgent().generate_recommendations(tickers, user_pov)
+
+    stages = {
+        "collect":    ((), lambda results: collect.func()),
+        "preprocess": (("collect",), lambda results: preprocess.func()),
+        "sector_map": (("preprocess",), lambda results: generate_sector_map.func()),
+        "statistics": (("sector_map",), lambda results: compute_statistics.func()),
+        "forecast":   (("preprocess",), lambda results: forecast_prices.func(tickers)),
+        "recommend":  (("statistics", "forecast"), recommend),
+    }
+    if _forecast_in_process(tickers):
+        # Warm the dataset cache the in-process forecast reads from, alongside the sector map
+        stages["sequences"] = (("preprocess",), lambda results: show_ticker.func(tickers))
+        stages["forecast"] = (("sequences",), stages["forecast"][1])
+    return stages
+
+
+def _timed(fn, results):
+    started = time.perf_counter()
+    return fn(results), started, time.perf_counter() - started
+
+
+def run_stages(stages, max_workers=STAGE_WORKERS, on_stage=None):
+    """
+    Run `stages` in dependency order, each as soon as its dependencies are
+    done. Returns (results, timings) where timings maps each stage to its
+    start offset and duration in seconds. `on_stage(done, total, name)` is
+    called after each stage. A failing stage stops the run: stages already
+    running finish, the rest are skipped and the error is raised.
+    """
+    pending = dict(stages)
+    missing = {d for deps, _ in pending.values() for d in deps} - set(pending)
+    if missing:
+        raise ValueError(f"Unknown stage dependencies: {sorted(missing)}")
+
+    results, timings, running = {}, {}, {}
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while pending or running:
+            ready = [name for name, (deps, _) in pending.items() if all(d in results for d in deps)]
+            if not ready and not running:
+                raise ValueError(f"Stage dependency cycle among: {sorted(pending)}")
+            for name in ready:
+                _, fn = pending.pop(name)
+                # Each stage gets a snapshot of the results it may read
+                running[pool.submit(_timed, fn, dict(results))] = name
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                results[name], started, elapsed = future.result()
+                timings[name] = {"start_s": round(started - t0, 3), "duration_s": round(elapsed, 3)}
+                print(f"   ✓ {name} finished in {elapsed:.2f}s")
+                if on_stage:
+                    on_stage(len(results), len(stages), name)
+    timings["total"] = {"start_s": 0.0, "duration_s": round(time.perf_counter() - t0, 3)}
+    return results, timings
+
+
+def _recommendation_items(recommendations, forecasts):
+    """Recommendation entries in the crew's output shape: [{ticker, recommendation, reasoning, forecast}]."""
+    items = []
+    for ticker, entry in recommendations.items():
+        text = entry.get("recommendation") or entry.get("error") or ""
+        label = LABEL_PATTERN.search(text)
+        items.append({
+            "ticker": ticker,
+            "recommendation": label.group(1).capitalize() if label else "N/A",
+            "reasoning": text,
+            "forecast": forecasts.get(ticker, {}),
+        })
+    return items
+
+
+def run_fast_pipeline(tickers, user_pov, on_stage=None, max_workers=STAGE_WORKERS):
+    """Run the pipeline without LLM orchestration; returns the recommendation list saved as crew_result.json."""
+    print(f"⚡ Running fast pipeline for {', '.join(tickers)} ...")
+    results, timings = run_stages(build_stages(tickers, user_pov), max_workers, on_stage)
+
+    forecasts = results["forecast"] if isinstance(results["forecast"], dict) else {}
+    items = _recommendation_items(results["recommend"], forecasts)
+
+    store = get_artifact_store()
+    store.put_json("crew_result.json", items, indent=2)
+    store.put_json("pipeline_timings.json", timings)
+
+    print("\nStage timings:")
+    for name, timing in timings.items():
+        print(f"   {name:<12} start {timing['start_s']:>8.2f}s  took {timing['duration_s']:>8.2f}s")
+    print(f"📁 Recommendations and timings saved to run '{current_run_id()}'")
+    return items
@@ -0,0 +1,214 @@
+"""
+Rolling feature engine for the processed dataset.
+
+Rows are expected sorted by (ticker, date), so every ticker is one contiguous
+segment. Each indicator is a NumPy kernel over the whole column that gets
+the segment layout (start of each row's segment and the row's position in
+it) and returns NaN where the window would cross into another ticker, so
+all tickers are computed in one pass without per-group Python callbacks.
+
+New indicators are registered declaratively:
+
+    @indicator("sma_50", lookback=50)
+    def sma_50(close, seg):
+        return rolling_mean(close, seg, 50)
+
+Compare against the previous groupby/transform implementation from frontend/:
+
+    python ../backend/utils/features.py --benchmark
+"""
+import pathlib
+import sys
+import time
+import argparse
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+BASE_COLUMNS = ['date', 'ticker', 'open', 'high', 'low', 'close', 'volume', 'industry_tag']
+
+Indicator = namedtuple("Indicator", ["name", "column", "lookback", "kernel"])
+Segments = namedtuple("Segments", ["start", "pos"])
+
+INDICATORS = {}
+
+
+def indicator(name, column="close", lookback=1):
+    """Register `kernel(values, segments)` as feature `name` computed from `column`."""
+    def register(kernel):
+        INDICATORS[name] = Indicator(name, column, lookback, kernel)
+        return kernel
+    return register
+
+
+def segments(tickers):
+    """Segment layout of a ticker column sorted by ticker: per-row segment start and position."""
+    codes = pd.factorize(np.asarray(tickers))[0]
+    n = len(codes)
+    is_start = np.ones(n, dtype=bool)
+    is_start[1:] = codes[1:] != codes[:-1]
+    starts = np.flatnonzero(is_start)
+    seg_id = np.cumsum(is_start) - 1
+    start = starts[seg_id] if n else np.zeros(0, dtype=np.int64)
+    return Segments(start, np.arange(n) - start)
+
+
+def rolling_mean(values, seg, window):
+    """Trailing mean from a cumulative sum that restarts at every segment."""
+    n = len(values)
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+    # Subtract each segment's total at the next segment's start so the running sum stays small
+    firsts = np.flatnonzero(seg.pos == 0)
+    d = values.astype(np.float64)
+    d[firsts[1:]] -= np.add.reduceat(values, firsts)[:-1]
+    cs = np.concatenate([[0.0], np.cumsum(d)])
+    ok = seg.pos >= window - 1
+    i = np.flatnonzero(ok)
+    out[i] = (cs[i + 1] - cs[i + 1 - window]) / window
+    # The window starting exactly at a segment start would subtract the previous segment's correction
+    first = i[seg.pos[i] == window - 1]
+    out[first] = (cs[first + 1] - cs[first + 1 - window] - d[first + 1 - window]
+                  + values[first + 1 - window]) / window
+    return out
+
+
+def rolling_std(values, seg, window):
+    """
+    Trailing sample std (ddof=1) over strided windows; the sum-of-squares
+    form of a cumulative kernel cancels badly on large prices.
+    """
+    out = np.full(len(values), np.nan)
+    if len(values) < window:
+        return out
+    std = sliding_window_view(values, window).std(axis=1, ddof=1)
+    ok = seg.pos[window - 1:] >= window - 1
+    out[window - 1:][ok] = std[ok]
+    return out
+
+
+def pct_change(values, seg):
+    out = np.full(len(values), np.nan)
+    ok = seg.pos[1:] > 0
+    out[1:][ok] = values[1:][ok] / values[:-1][ok] - 1
+    return out
+
+
+@indicator("sma_5", lookback=5)
+def _sma_5(close, seg):
+    return rolling_mean(close, seg, 5)
+
+
+@indicator("sma_10", lookback=10)
+def _sma_10(close, seg):
+    return rolling_mean(close, seg, 10)
+
+
+@indicator("sma_21", lookback=21)
+def _sma_21(close, seg):
+    return rolling_mean(close, seg, 21)
+
+
+@indicator("std_5", lookback=5)
+def _std_5(close, seg):
+    return rolling_std(close, seg, 5)
+
+
+@indicator("return", lookback=2)
+def _return(close, seg):
+    return pct_change(close, seg)
+
+
+FEATURE_COLUMNS = list(INDICATORS)
+OUTPUT_COLUMNS = BASE_COLUMNS + FEATURE_COLUMNS
+
+# Rows of history the widest indicator needs before it is defined.
+LOOKBACK = max(ind.lookback for ind in INDICATORS.values())
+
+
+def fill_missing(df):
+    """Forward- then back-fill gaps within each ticker. Expects rows sorted by (ticker, date)."""
+    grouped = df.groupby('ticker', observed=True, sort=False)
+    filled = grouped.ffill()
+    filled = filled.groupby(df['ticker'], observed=True, sort=False).bfill()
+    filled.insert(df.columns.get_loc('ticker'), 'ticker', df['ticker'])
+    return filled.reset_index(drop=True)
+
+
+def add_features(df, indicators=None):
+    """
+    Add every registered indicator (or just `indicators`, a list of names)
+    in one pass. Expects rows sorted by (ticker, date).
+    """
+    seg = segments(df['ticker'])
+    columns = {}
+    for name in indicators or INDICATORS:
+        ind = INDICATORS[name]
+        if ind.column not in columns:
+            columns[ind.column] = df[ind.column].to_numpy(dtype=np.float64)
+        df[name] = ind.kernel(columns[ind.column], seg)
+    return df
+
+
+def _legacy_add_features(df):
+    """The groupby/transform implementation this engine replaced; kept for benchmarking."""
+    df = df.groupby('ticker', observed=True).apply(lambda g: g.ffill().bfill()).reset_index(drop=True)
+    df['sma_5'] = df.groupby('ticker', observed=True)['close'].transform(lambda x: x.rolling(window=5).mean())
+    df['sma_10'] = df.groupby('ticker', observed=True)['close'].transform(lambda x: x.rolling(window=10).mean())
+    df['sma_21'] = df.groupby('ticker', observed=True)['close'].transform(lambda x: x.rolling(window=21).mean())
+    df['std_5'] = df.groupby('ticker', observed=True)['close'].transform(lambda x: x.rolling(window=5).std())
+    df['return'] = df.groupby('ticker', observed=True)['close'].pct_change()
+    return df
+
+
+def benchmark(df=None, repeats=3):
+    """
+    Time the legacy and vectorized feature steps (fill + indicators) on `df`
+    (default: the raw store) and check that they agree. Returns a dict.
+    """
+    if df is None:
+        from backend.utils.dataset_cache import get_dataset
+        df = get_dataset("raw").frame()
+    df = df.dropna(subset=['close']).sort_values(['ticker', 'date']).reset_index(drop=True)
+
+    def timed(fn):
+        best, out = float("inf"), None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            out = fn(df.copy())
+            best = min(best, time.perf_counter() - start)
+        return best, out
+
+    legacy_s, legacy = timed(_legacy_add_features)
+    vector_s, vector = timed(lambda d: add_features(fill_missing(d)))
+    diff = max(
+        float(np.nanmax(np.abs(legacy[c].to_numpy(float) - vector[c].to_numpy(float)), initial=0.0))
+        for c in FEATURE_COLUMNS
+    )
+    return {
+        "rows": len(df),
+        "tickers": int(df['ticker'].nunique()),
+        "legacy_seconds": round(legacy_s, 4),
+        "vectorized_seconds": round(vector_s, 4),
+        "speedup": round(legacy_s / vector_s, 1) if vector_s else None,
+        "max_abs_diff": diff,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Feature engine utilities.")
+    parser.add_argument("--benchmark", action="store_true", help="compare against the legacy implementation")
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    if args.benchmark:
+        for key, value in benchmark(repeats=args.repeats).items():
+            print(f"{key:>20}: {value}")
+    else:
+        print("Registered indicators:")
+        for ind in INDICATORS.values():
+            print(f"   • {ind.name} (from {ind.column}, lookback {ind.lookback})")
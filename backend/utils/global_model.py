@@ -0,0 +1,182 @@
+import pathlib
+import sys
+import os
+import json
+import numpy as np
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
+BACKEND_DIR = BASE_DIR / "backend"
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.models.lstm import build_global_lstm_model
+from backend.models.mlp import build_global_mlp_model
+from backend.utils.data_processor import (
+    get_first_trading_day_and_price, inverse_scale_close_only, _coerce_params, _optimizer,
+    SEQUENCE_LENGTH,
+)
+from backend.utils.dataset_cache import get_dataset
+from backend.utils.data_store import list_tickers
+from backend.utils.model_registry import ModelRegistry, row_hashes
+from backend.utils.sequence_generator import (
+    FEATURES, generate_sequences_batch, load_feature_frame, build_sequences
+)
+
+SECTOR_MAP_PATH = "../backend/outputs/ticker_sector_map.json"
+GLOBAL_KEY = "_global_"
+DEFAULT_PARAMS = {"units": 64, "batch_size": 256, "optimizer": "adam"}
+EPOCHS = 10
+# Comma-separated tickers the global model is trained on; default: every ticker in the processed store
+GLOBAL_TRAINING_TICKERS = os.getenv("GLOBAL_TRAINING_TICKERS", "")
+
+
+def load_sector_map(path=SECTOR_MAP_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def make_vocab(tickers, sector_map):
+    """Id tables for the embedding inputs; id 0 is reserved for unknown tickers/sectors."""
+    sectors = sorted({sector_map[t] for t in tickers if t in sector_map})
+    return {
+        "tickers": {t: i + 1 for i, t in enumerate(sorted(tickers))},
+        "sectors": {s: i + 1 for i, s in enumerate(sectors)},
+    }
+
+
+def encode(tickers, vocab, sector_map):
+    ticker_ids = np.array([vocab["tickers"].get(t, 0) for t in tickers], dtype=np.int32)
+    sector_ids = np.array(
+        [vocab["sectors"].get(sector_map.get(t), 0) for t in tickers], dtype=np.int32
+    )
+    return ticker_ids[:, None], sector_ids[:, None]
+
+
+def training_universe():
+    """
+    Tickers the global model is trained on. It does not depend on which
+    tickers a request forecasts, so every request shares one model (and one
+    registry fingerprint) until the data changes.
+    """
+    configured = [t.strip().upper() for t in GLOBAL_TRAINING_TICKERS.split(",") if t.strip()]
+    return sorted(configured or list_tickers("processed"))
+
+
+def _build(model_type, input_shape, vocab, params):
+    builder = build_global_lstm_model if model_type == "lstm" else build_global_mlp_model
+    model = builder(input_shape, len(vocab["tickers"]), len(vocab["sectors"]), params)
+    model.compile(optimizer=_optimizer(params), loss="mse")
+    return model
+
+
+def train_global_model(tickers, model_type, cutoff, params=None, registry=None, sector_map=None):
+    """
+    Fit one model on windows pooled across `tickers` (rows before `cutoff`),
+    each ticker scaled with its own StandardScaler. Returns (model, state)
+    where state holds the vocab and per-ticker scalers. A model trained on
+    the same rows and params is loaded from the registry instead.
+    """
+    params = _coerce_params(params or DEFAULT_PARAMS)
+    registry = registry or ModelRegistry()
+    sector_map = load_sector_map() if sector_map is None else sector_map
+
+    pooled = get_dataset("processed").tickers_frame(
+        tickers, columns=["ticker"] + FEATURES, end=cutoff
+    )
+    hashes = row_hashes(pooled)
+    entry, kind = registry.lookup(GLOBAL_KEY, model_type, params, hashes)
+    if kind == "hit":
+        print(f"      ↳ loaded global {model_type.upper()} model from registry")
+        return registry.load(entry)
+
+    X, y, offsets, scalers = generate_sequences_batch(
+        tickers, model_type, SEQUENCE_LENGTH, forecast_target_date=cutoff
+    )
+    vocab = make_vocab(tickers, sector_map)
+    row_tickers = np.repeat(np.asarray(tickers), np.diff(offsets))
+    ticker_ids, sector_ids = encode(row_tickers, vocab, sector_map)
+
+    print(f"   • training global {model_type.upper()} on {len(X)} windows from {len(tickers)} tickers")
+    model = _build(model_type, X.shape[1:] if model_type == "lstm" else X.shape, vocab, params)
+    model.fit(
+        [X, ticker_ids, sector_ids],
+        y,
+        epochs=EPOCHS,
+        batch_size=params["batch_size"],
+        shuffle=True,
+        verbose=0,
+    )
+
+    state = {"vocab": vocab, "scalers": scalers}
+    registry.save(GLOBAL_KEY, model_type, params, hashes, model, state, cutoff=str(cutoff))
+    return model, state
+
+
+def global_forecast(tickers, models, target_month="2025-01", sector_map=None):
+    """
+    Forecast the first trading day of `target_month` for every ticker with
+    the shared models ({model_type: (model, state)}), one predict call per
+    model. Tickers unseen at training time get a scaler fitted on their own
+    history and are identified by sector only.
+    """
+    sector_map = load_sector_map() if sector_map is None else sector_map
+    results, windows = {}, {m: [] for m in models}
+    served = []
+
+    for ticker in tickers:
+        target_date, actual_price = get_first_trading_day_and_price(ticker, target_month)
+        if actual_price is None:
+            print(f"No price found for {ticker} in {target_month}, skipping.")
+            continue
+        frame = load_feature_frame(ticker, forecast_target_date=target_date)
+        if len(frame) <= SEQUENCE_LENGTH:
+            continue
+        served.append(ticker)
+        results[ticker] = {"target_date": target_date, "actual_price": actual_price}
+        for model_type, (_, state) in models.items():
+            scaler = state["scalers"].get(ticker)
+            if scaler is None:
+                _, _, scaler = build_sequences(frame, model_type, SEQUENCE_LENGTH)
+                state["scalers"][ticker] = scaler
+            X, _, _ = build_sequences(
+                frame.iloc[-(SEQUENCE_LENGTH + 1):], model_type, SEQUENCE_LENGTH, scaler=scaler
+            )
+            windows[model_type].append(X[-1])
+
+    for model_type, (model, state) in models.items():
+        if not served:
+            break
+        ticker_ids, sector_ids = encode(served, state["vocab"], sector_map)
+        preds = model.predict_on_batch([np.stack(windows[model_type]), ticker_ids, sector_ids])
+        for ticker, scaled_pred in zip(served, np.asarray(preds).ravel()):
+            forecast = float(inverse_scale_close_only(state["scalers"][ticker], scaled_pred))
+            mse = (forecast - results[ticker]["actual_price"]) ** 2
+            results[ticker][model_type.upper()] = {
+                "forecast": forecast,
+                "mse": float(mse),
+                "rmse": float(np.sqrt(mse)),
+            }
+    return results
+
+
+def train_and_forecast_global(tickers, target_month="2025-01", param_cache=None, training_tickers=None):
+    """
+    Global-model counterpart of `train_and_forecast`: one LSTM and one MLP
+    are trained on `training_tickers` (default: `training_universe()`) and
+    serve every forecast. Params come from the param cache under "_global_"
+    when present.
+    """
+    param_cache = param_cache or {}
+    training_tickers = training_tickers or training_universe()
+    cutoff = pd.Timestamp(f"{target_month}-01", tz="UTC")
+    sector_map = load_sector_map()
+
+    models = {}
+    for model_type in ("lstm", "mlp"):
+        params = param_cache.get(GLOBAL_KEY, {}).get(model_type, DEFAULT_PARAMS)
+        models[model_type] = train_global_model(
+            training_tickers, model_type, cutoff, params, sector_map=sector_map
+        )
+    return global_forecast(tickers, models, target_month, sector_map)
@@ -0,0 +1,109 @@
+"""
+Incremental preprocessing.
+
+Keeps the last processed date of every ticker in a small state file next to
+the store. A run only takes raw rows newer than that date, recomputes the
+rolling features with the previous LOOKBACK processed rows as context, and
+appends the result to the processed store instead of rewriting it.
+"""
+import pathlib
+import sys
+import os
+import json
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import (
+    append_store, read_store, store_exists, store_version, normalize_types, STORE_ROOT, PROCESSED_CSV_PATH
+)
+from backend.utils.dataset_cache import get_dataset
+from backend.utils.ticker_stats import update_stats
+from backend.utils.sector_index import update_counts
+from backend.utils.features import (
+    fill_missing, add_features, BASE_COLUMNS, FEATURE_COLUMNS, OUTPUT_COLUMNS, LOOKBACK
+)
+
+STATE_PATH = os.path.join(STORE_ROOT, "preprocess_state.json")
+
+
+def last_dates(df):
+    """Last date per ticker of a processed frame, as ISO strings."""
+    if df.empty:
+        return {}
+    last = df.groupby(df["ticker"].astype(str))["date"].max()
+    return {t: d.isoformat() for t, d in last.items()}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=4, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_state(path=STATE_PATH):
+    """Last processed date per ticker; rebuilt from the processed store when the file is missing."""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            return {t: pd.Timestamp(d) for t, d in json.load(f).items()}
+    if not store_exists("processed"):
+        return {}
+    state = last_dates(read_store("processed", columns=["ticker", "date"]))
+    save_state(state, path)
+    return {t: pd.Timestamp(d) for t, d in state.items()}
+
+
+def _unprocessed_rows(raw, state):
+    """Raw rows dated after their ticker's last processed date (all rows for unseen tickers)."""
+    tickers = raw["ticker"].astype(str)
+    cutoff = tickers.map(state)
+    return raw[cutoff.isna() | (raw["date"] > pd.to_datetime(cutoff, utc=True))]
+
+
+def preprocess_incremental(new_rows=None, min_rows=20):
+    """
+    Process only the rows that arrived since the last run and append them to
+    the processed store. `new_rows` defaults to the raw-store rows newer than
+    each ticker's last processed date. Returns the appended rows.
+    """
+    state = load_state()
+    if new_rows is None:
+        new_rows = get_dataset("raw").frame()
+    new_rows = normalize_types(new_rows.copy())
+    new_rows = _unprocessed_rows(new_rows, state)
+    new_rows = new_rows.dropna(subset=["close"])[BASE_COLUMNS]
+    if new_rows.empty:
+        print("✓ Processed store is up to date")
+        return new_rows
+
+    # Context: the last LOOKBACK processed rows of every ticker that already has history
+    known = sorted(set(new_rows["ticker"].astype(str)) & set(state))
+    context = get_dataset("processed").tickers_frame(known, columns=BASE_COLUMNS) if known else None
+    if context is not None and not context.empty:
+        context = context.groupby("ticker", observed=True).tail(LOOKBACK)
+        context = context.assign(_new=False)
+    df = pd.concat([context, new_rows.assign(_new=True)], ignore_index=True)
+    df["ticker"] = df["ticker"].astype(str)
+
+    df = df.sort_values(by=["ticker", "date"]).reset_index(drop=True)
+    df = fill_missing(df)
+    df = add_features(df)
+    df = df[df["_new"].astype(bool)]
+
+    # Tickers seen for the first time still need `min_rows` records
+    counts = df["ticker"].value_counts()
+    df = df[df["ticker"].isin(state) | df["ticker"].map(counts).ge(min_rows)]
+    df = df.dropna(subset=FEATURE_COLUMNS)[OUTPUT_COLUMNS]
+
+    previous_version = store_version("processed")
+    df = append_store(df, "processed", csv_path=PROCESSED_CSV_PATH)
+    update_stats(df, previous_version)
+    update_counts(df, previous_version)
+    state = {t: d.isoformat() for t, d in state.items()}
+    state.update(last_dates(df))
+    save_state(state)
+    print(f"✓ Appended {len(df)} new rows for {df['ticker'].nunique()} tickers")
+    return df
@@ -0,0 +1,215 @@
+"""
+Persistent, content-addressed cache of LLM responses.
+
+A response is stored in a local SQLite file under the SHA-256 of the model
+name, the normalized prompt (common indentation removed, whitespace runs
+collapsed) and the generation settings, so re-running the pipeline on
+unchanged forecasts and analysis numbers costs no quota. Entries expire
+after LLM_CACHE_TTL_DAYS; once the stored responses exceed LLM_CACHE_MAX_MB
+the least recently used ones are evicted. Hit/miss/write/eviction counters
+are kept both for the current process and cumulatively in the database.
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/llm_cache.py stats
+    python ../backend/utils/llm_cache.py prune --max-age-days 3 --max-size-mb 10
+    python ../backend/utils/llm_cache.py clear
+"""
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import pathlib
+import textwrap
+import threading
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.llm_engine import model_id
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "../backend/outputs/llm_cache.sqlite")
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "7"))
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "50"))
+COUNTERS = ("hits", "misses", "writes", "evictions")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        key TEXT PRIMARY KEY,
+        model TEXT NOT NULL,
+        response TEXT NOT NULL,
+        bytes INTEGER NOT NULL,
+        created REAL NOT NULL,
+        last_used REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used);
+    CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+"""
+
+
+def normalize_prompt(prompt):
+    """Prompt text with indentation and whitespace differences removed."""
+    return re.sub(r"\s+", " ", textwrap.dedent(prompt)).strip()
+
+
+def cache_key(model, prompt, settings=None, backend="gemini"):
+    """`backend` keeps replies from stand-ins (e.g. StubLLM) apart from the real model's."""
+    payload = json.dumps(
+        {"model": model_id(model), "prompt": normalize_prompt(prompt), "settings": settings or {},
+         "backend": backend},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path=LLM_CACHE_PATH, ttl_days=LLM_CACHE_TTL_DAYS, max_mb=LLM_CACHE_MAX_MB):
+        self.path = path
+        self.ttl = ttl_days * 86400 if ttl_days is not None else None
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb is not None else None
+        self.session = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # One connection shared by the engine's threads; WAL lets other processes read while we write
+        self._con = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript(_SCHEMA)
+
+    def _count(self, name, n=1):
+        self.session[name] += n
+        self._con.execute(
+            "INSERT INTO counters VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, n),
+        )
+
+    def key(self, model, prompt, settings=None, backend="gemini"):
+        return cache_key(model, prompt, settings, backend)
+
+    def get(self, key):
+        """Cached response for `key`, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._con.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and row[1] < now - self.ttl:
+                self._con.execute("DELETE FROM responses WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self._count("misses")
+                return None
+            self._con.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, len(response.encode()), now, now),
+            )
+            self._count("writes")
+            if self.max_bytes is not None:
+                self._evict_to(self.max_bytes)
+
+    def _evict_to(self, max_bytes):
+        """Drop least recently used entries until the stored responses fit in `max_bytes`."""
+        total = self._con.execute("SELECT coalesce(sum(bytes), 0) FROM responses").fetchone()[0]
+        if total <= max_bytes:
+            return 0
+        removed = []
+        for key, size in self._con.execute("SELECT key, bytes FROM responses ORDER BY last_used"):
+            if total <= max_bytes:
+                break
+            removed.append((key,))
+            total -= size
+        self._con.executemany("DELETE FROM responses WHERE key = ?", removed)
+        self._count("evictions", len(removed))
+        return len(removed)
+
+    def prune(self, max_age_days=None, max_bytes=None):
+        """Remove entries older than `max_age_days` (default: the TTL), then evict down to `max_bytes`."""
+        max_age = max_age_days * 86400 if max_age_days is not None else self.ttl
+        removed = 0
+        with self._lock:
+            if max_age is not None:
+                removed = self._con.execute(
+                    "DELETE FROM responses WHERE created < ?", (time.time() - max_age,)
+                ).rowcount
+                self._count("evictions", removed)
+            max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+            if max_bytes is not None:
+                removed += self._evict_to(max_bytes)
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._con.execute("DELETE FROM responses")
+            self._con.execute("DELETE FROM counters")
+
+    def stats(self):
+        """Session and cumulative counters plus the current entry count and size."""
+        with self._lock:
+            entries, size = self._con.execute("SELECT count(*), coalesce(sum(bytes), 0) FROM responses").fetchone()
+            totals = dict(self._con.execute("SELECT name, value FROM counters").fetchall())
+        lookups = self.session["hits"] + self.session["misses"]
+        return {
+            "session": dict(self.session),
+            "session_hit_ratio": round(self.session["hits"] / lookups, 3) if lookups else None,
+            "total": {name: totals.get(name, 0) for name in COUNTERS},
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def close(self):
+        self._con.close()
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_response_cache(path=LLM_CACHE_PATH):
+    """Process-wide cache per database file, or None when disabled with LLM_CACHE=0."""
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = ResponseCache(path)
+        return _caches[path]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune the LLM response cache.")
+    parser.add_argument("--path", default=LLM_CACHE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats")
+    prune = sub.add_parser("prune")
+    prune.add_argument("--max-age-days", type=float)
+    prune.add_argument("--max-size-mb", type=float)
+    sub.add_parser("clear")
+    args = parser.parse_args(argv)
+
+    cache = ResponseCache(args.path)
+    if args.command == "stats":
+        stats = cache.stats()
+        total = stats["total"]
+        lookups = total["hits"] + total["misses"]
+        ratio = f"{total['hits'] / lookups:.1%}" if lookups else "n/a"
+        print(f"{stats['entries']} entries, {stats['bytes'] / 1e6:.2f}MB in {args.path}")
+        print(f"hits={total['hits']} misses={total['misses']} (hit ratio {ratio}) "
+              f"writes={total['writes']} evictions={total['evictions']}")
+    elif args.command == "prune":
+        max_bytes = args.max_size_mb * 1024 * 1024 if args.max_size_mb is not None else None
+        print(f"Removed {cache.prune(args.max_age_days, max_bytes)} entries")
+    else:
+        cache.clear()
+        print(f"Cleared {args.path}")
+
+
+if __name__ == "__main__":
+    main()
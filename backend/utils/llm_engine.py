@@ -0,0 +1,222 @@
+"""
+Concurrent, rate-limited LLM generation.
+
+`GenerationEngine` sends many prompts at once through an asyncio pool of at
+most `concurrency` in-flight requests. Every request first takes a token from
+the model's limiter (requests per minute as a token bucket, plus a daily
+budget), failed requests are retried with exponential backoff and jitter,
+and results are yielded as they complete so callers can stream partial
+output. With a `cache` (see llm_cache.py) prompts answered before are served
+locally without touching the quota.
+
+The backend is any callable `generate(prompt, model) -> str` (sync or async).
+By default it is Gemini through google.generativeai, with one model object per
+model name. `StubLLM` is a local stand-in for tests and offline runs
+(LLM_STUB=1).
+"""
+import os
+import time
+import random
+import asyncio
+import inspect
+import threading
+from collections import namedtuple
+
+# Free-tier quotas of the Gemini models used by the recommender.
+Quota = namedtuple("Quota", ["rpm", "rpd"])
+MODEL_QUOTAS = {
+    "gemini-2.0-flash": Quota(rpm=15, rpd=1500),
+    "gemini-1.5-pro": Quota(rpm=2, rpd=15),
+}
+DEFAULT_QUOTA = Quota(rpm=15, rpd=1500)
+
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "4"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF = float(os.getenv("LLM_BACKOFF", "2.0"))  # seconds before the first retry
+
+
+class QuotaExceeded(RuntimeError):
+    """The model's daily request budget is used up; retrying today will not help."""
+
+
+def model_id(model):
+    """'gemini/gemini-2.0-flash' (LiteLLM style) -> 'gemini-2.0-flash' (google.generativeai style)."""
+    return model.split("/", 1)[1] if model.startswith("gemini/") else model
+
+
+class RateLimiter:
+    """Token bucket of `rpm` requests per minute plus a budget of `rpd` requests per UTC day."""
+
+    def __init__(self, rpm, rpd=None, clock=time.monotonic):
+        self.capacity = float(rpm)
+        self.rate = rpm / 60.0
+        self.tokens = float(rpm)
+        self.rpd = rpd
+        self.clock = clock
+        self.updated = clock()
+        self.day = time.strftime("%Y-%m-%d", time.gmtime())
+        self.used_today = 0
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token if one is available; otherwise return the seconds to wait."""
+        with self._lock:
+            today = time.strftime("%Y-%m-%d", time.gmtime())
+            if today != self.day:
+                self.day, self.used_today = today, 0
+            if self.rpd is not None and self.used_today >= self.rpd:
+                raise QuotaExceeded(f"daily quota of {self.rpd} requests reached")
+            now = self.clock()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                self.used_today += 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self._take()
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(model):
+    """Process-wide limiter per model, so every engine shares the same quota."""
+    key = model_id(model)
+    with _limiters_lock:
+        if key not in _limiters:
+            quota = MODEL_QUOTAS.get(key, DEFAULT_QUOTA)
+            _limiters[key] = RateLimiter(quota.rpm, quota.rpd)
+        return _limiters[key]
+
+
+class GeminiBackend:
+    """google.generativeai with one GenerativeModel per model name."""
+
+    name = "gemini"
+
+    def __init__(self, api_key=None, generation_config=None):
+        import google.generativeai as genai
+
+        self._genai = genai
+        api_key = api_key or os.getenv("GEMINI_API_KEY")
+        if api_key:
+            genai.configure(api_key=api_key)
+        self.generation_config = generation_config
+        self._models = {}
+
+    async def __call__(self, prompt, model):
+        name = model_id(model)
+        if name not in self._models:
+            self._models[name] = self._genai.GenerativeModel(name, generation_config=self.generation_config)
+        response = await self._models[name].generate_content_async(prompt)
+        return response.text.strip() if response.text else "No response"
+
+
+class StubLLM:
+    """Local stand-in for an LLM: canned or templated replies with optional latency and failures."""
+
+    name = "stub"
+
+    def __init__(self, reply="Hold. Stub response for offline runs.", latency=0.0, fail_first=0):
+        self.reply = reply
+        self.latency = latency
+        self.fail_first = fail_first
+        self.calls = 0
+
+    async def __call__(self, prompt, model):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.calls <= self.fail_first:
+            raise RuntimeError("stub failure")
+        return self.reply(prompt) if callable(self.reply) else self.reply
+
+
+def default_backend(settings=None):
+    return StubLLM() if os.getenv("LLM_STUB") == "1" else GeminiBackend(generation_config=settings)
+
+
+class GenerationEngine:
+    def __init__(self, model="gemini-2.0-flash", generate=None, concurrency=None,
+                 limiter=None, max_retries=None, backoff=None, cache=None, settings=None):
+        self.model = model
+        self.settings = settings or {}
+        self.generate = generate or default_backend(settings)
+        self.cache = cache
+        self.concurrency = concurrency or LLM_CONCURRENCY
+        self.limiter = limiter or limiter_for(model)
+        # Part of the cache key: a stand-in's replies must never be served for the real model
+        self.backend_name = getattr(self.generate, "name", None) or getattr(
+            self.generate, "__qualname__", type(self.generate).__qualname__
+        )
+        self.max_retries = LLM_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = LLM_BACKOFF if backoff is None else backoff
+
+    async def _call(self, prompt):
+        if inspect.iscoroutinefunction(self.generate) or inspect.iscoroutinefunction(
+            getattr(self.generate, "__call__", None)
+        ):
+            return await self.generate(prompt, self.model)
+        return await asyncio.to_thread(self.generate, prompt, self.model)
+
+    async def _generate_one(self, key, prompt, semaphore):
+        """(key, text, error) for one prompt; never raises."""
+        cache_key = self.cache.key(self.model, prompt, self.settings, self.backend_name) if self.cache else None
+        if cache_key:
+            cached = await asyncio.to_thread(self.cache.get, cache_key)
+            if cached is not None:
+                return key, cached, None
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.limiter.acquire()
+                    text = await self._call(prompt)
+                    if cache_key and text and text != "No response":
+                        await asyncio.to_thread(self.cache.put, cache_key, model_id(self.model), text)
+                    return key, text, None
+                except QuotaExceeded as e:
+                    return key, None, str(e)
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        return key, None, str(e)
+                    delay = self.backoff * 2 ** attempt * (0.5 + random.random() / 2)
+                    print(f"   ↻ {key}: {e} - retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    async def stream(self, prompts):
+        """Yield (key, text, error) for each {key: prompt} as soon as it completes."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.create_task(self._generate_one(k, p, semaphore)) for k, p in prompts.items()]
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+
+    async def run(self, prompts, on_result=None):
+        results = {}
+        async for key, text, error in self.stream(prompts):
+            results[key] = (text, error)
+            if on_result:
+                on_result(key, text, error)
+        return results
+
+    def generate_all(self, prompts, on_result=None):
+        """
+        Blocking wrapper around `run`: returns {key: (text, error)}. Works
+        whether or not the caller is already inside an event loop.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.run(prompts, on_result))
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(asyncio.run(self.run(prompts, on_result))))
+        worker.start()
+        worker.join()
+        return result
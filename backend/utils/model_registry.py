@@ -0,0 +1,221 @@
+"""
+Persistent registry of trained forecast models.
+
+Every entry is a directory under REGISTRY_DIR holding the Keras model, the
+fitted StandardScaler and a meta.json. Entries are keyed by (ticker, model
+type, hyperparameters, fingerprint of the training rows), so a run whose data
+and params are unchanged loads the model instead of refitting it. When only
+new rows were appended, the newest entry whose fingerprint matches a prefix of
+the current data is returned as a warm-start candidate.
+
+Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/model_registry.py list
+    python ../backend/utils/model_registry.py prune --max-age-days 30 --max-size-mb 500
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import pickle
+import hashlib
+import argparse
+import pathlib
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+REGISTRY_DIR = "../backend/outputs/model_registry"
+META_FILE = "meta.json"
+MODEL_FILE = "model.keras"
+SCALER_FILE = "scaler.pkl"
+
+
+def row_hashes(frame):
+    """Per-row content hashes of the training frame (order-sensitive when combined)."""
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def fingerprint(hashes, n_rows=None):
+    """Fingerprint of the first `n_rows` rows (all rows by default)."""
+    n_rows = len(hashes) if n_rows is None else n_rows
+    return hashlib.sha1(hashes[:n_rows].tobytes()).hexdigest()
+
+
+def params_hash(params):
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _safe(ticker):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(ticker))
+
+
+class ModelRegistry:
+    def __init__(self, root=REGISTRY_DIR):
+        self.root = root
+
+    def _prefix(self, ticker, model_type, params):
+        return f"{_safe(ticker)}__{model_type}__{params_hash(params)}__"
+
+    def _read_meta(self, path):
+        try:
+            with open(os.path.join(path, META_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, path, meta):
+        tmp = os.path.join(path, META_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp, os.path.join(path, META_FILE))
+
+    def entries(self):
+        """All readable entries, newest first."""
+        if not os.path.isdir(self.root):
+            return []
+        found = []
+        for name in os.listdir(self.root):
+            if ".tmp-" in name:
+                continue
+            path = os.path.join(self.root, name)
+            meta = self._read_meta(path) if os.path.isdir(path) else None
+            if meta:
+                meta["path"] = path
+                found.append(meta)
+        return sorted(found, key=lambda m: m["created"], reverse=True)
+
+    def lookup(self, ticker, model_type, params, hashes):
+        """
+        Return (entry, "hit") for an exact match, (entry, "warm") for the newest
+        entry trained on a strict prefix of the current rows, or (None, None).
+        """
+        exact = self._prefix(ticker, model_type, params) + fingerprint(hashes)[:16]
+        meta = self._read_meta(os.path.join(self.root, exact))
+        if meta and meta["fingerprint"] == fingerprint(hashes):
+            meta["path"] = os.path.join(self.root, exact)
+            return meta, "hit"
+
+        prefix = self._prefix(ticker, model_type, params)
+        for meta in self.entries():
+            if not os.path.basename(meta["path"]).startswith(prefix):
+                continue
+            if meta["n_rows"] < len(hashes) and meta["fingerprint"] == fingerprint(hashes, meta["n_rows"]):
+                return meta, "warm"
+        return None, None
+
+    def load(self, entry):
+        from keras.models import load_model
+
+        model = load_model(os.path.join(entry["path"], MODEL_FILE), compile=False)
+        with open(os.path.join(entry["path"], SCALER_FILE), "rb") as f:
+            scaler = pickle.load(f)
+        entry = dict(entry)
+        entry["last_used"] = time.time()
+        path = entry.pop("path")
+        self._write_meta(path, entry)
+        return model, scaler
+
+    def save(self, ticker, model_type, params, hashes, model, scaler, cutoff=None, parent=None):
+        fp = fingerprint(hashes)
+        name = self._prefix(ticker, model_type, params) + fp[:16]
+        path = os.path.join(self.root, name)
+        tmp = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        model.save(os.path.join(tmp, MODEL_FILE))
+        with open(os.path.join(tmp, SCALER_FILE), "wb") as f:
+            pickle.dump(scaler, f)
+        now = time.time()
+        meta = {
+            "ticker": ticker,
+            "model_type": model_type,
+            "params": params,
+            "fingerprint": fp,
+            "n_rows": int(len(hashes)),
+            "cutoff": cutoff,
+            "parent": parent,
+            "created": now,
+            "last_used": now,
+        }
+        self._write_meta(tmp, meta)
+
+        # Swap the finished directory into place; a concurrent writer of the same key wins harmlessly
+        shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.replace(tmp, path)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+        meta["path"] = path
+        return meta
+
+    @staticmethod
+    def _size(path):
+        return sum(
+            os.path.getsize(os.path.join(dirpath, f))
+            for dirpath, _, files in os.walk(path)
+            for f in files
+        )
+
+    def prune(self, max_age_days=None, max_bytes=None, dry_run=False):
+        """
+        Remove entries unused for more than `max_age_days`, then evict the least
+        recently used entries until the registry fits in `max_bytes`.
+        Returns the removed entries.
+        """
+        entries = sorted(self.entries(), key=lambda m: m["last_used"])
+        removed = []
+        if max_age_days is not None:
+            cutoff = time.time() - max_age_days * 86400
+            removed += [m for m in entries if m["last_used"] < cutoff]
+            entries = [m for m in entries if m["last_used"] >= cutoff]
+        if max_bytes is not None:
+            sizes = {m["path"]: self._size(m["path"]) for m in entries}
+            total = sum(sizes.values())
+            for m in entries:
+                if total <= max_bytes:
+                    break
+                removed.append(m)
+                total -= sizes[m["path"]]
+        if not dry_run:
+            for m in removed:
+                shutil.rmtree(m["path"], ignore_errors=True)
+        return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or prune the trained-model registry.")
+    parser.add_argument("--root", default=REGISTRY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list")
+    prune = sub.add_parser("prune")
+    prune.add_argument("--max-age-days", type=float)
+    prune.add_argument("--max-size-mb", type=float)
+    prune.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.root)
+    if args.command == "list":
+        entries = registry.entries()
+        for m in entries:
+            print(
+                f"{m['ticker']:<8} {m['model_type']:<5} rows={m['n_rows']:<6} "
+                f"cutoff={m.get('cutoff')} params={json.dumps(m['params'], sort_keys=True)} "
+                f"size={registry._size(m['path']) / 1e6:.1f}MB "
+                f"used={time.strftime('%Y-%m-%d %H:%M', time.localtime(m['last_used']))}"
+            )
+        print(f"{len(entries)} entries under {args.root}")
+    else:
+        max_bytes = args.max_size_mb * 1024 * 1024 if args.max_size_mb is not None else None
+        removed = registry.prune(args.max_age_days, max_bytes, dry_run=args.dry_run)
+        verb = "Would remove" if args.dry_run else "Removed"
+        for m in removed:
+            print(f"{verb} {os.path.basename(m['path'])}")
+        print(f"{verb} {len(removed)} entries")
+
+
+if __name__ == "__main__":
+    main()
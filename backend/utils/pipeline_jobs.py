@@ -0,0 +1,177 @@
+"""
+Background execution of the analysis pipeline.
+
+Jobs are queued in the SQLite job queue (backend/database/job_queue.py) by
+the API. A WorkerPool runs them; each of its supervisor threads does this:
+
+1. claims the oldest queued job;
+2. runs it in a fresh process with the working directory the pipeline's
+   relative paths expect (frontend/) and PIPELINE_RUN_ID set to the job ID,
+   so its results are saved as that run's artifacts
+   (backend/utils/artifact_store.py);
+3. records progress events as the dataset sync and each crew task finish;
+4. heartbeats while it waits, and terminates the process when cancellation
+   is requested.
+
+On POSIX each job process starts its own process group, so cancelling a job
+also stops the forecast worker processes it started (FORECAST_WORKERS > 1).
+On Windows only the job process itself is terminated.
+
+Each job's stdout goes to job.log in its run directory.
+
+The dataset stores and shared caches are still updated in place, so the
+default of one worker runs jobs one after another; raise PIPELINE_WORKERS
+only when jobs do not need to refresh the dataset. The API starts a pool at
+startup (PIPELINE_WORKERS=0 disables it). A pool can also run on its own:
+
+    python backend/utils/pipeline_jobs.py --workers 1
+"""
+import os
+import sys
+import time
+import signal
+import pathlib
+import argparse
+import threading
+import traceback
+import multiprocessing
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.database.job_queue import JobQueue, SUCCEEDED, FAILED, CANCELLED, RUNNING
+from backend.utils.artifact_store import RUNS_DIR
+
+FRONTEND_DIR = BASE_DIR / "frontend"  # working directory the pipeline's relative paths assume
+JOBS_OUTPUT_ROOT = RUNS_DIR  # a job's output directory is its artifact run directory
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "1"))
+POLL_INTERVAL = 1.0
+STALE_AFTER = 60.0
+
+
+def run_pipeline(job_id, params, output_dir, db_path):
+    """Job body, run in the job's own process: dataset sync, then the crew."""
+    os.makedirs(output_dir, exist_ok=True)
+    os.chdir(FRONTEND_DIR)
+    os.environ["PIPELINE_RUN_ID"] = job_id
+    sys.stdout = sys.stderr = open(os.path.join(output_dir, "job.log"), "a", buffering=1, encoding="utf-8")
+    queue = JobQueue(db_path)
+    try:
+        queue.add_event(job_id, "dataset", "Checking dataset …", 0.02)
+        from backend.database.pipeline_dataset import sync as sync_dataset
+
+        summary = sync_dataset()
+        if summary["status"] == "updated":
+            queue.add_event(job_id, "dataset", f"Dataset updated - {summary['new_rows']} new rows", 0.1)
+        else:
+            queue.add_event(job_id, "dataset", "Dataset already up to date", 0.1)
+
+        from backend.agent_main_call import run_crew
+
+        fast = params.get("fast", False)
+
+        def on_task(done, total, output):
+            label = f"Stage '{output}'" if fast else "Crew task"
+            queue.add_event(job_id, "crew", f"{label} {done}/{total} finished", 0.1 + 0.85 * done / total)
+
+        queue.add_event(job_id, "crew", "Running fast pipeline …" if fast else "Launching Crew agents …", 0.1)
+        run_crew(params["symbols"], params["user_pov"], on_task=on_task, fast=fast)
+        queue.finish(job_id, SUCCEEDED)
+    except Exception as e:
+        traceback.print_exc()
+        queue.finish(job_id, FAILED, f"{type(e).__name__}: {e}")
+
+
+def _job_main(runner, *args):
+    """Entry point of a job process: lead a new process group, then run the job."""
+    if hasattr(os, "setsid"):
+        os.setsid()
+    runner(*args)
+
+
+def _kill_group(process):
+    """Stop the job process's group: the job and every worker process it started."""
+    if not hasattr(os, "killpg"):
+        return False
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        return True
+    except (ProcessLookupError, PermissionError):  # no group yet, or already gone
+        return False
+
+
+class WorkerPool:
+    def __init__(self, queue=None, workers=PIPELINE_WORKERS, runner=run_pipeline, poll_interval=POLL_INTERVAL):
+        self.queue = queue or JobQueue()
+        self.workers = workers
+        self.runner = runner
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        stale = self.queue.fail_stale(STALE_AFTER)
+        if stale:
+            print(f"⚠️ Marked {stale} abandoned pipeline jobs as failed")
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._supervise, name=f"pipeline-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=None):
+        """Stop claiming jobs; running ones are terminated and marked failed."""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _supervise(self):
+        # Fresh interpreters: no inherited TensorFlow/DuckDB state, and terminate() is safe
+        ctx = multiprocessing.get_context("spawn")
+        while not self._stop.is_set():
+            job = self.queue.claim(os.getpid())
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run(ctx, job)
+
+    def _run(self, ctx, job):
+        job_id = job["job_id"]
+        # Not a daemon: the forecast step starts its own worker processes
+        process = ctx.Process(
+            target=_job_main, args=(self.runner, job_id, job["params"], job["output_dir"], self.queue.db_path),
+            name=f"pipeline-job-{job_id}",
+        )
+        process.start()
+        while process.is_alive():
+            process.join(self.poll_interval)
+            cancel = self.queue.heartbeat(job_id)
+            if process.is_alive() and (cancel or self._stop.is_set()):
+                if not _kill_group(process):
+                    process.terminate()
+                process.join()
+                if cancel:
+                    self.queue.finish(job_id, CANCELLED, "Cancelled while running")
+                else:
+                    self.queue.finish(job_id, FAILED, "Worker pool stopped")
+                return
+        # Workers left behind by a crashed job would keep writing to the registry and param cache
+        _kill_group(process)
+        # The job process reports its own outcome; this only catches crashes
+        if self.queue.get(job_id)["status"] == RUNNING:
+            self.queue.finish(job_id, FAILED, f"Job process exited with code {process.exitcode}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run pipeline jobs from the job queue.")
+    parser.add_argument("--workers", type=int, default=max(PIPELINE_WORKERS, 1))
+    args = parser.parse_args()
+
+    pool = WorkerPool(workers=args.workers).start()
+    print(f"✓ {args.workers} pipeline workers waiting for jobs (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pool.stop()
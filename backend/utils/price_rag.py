@@ -0,0 +1,318 @@
+"""
+Retrieval over summarized price history.
+
+Daily bars from the processed store are summarized into one document per
+ticker and week/month (open, close, change, range, average volume and
+volatility), embedded in batches with a local sentence-transformers model (through the
+embedding cache, so a text is only ever embedded once per model) and
+upserted into a persistent Chroma collection. Document IDs are stable
+("AAPL|W|2020-01-06"), and each document carries a hash of its text, so
+re-ingesting unchanged history writes nothing. Only new periods, and the
+still-open last period of each ticker, are re-embedded.
+
+`PriceIndex.context` returns the top-k summaries per ticker for the
+recommendation prompts. Run from frontend/ like the rest of the pipeline:
+
+    python ../backend/utils/price_rag.py --ingest
+    python ../backend/utils/price_rag.py --query "sharp drop after a rally" --ticker AAPL
+    python ../backend/utils/price_rag.py --benchmark
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import pathlib
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import read_store, store_version
+from backend.utils.embedding_cache import EmbeddingCache, EMBED_BATCH_SIZE
+
+CHROMA_PATH = "../backend/input/chroma_db"
+STATE_FILE = "price_index_state.json"
+RAG_EMBED_MODEL = os.getenv("RAG_EMBED_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "1000"))
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", "3"))
+FREQS = {"W": "week", "M": "month"}
+HISTORY_COLUMNS = ["ticker", "date", "open", "high", "low", "close", "volume"]
+
+
+def summarize_history(df, freq="W"):
+    """One row per (ticker, calendar week or month) of daily bars."""
+    df = df.sort_values(["ticker", "date"])
+    dates = df["date"].dt.tz_convert("UTC").dt.tz_localize(None)
+    df = df.assign(
+        ticker=df["ticker"].astype(str),
+        period=dates.dt.to_period(freq).dt.start_time,
+        daily_return=df.groupby(df["ticker"].astype(str), sort=False)["close"].pct_change(),
+    )
+    out = df.groupby(["ticker", "period"], sort=True).agg(
+        start=("date", "first"),
+        end=("date", "last"),
+        open=("open", "first"),
+        close=("close", "last"),
+        high=("high", "max"),
+        low=("low", "min"),
+        volume=("volume", "mean"),
+        volatility=("daily_return", "std"),
+        days=("close", "size"),
+    ).reset_index()
+    out["change"] = out["close"] / out["open"] - 1
+    return out
+
+
+def summary_documents(summary, freq="W"):
+    """Stable id, text and metadata for each summary row."""
+    label = FREQS[freq]
+    docs = []
+    for row in summary.itertuples(index=False):
+        volatility = f"{row.volatility:.1%}" if pd.notna(row.volatility) else "n/a"
+        text = (
+            f"{row.ticker} {label} {row.start:%Y-%m-%d} to {row.end:%Y-%m-%d}: "
+            f"opened at {row.open:.2f}, closed at {row.close:.2f} ({row.change:+.1%}); "
+            f"range {row.low:.2f}-{row.high:.2f}; average volume {row.volume:,.0f}; "
+            f"daily volatility {volatility} over {row.days} sessions."
+        )
+        docs.append({
+            "id": f"{row.ticker}|{freq}|{row.period:%Y-%m-%d}",
+            "text": text,
+            "metadata": {
+                "ticker": row.ticker,
+                "freq": freq,
+                "start": f"{row.start:%Y-%m-%d}",
+                "end": f"{row.end:%Y-%m-%d}",
+                "close": float(row.close),
+                "change": float(row.change),
+                "text_hash": hashlib.sha1(text.encode()).hexdigest(),
+            },
+        })
+    return docs
+
+
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model, loaded on first use; unit-normalized float32 vectors."""
+
+    def __init__(self, model_name=RAG_EMBED_MODEL, batch_size=EMBED_BATCH_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self._model = None
+
+    def encode(self, texts):
+        if self._model is None:
+            from sentence_transformers import SentenceTransformer
+
+            self._model = SentenceTransformer(self.model_name)
+        vectors = self._model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True,
+            convert_to_numpy=True, show_progress_bar=False,
+        )
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def _collection_name(model_name):
+    slug = "".join(c if c.isalnum() else "-" for c in model_name).strip("-")
+    return f"price_summaries-{slug}"[:512]
+
+
+class PriceIndex:
+    def __init__(self, path=CHROMA_PATH, embedder=None):
+        import chromadb
+
+        self.path = path
+        self.embedder = embedder or EmbeddingCache(SentenceTransformerEmbedder())
+        self.client = chromadb.PersistentClient(path=path)
+        # Vectors are always supplied by `embedder`, never by Chroma's default embedding function
+        self.collection = self.client.get_or_create_collection(
+            name=_collection_name(self.embedder.model_name),
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None,
+        )
+        self._state_path = os.path.join(path, STATE_FILE)
+        self._lock = threading.Lock()
+
+    def _existing_hashes(self, ids):
+        hashes = {}
+        for batch in _batches(ids, UPSERT_BATCH_SIZE):
+            found = self.collection.get(ids=batch, include=["metadatas"])
+            hashes.update({i: (m or {}).get("text_hash") for i, m in zip(found["ids"], found["metadatas"])})
+        return hashes
+
+    def ingest(self, df=None, tickers=None, freqs=tuple(FREQS)):
+        """
+        Summarize, embed and upsert the history in `df` (default: the processed
+        store, optionally limited to `tickers`). Documents whose text is
+        unchanged are skipped. Returns counts and throughput.
+        """
+        start = time.perf_counter()
+        if df is None:
+            df = read_store("processed", tickers=tickers, columns=HISTORY_COLUMNS)
+        docs = [d for freq in freqs for d in summary_documents(summarize_history(df, freq), freq)]
+        existing = self._existing_hashes([d["id"] for d in docs])
+        changed = [d for d in docs if existing.get(d["id"]) != d["metadata"]["text_hash"]]
+
+        for batch in _batches(changed, UPSERT_BATCH_SIZE):
+            embeddings = self.embedder.encode([d["text"] for d in batch])
+            self.collection.upsert(
+                ids=[d["id"] for d in batch],
+                embeddings=embeddings,
+                documents=[d["text"] for d in batch],
+                metadatas=[d["metadata"] for d in batch],
+            )
+        seconds = time.perf_counter() - start
+        stats = {
+            "documents": len(docs),
+            "upserted": len(changed),
+            "skipped": len(docs) - len(changed),
+            "seconds": round(seconds, 3),
+            "docs_per_sec": round(len(docs) / seconds, 1) if seconds else None,
+        }
+        if isinstance(self.embedder, EmbeddingCache):
+            stats["embedding_hit_ratio"] = self.embedder.stats()["hit_ratio"]
+        return stats
+
+    def _load_state(self):
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r") as f:
+                return json.load(f).get(self.collection.name, {})
+        return {}
+
+    def _save_state(self, state):
+        everything = {}
+        if os.path.exists(self._state_path):
+            with open(self._state_path, "r") as f:
+                everything = json.load(f)
+        everything[self.collection.name] = state
+        tmp = self._state_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(everything, f, indent=4)
+        os.replace(tmp, self._state_path)
+
+    def ensure_current(self, tickers):
+        """Ingest `tickers` unless they were already ingested at the current processed store version."""
+        with self._lock:
+            version = store_version("processed")
+            state = self._load_state()
+            done = set(state.get("tickers", [])) if state.get("source_version") == version else set()
+            missing = sorted({str(t) for t in tickers} - done)
+            if missing:
+                stats = self.ingest(tickers=missing)
+                print(f"✓ Indexed price summaries for {len(missing)} tickers "
+                      f"({stats['upserted']} upserted, {stats['docs_per_sec']} docs/s)")
+                self._save_state({"source_version": version, "tickers": sorted(done | set(missing))})
+
+    def query(self, text, k=RAG_TOP_K, ticker=None, freq=None):
+        return self.query_many({None: text}, k, ticker, freq)[None]
+
+    def query_many(self, queries, k=RAG_TOP_K, ticker=None, freq=None):
+        """
+        Top-k summaries for each {key: query_text}, embedded in one batch.
+        Restricted to `ticker` (a str, or a {key: ticker} dict) and `freq` when given.
+        """
+        keys = list(queries)
+        vectors = self.embedder.encode([queries[key] for key in keys]) if keys else []
+        results = {}
+        for key, vector in zip(keys, vectors):
+            wanted = ticker.get(key) if isinstance(ticker, dict) else ticker
+            where = [{"ticker": wanted}] if wanted else []
+            where += [{"freq": freq}] if freq else []
+            found = self.collection.query(
+                query_embeddings=[vector],
+                n_results=k,
+                where=(where[0] if len(where) == 1 else {"$and": where}) if where else None,
+                include=["documents", "metadatas", "distances"],
+            )
+            results[key] = [
+                {"id": i, "document": doc, "metadata": meta, "distance": dist}
+                for i, doc, meta, dist in zip(
+                    found["ids"][0], found["documents"][0], found["metadatas"][0], found["distances"][0]
+                )
+            ]
+        return results
+
+    def context(self, queries, k=RAG_TOP_K):
+        """Top-k summaries of each ticker's own history for {ticker: query_text}."""
+        self.ensure_current(list(queries))
+        return self.query_many(queries, k, ticker={t: t for t in queries})
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_price_index():
+    """Process-wide index, so the embedding model is loaded once."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = PriceIndex()
+        return _index
+
+
+def benchmark(df=None, embedder=None, n_queries=50, k=RAG_TOP_K):
+    """
+    Ingestion throughput (first run, unchanged re-run, and a rebuild into an
+    empty collection from the warm embedding cache) and query latency on a
+    throwaway persistent store.
+    """
+    if df is None:
+        df = read_store("processed", columns=HISTORY_COLUMNS)
+    tmp = tempfile.mkdtemp(prefix="price_rag_")
+    try:
+        cache = EmbeddingCache(embedder or SentenceTransformerEmbedder(), root=os.path.join(tmp, "embeddings"))
+        index = PriceIndex(os.path.join(tmp, "chroma"), cache)
+        first = index.ingest(df)
+        again = index.ingest(df)
+        rebuilt = PriceIndex(os.path.join(tmp, "chroma_rebuild"), cache).ingest(df)
+        tickers = sorted(df["ticker"].astype(str).unique())
+        latencies = []
+        for i in range(n_queries):
+            t = tickers[i % len(tickers)]
+            start = time.perf_counter()
+            index.query(f"{t} sharp drop after a rally", k=k, ticker=t)
+            latencies.append((time.perf_counter() - start) * 1000)
+        return {
+            "documents": first["documents"],
+            "ingest_s": first["seconds"],
+            "ingest_docs_per_sec": first["docs_per_sec"],
+            "reingest_s": again["seconds"],
+            "rebuild_warm_cache_s": rebuilt["seconds"],
+            "rebuild_docs_per_sec": rebuilt["docs_per_sec"],
+            "embedding_hit_ratio": cache.stats()["hit_ratio"],
+            "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+            "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        }
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vector index over weekly/monthly price summaries.")
+    parser.add_argument("--ingest", action="store_true")
+    parser.add_argument("--tickers", nargs="*")
+    parser.add_argument("--query")
+    parser.add_argument("--ticker")
+    parser.add_argument("-k", type=int, default=RAG_TOP_K)
+    parser.add_argument("--benchmark", action="store_true")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        for name, value in benchmark(k=args.k).items():
+            print(f"{name:<22}{value}")
+    if args.ingest:
+        print(PriceIndex().ingest(tickers=args.tickers))
+    if args.query:
+        for hit in PriceIndex().query(args.query, k=args.k, ticker=args.ticker):
+            print(f"{hit['distance']:.3f}  {hit['document']}")
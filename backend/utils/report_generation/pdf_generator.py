@@ -6,6 +6,8 @@ from datetime import datetime
 import pandas as pd
 import numpy as np
 
+from backend.utils.sector_index import get_sector_index
+
 class StockReportPDF(FPDF):
     def __init__(self):
         super().__init__()
@@ -259,11 +261,16 @@ class StockReportPDF(FPDF):
         filtered_llm_recommendations = {k: v for k, v in llm_recommendations.items() if k in user_symbols} if user_symbols else llm_recommendations
         
         if filtered_llm_recommendations:
+            sector_index = get_sector_index()
             for ticker, rec_data in filtered_llm_recommendations.items():
                 self.set_x(self.l_margin) 
                 self.set_font("Arial", "B", 14)
                 self.cell(0, 10, f"Ticker: {ticker}", ln=True)
                 self.set_font("Arial", "", 12)
+                sector = sector_index.sector(ticker)
+                if sector:
+                    self.set_x(self.l_margin) # Reset X
+                    self.cell(0, 8, f"Sector: {sector}", ln=True)
                 self.set_x(self.l_margin) # Reset X
                 self.multi_cell(0, 8, f"Recommendation: {rec_data.get('recommendation', 'N/A')}")
                 self.set_x(self.l_margin) # Reset X
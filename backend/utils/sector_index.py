@@ -0,0 +1,150 @@
+"""
+Ticker <-> sector index.
+
+A ticker's sector is its most frequent industry_tag. The (ticker, industry_tag)
+row counts are kept in data/store/sector_counts.parquet and updated as rows
+are appended, so the map is never recomputed from the full dataset; ties go
+to the alphabetically first tag. `get_sector_index()` returns a process-wide
+SectorIndex that reloads when the processed store changes. With
+QUERY_ENGINE=duckdb the same map is computed by DuckDB instead of from the
+counts file.
+"""
+import pathlib
+import sys
+import os
+import json
+import threading
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import STORE_ROOT, read_store, store_exists, store_version
+from backend.utils import duckdb_store
+
+COUNTS_PATH = os.path.join(STORE_ROOT, "sector_counts.parquet")
+SECTOR_MAP_PATH = "../backend/outputs/ticker_sector_map.json"
+_VERSION_KEY = b"source_version"
+
+
+def count_pairs(df):
+    """Row counts per (ticker, industry_tag) pair in one grouped count."""
+    df = df[["ticker", "industry_tag"]].dropna()
+    counts = df.groupby(
+        [df["ticker"].astype(str), df["industry_tag"].astype(str)], sort=False
+    ).size()
+    return counts.rename("rows").reset_index()
+
+
+def _save_counts(counts, path, version):
+    table = pa.Table.from_pandas(counts, preserve_index=False)
+    table = table.replace_schema_metadata({_VERSION_KEY: (version or "").encode()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return counts
+
+
+def _saved_version(path):
+    if not os.path.exists(path):
+        return None
+    return (pq.read_schema(path).metadata or {}).get(_VERSION_KEY, b"").decode() or None
+
+
+def rebuild_counts(df=None, path=COUNTS_PATH):
+    """Recount from `df` (default: the processed store) and save."""
+    if df is None:
+        df = read_store("processed", columns=["ticker", "industry_tag"])
+    return _save_counts(count_pairs(df), path, store_version("processed"))
+
+
+def update_counts(new_rows, previous_version, path=COUNTS_PATH):
+    """Add the pairs of rows just appended to the processed store (full recount if the saved counts are stale)."""
+    if not os.path.exists(path) or _saved_version(path) != previous_version:
+        return rebuild_counts(path=path)
+    counts = pd.concat([pd.read_parquet(path), count_pairs(new_rows)], ignore_index=True)
+    counts = counts.groupby(["ticker", "industry_tag"], sort=False)["rows"].sum().reset_index()
+    return _save_counts(counts, path, store_version("processed"))
+
+
+def load_counts(path=COUNTS_PATH):
+    if not os.path.exists(path) or _saved_version(path) != store_version("processed"):
+        return rebuild_counts(path=path)
+    return pd.read_parquet(path)
+
+
+class SectorIndex:
+    """Bidirectional lookup: ticker -> sector and sector -> sorted tickers."""
+
+    def __init__(self, ticker_to_sector):
+        self.ticker_to_sector = dict(ticker_to_sector)
+        by_sector = {}
+        for ticker, sector in self.ticker_to_sector.items():
+            by_sector.setdefault(sector, []).append(ticker)
+        self.sector_to_tickers = {s: sorted(ts) for s, ts in sorted(by_sector.items())}
+
+    @classmethod
+    def from_counts(cls, counts):
+        best = counts.sort_values(["ticker", "rows", "industry_tag"], ascending=[True, False, True])
+        best = best.drop_duplicates("ticker")
+        return cls(zip(best["ticker"], best["industry_tag"]))
+
+    @classmethod
+    def from_json(cls, path=SECTOR_MAP_PATH):
+        with open(path, "r") as f:
+            return cls(json.load(f))
+
+    def sector(self, ticker, default=None):
+        return self.ticker_to_sector.get(str(ticker), default)
+
+    def tickers(self, sector):
+        return self.sector_to_tickers.get(sector, [])
+
+    def peers(self, ticker):
+        """Other tickers in `ticker`'s sector."""
+        return [t for t in self.tickers(self.sector(ticker)) if t != str(ticker)]
+
+    def sectors(self):
+        return list(self.sector_to_tickers)
+
+    def __contains__(self, ticker):
+        return str(ticker) in self.ticker_to_sector
+
+    def __len__(self):
+        return len(self.ticker_to_sector)
+
+    def save_json(self, path=SECTOR_MAP_PATH):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.ticker_to_sector, f, indent=4)
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_sector_index():
+    """
+    The shared SectorIndex for this process, rebuilt when the processed store
+    version or the query engine changes. Without a store it falls back to
+    ticker_sector_map.json.
+    """
+    global _index, _index_version
+    with _lock:
+        if not store_exists("processed"):
+            if _index is None and os.path.exists(SECTOR_MAP_PATH):
+                _index = SectorIndex.from_json()
+            return _index or SectorIndex({})
+        engine = "duckdb" if duckdb_store.use_duckdb() else "pandas"
+        version = (store_version("processed"), engine)
+        if _index is None or version != _index_version:
+            if engine == "duckdb":
+                _index = SectorIndex(duckdb_store.sector_map())
+            else:
+                _index = SectorIndex.from_counts(load_counts())
+            _index_version = version
+        return _index
@@ -1,31 +1,135 @@
-import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import StandardScaler
 
+from backend.utils.dataset_cache import get_dataset
 
-def generate_sequences(ticker, model_type, sequence_length=10, forecast_target_date=None):
-    df = pd.read_csv("../backend/data/processed/cleaned_stock_data.csv")
-    df = df[df['ticker'] == ticker].sort_values("date").reset_index(drop=True)
-    df['date'] = pd.to_datetime(df['date'], utc=True)
+# `close` must stay first: forecasts are inverse-scaled from feature 0.
+FEATURES = ['close', 'sma_5', 'sma_10', 'sma_21', 'std_5']
 
-    if forecast_target_date:
-        df = df[df['date'] < pd.Timestamp(forecast_target_date, tz="UTC")]
 
-    features = ['close', 'sma_5', 'sma_10', 'sma_21', 'std_5']
-    df = df[features].dropna()
+def sliding_windows(values, sequence_length):
+    """
+    Read-only strided view of shape (n - sequence_length + 1, sequence_length, n_features)
+    over a 2-D (n, n_features) array. No data is copied.
+    """
+    n, n_features = values.shape
+    if n < sequence_length:
+        return np.empty((0, sequence_length, n_features), dtype=values.dtype)
+    return sliding_window_view(values, sequence_length, axis=0).transpose(0, 2, 1)
 
 
-    scaler = StandardScaler()
-    scaled = scaler.fit_transform(df)
+def flatten_windows(X):
+    """LSTM-shaped (samples, steps, features) windows -> MLP-shaped (samples, steps * features)."""
+    return X.reshape((X.shape[0], -1))
 
-    X, y = [], []
-    for i in range(sequence_length, len(scaled)):
-        X.append(scaled[i - sequence_length:i])
-        y.append(scaled[i][0])
 
-    X = np.array(X)
-    y = np.array(y)
+def make_windows(scaled, sequence_length, model_type):
+    """
+    Window a scaled (n, n_features) array: X[i] holds rows i .. i+L-1 and y[i]
+    is the scaled close of row i+L. LSTM windows are a zero-copy view; the MLP
+    matrix is the single copy needed to flatten it.
+    """
+    X = sliding_windows(scaled, sequence_length)[:-1]
+    y = scaled[sequence_length:, 0]
     if model_type == "mlp":
-        X = X.reshape((X.shape[0], -1))
+        X = flatten_windows(X)
+    return X, y
+
+
+def _scale(df, dtype, scaler=None):
+    values = df.to_numpy(dtype=np.float64)
+    if scaler is None:
+        scaler = StandardScaler()
+        scaled = scaler.fit_transform(values)
+    else:
+        scaled = scaler.transform(values)
+    return np.ascontiguousarray(scaled, dtype=dtype), scaler
+
+
+def load_feature_frame(ticker, forecast_target_date=None, features=None):
+    """The ticker's feature rows strictly before `forecast_target_date`, NaNs dropped."""
+    features = features or FEATURES
+    # Served from the shared in-process dataset: the store is read at most once per ticker
+    df = get_dataset("processed").ticker_frame(
+        ticker,
+        columns=features,
+        end=forecast_target_date or None,
+    )
+    return df[features].dropna()
+
+
+def build_sequences(df, model_type, sequence_length=10, dtype=np.float32, scaler=None):
+    """
+    Scale a feature frame and window it. A fitted `scaler` is reused as-is
+    (e.g. when fine-tuning a stored model); otherwise a new one is fitted.
+    Returns (X, y, scaler).
+    """
+    scaled, scaler = _scale(df, dtype, scaler)
+    X, y = make_windows(scaled, sequence_length, model_type)
+    return X, y, scaler
+
+
+def generate_sequences(ticker, model_type, sequence_length=10, forecast_target_date=None,
+                       features=None, dtype=np.float32, scaler=None):
+    df = load_feature_frame(ticker, forecast_target_date, features)
+    X, y, scaler = build_sequences(df, model_type, sequence_length, dtype, scaler)
 
     return X, None, y, None, scaler
+
+
+def generate_sequences_batch(tickers, model_type, sequence_length=10, forecast_target_date=None,
+                             features=None, dtype=np.float32):
+    """
+    Window many tickers in one call.
+
+    Each ticker is scaled with its own `StandardScaler`, the scaled series are
+    packed into one buffer and windows are gathered from a single strided view
+    so none straddles two tickers. Rows offsets[k]:offsets[k+1] of X/y belong to
+    tickers[k].
+
+    Returns (X, y, offsets, scalers) where `scalers` maps ticker -> scaler.
+    """
+    features = features or FEATURES
+    frame = get_dataset("processed").tickers_frame(
+        tickers,
+        columns=["ticker"] + features,
+        end=forecast_target_date or None,
+    )
+
+    # One pass over the rows instead of a boolean scan per ticker
+    groups = {
+        str(ticker): group[features]
+        for ticker, group in frame.groupby("ticker", sort=False, observed=True)
+    }
+    chunks, scalers, counts = [], {}, []
+    for ticker in tickers:
+        df = groups.get(str(ticker))
+        df = df.dropna() if df is not None else None
+        if df is None or df.empty:
+            counts.append(0)
+            continue
+        scaled, scalers[ticker] = _scale(df, dtype)
+        chunks.append(scaled)
+        counts.append(len(scaled))
+
+    lengths = np.asarray(counts)
+    n_windows = np.maximum(lengths - sequence_length, 0)
+    offsets = np.concatenate(([0], np.cumsum(n_windows)))
+
+    if not chunks or offsets[-1] == 0:
+        X = np.empty((0, sequence_length, len(features)), dtype=dtype)
+        y = np.empty((0,), dtype=dtype)
+    else:
+        buffer = np.concatenate(chunks)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        # Window k of a ticker starts at row_start + k and predicts row_start + k + L
+        window_starts = np.repeat(starts, n_windows) + (
+            np.arange(offsets[-1]) - np.repeat(offsets[:-1], n_windows)
+        )
+        X = sliding_windows(buffer, sequence_length)[window_starts]
+        y = buffer[window_starts + sequence_length, 0]
+
+    if model_type == "mlp":
+        X = flatten_windows(X)
+    return X, y, offsets, scalers
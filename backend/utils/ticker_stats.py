@@ -0,0 +1,140 @@
+"""
+Materialized per-ticker statistics.
+
+One row per (ticker, month) with the month's highest high, lowest low, first
+and last close (with their dates) and row count. The table is small (about
+12 rows per ticker-year), is kept up to date as rows are appended to the
+processed store, and answers highest/lowest/growth queries for any year or
+month-aligned window without touching the price data.
+"""
+import pathlib
+import sys
+import os
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BASE_DIR = pathlib.Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(BASE_DIR))
+
+from backend.utils.data_store import STORE_ROOT, read_store, store_version, to_utc
+
+STATS_PATH = os.path.join(STORE_ROOT, "ticker_stats.parquet")
+STATS_COLUMNS = ["ticker", "month", "high", "low", "first_date", "first_close",
+                 "last_date", "last_close", "rows"]
+_VERSION_KEY = b"source_version"
+
+
+def _month_start(ts):
+    """Month start of a UTC Timestamp or datetime Series."""
+    if isinstance(ts, pd.Series):
+        return ts.dt.normalize() - pd.to_timedelta(ts.dt.day - 1, unit="D")
+    return ts.normalize() - pd.Timedelta(days=ts.day - 1)
+
+
+def monthly_stats(df):
+    """Aggregate price rows (ticker, date, high, low, close) into the monthly table."""
+    df = df.sort_values(["ticker", "date"])
+    out = df.assign(month=_month_start(df["date"].dt.tz_convert("UTC")), ticker=df["ticker"].astype(str)).groupby(
+        ["ticker", "month"], sort=True
+    ).agg(
+        high=("high", "max"),
+        low=("low", "min"),
+        first_date=("date", "first"),
+        first_close=("close", "first"),
+        last_date=("date", "last"),
+        last_close=("close", "last"),
+        rows=("close", "size"),
+    )
+    return out.reset_index()[STATS_COLUMNS]
+
+
+def merge_stats(old, new):
+    """Fold the monthly aggregates of new rows into an existing table."""
+    both = pd.concat([old, new], ignore_index=True).sort_values(["ticker", "month", "first_date"])
+    grouped = both.groupby(["ticker", "month"], sort=True)
+    merged = grouped.agg(
+        high=("high", "max"),
+        low=("low", "min"),
+        first_date=("first_date", "first"),
+        first_close=("first_close", "first"),
+        rows=("rows", "sum"),
+    )
+    last = both.sort_values(["ticker", "month", "last_date"]).groupby(["ticker", "month"], sort=True)
+    merged["last_date"] = last["last_date"].last()
+    merged["last_close"] = last["last_close"].last()
+    return merged.reset_index()[STATS_COLUMNS]
+
+
+def save_stats(stats, path=STATS_PATH, version=None):
+    table = pa.Table.from_pandas(stats, preserve_index=False)
+    version = version if version is not None else store_version("processed")
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), _VERSION_KEY: (version or "").encode()})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return stats
+
+
+def rebuild_stats(df=None, path=STATS_PATH):
+    """Recompute the table from `df` (default: the processed store) and save it."""
+    if df is None:
+        df = read_store("processed", columns=["ticker", "date", "high", "low", "close"])
+    return save_stats(monthly_stats(df), path)
+
+
+def update_stats(new_rows, previous_version, path=STATS_PATH):
+    """
+    Fold rows just appended to the processed store into the saved table.
+    The table is rebuilt instead when it did not reflect `previous_version`,
+    the store version before the append.
+    """
+    if not os.path.exists(path) or _saved_version(path) != previous_version:
+        return rebuild_stats(path=path)
+    if new_rows.empty:
+        return save_stats(pd.read_parquet(path), path)
+    return save_stats(merge_stats(pd.read_parquet(path), monthly_stats(new_rows)), path)
+
+
+def _saved_version(path):
+    metadata = pq.read_schema(path).metadata or {}
+    return metadata.get(_VERSION_KEY, b"").decode() or None
+
+
+def load_stats(path=STATS_PATH):
+    """The monthly table, rebuilt first if it does not reflect the current processed store."""
+    if not os.path.exists(path) or _saved_version(path) != store_version("processed"):
+        return rebuild_stats(path=path)
+    return pd.read_parquet(path)
+
+
+def query_stats(tickers=None, start=None, end=None, stats=None):
+    """
+    Per-ticker highest/lowest price, first/last close, growth (%) and row
+    count over the months starting in [`start` rounded down to its month,
+    `end`); both default to the full history.
+    """
+    stats = load_stats() if stats is None else stats
+    if tickers is not None:
+        stats = stats[stats["ticker"].isin([str(t) for t in tickers])]
+    if start is not None:
+        stats = stats[stats["month"] >= _month_start(to_utc(start))]
+    if end is not None:
+        stats = stats[stats["month"] < to_utc(end)]
+
+    stats = stats.sort_values(["ticker", "month"])
+    grouped = stats.groupby("ticker", sort=True)
+    out = grouped.agg(
+        highest_price=("high", "max"),
+        lowest_price=("low", "min"),
+        first_close=("first_close", "first"),
+        last_close=("last_close", "last"),
+        rows=("rows", "sum"),
+    )
+    out["growth_percent"] = (out["last_close"] - out["first_close"]) / out["first_close"] * 100
+    return out
+
+
+def year_window(year):
+    return pd.Timestamp(f"{year}-01-01", tz="UTC"), pd.Timestamp(f"{year + 1}-01-01", tz="UTC")
@@ -1,7 +1,13 @@
 import pathlib
 import sys
+import os
+import uuid
+import multiprocessing
 import optuna
-from sklearn.metrics import mean_squared_error
+from optuna.study import MaxTrialsCallback
+from optuna.trial import TrialState
+from tensorflow.keras.callbacks import Callback
+from tensorflow.keras.optimizers import Adam, RMSprop
 
 BASE_DIR = pathlib.Path(__file__).resolve().parents[1]
 BACKEND_DIR = BASE_DIR / "backend"
@@ -10,21 +16,150 @@ sys.path.insert(0, str(BASE_DIR))
 from backend.models.lstm import build_lstm_model
 from backend.models.mlp import build_mlp_model
 
+# Defaults, overridable per call or through the environment
+N_TRIALS = int(os.getenv("TUNING_TRIALS", "10"))
+N_JOBS = int(os.getenv("TUNING_JOBS", "1"))
+N_PROCESSES = int(os.getenv("TUNING_PROCESSES", "1"))
+TIMEOUT = float(os.getenv("TUNING_TIMEOUT", "0")) or None  # seconds per ticker/model
+EPOCHS = 10
+VAL_FRACTION = 0.2
+JOURNAL_PATH = "../backend/outputs/optuna_journal.log"
+# Used when no trial completes (all pruned, failed or cut off by the timeout)
+DEFAULT_PARAMS = {"units": 64, "batch_size": 32, "optimizer": "adam"}
 
-def optimize_model(model_type, X_train, y_train, X_val, y_val):
+
+def time_split(X, y, val_fraction=VAL_FRACTION):
+    """Chronological split: the last `val_fraction` of windows is held out for validation."""
+    n_val = max(1, int(len(X) * val_fraction))
+    return X[:-n_val], y[:-n_val], X[-n_val:], y[-n_val:]
+
+
+def make_pruner(name="median"):
+    if name == "median":
+        return optuna.pruners.MedianPruner(n_startup_trials=3, n_warmup_steps=2)
+    if name == "hyperband":
+        return optuna.pruners.HyperbandPruner(min_resource=1, max_resource=EPOCHS)
+    return optuna.pruners.NopPruner()
+
+
+def journal_storage(path=JOURNAL_PATH):
+    """File-backed journal storage that several processes can share safely."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        from optuna.storages.journal import JournalFileBackend
+    except ImportError:  # optuna < 4.0
+        from optuna.storages import JournalFileStorage as JournalFileBackend
+    return optuna.storages.JournalStorage(JournalFileBackend(path))
+
+
+class _PruningCallback(Callback):
+    """Report val_loss to Optuna after every epoch and stop the fit once the trial should be pruned."""
+
+    def __init__(self, trial):
+        super().__init__()
+        self.trial = trial
+        self.pruned = False
+
+    def on_epoch_end(self, epoch, logs=None):
+        val_loss = (logs or {}).get("val_loss")
+        if val_loss is None:
+            return
+        self.trial.report(float(val_loss), step=epoch)
+        if self.trial.should_prune():
+            self.pruned = True
+            self.model.stop_training = True
+
+
+def _objective(model_type, X_train, y_train, X_val, y_val):
     def objective(trial):
         batch_size = trial.suggest_categorical("batch_size", [16, 32, 64])
-        units = trial.suggest_int("units", 32, 128)
+        optimizer = trial.suggest_categorical("optimizer", ["adam", "rmsprop"])
 
         if model_type == "lstm":
             model = build_lstm_model(trial, X_train.shape[1:])
         else:
             model = build_mlp_model(trial, X_train.shape)
+        model.compile(optimizer=Adam() if optimizer == "adam" else RMSprop(), loss="mse")
+
+        pruning = _PruningCallback(trial)
+        history = model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=EPOCHS,
+            batch_size=batch_size,
+            callbacks=[pruning],
+            verbose=0,
+        )
+        if pruning.pruned:
+            raise optuna.TrialPruned()
+        return float(history.history["val_loss"][-1])
+    return objective
+
+
+def _best_params(study):
+    """Params of the best completed trial, or DEFAULT_PARAMS when no trial completed."""
+    try:
+        return study.best_trial.params
+    except ValueError:
+        print(f"⚠️ No completed trials in study '{study.study_name}' - using default params")
+        return dict(DEFAULT_PARAMS)
+
+
+def _optimize_worker(study_name, journal_path, model_type, data, n_trials, timeout, pruner):
+    """Entry point for tuning processes: attach to the shared study and run trials until the total is reached."""
+    study = optuna.load_study(
+        study_name=study_name, storage=journal_storage(journal_path), pruner=make_pruner(pruner)
+    )
+    study.optimize(
+        _objective(model_type, *data),
+        timeout=timeout,
+        callbacks=[MaxTrialsCallback(n_trials, states=(TrialState.COMPLETE, TrialState.PRUNED))],
+    )
+
+
+def optimize_model(model_type, X_train, y_train, X_val=None, y_val=None, n_trials=None,
+                   n_jobs=None, timeout=None, pruner="median", study_name=None, processes=None):
+    """
+    Tune batch size, units and optimizer for `model_type` and return the best params.
+
+    Without explicit validation data the windows are split chronologically
+    (last 20% held out). Trials report val_loss every epoch so the median or
+    hyperband pruner can stop poor ones early. `n_jobs` runs trials on threads
+    in this process; `processes` > 1 runs them in separate processes sharing a
+    journal-file study. `timeout` is a wall-clock budget in seconds. If no
+    trial completes, DEFAULT_PARAMS are returned.
+    """
+    n_trials = n_trials or N_TRIALS
+    n_jobs = n_jobs or N_JOBS
+    processes = processes or N_PROCESSES
+    timeout = timeout if timeout is not None else TIMEOUT
+    if X_val is None or y_val is None:
+        X_train, y_train, X_val, y_val = time_split(X_train, y_train)
+    data = (X_train, y_train, X_val, y_val)
 
-        model.fit(X_train, y_train, epochs=10, batch_size=batch_size, verbose=0)
-        preds = model.predict(X_val).flatten()
-        return mean_squared_error(y_val, preds)
+    if processes <= 1:
+        study = optuna.create_study(direction="minimize", pruner=make_pruner(pruner))
+        study.optimize(_objective(model_type, *data), n_trials=n_trials, n_jobs=n_jobs, timeout=timeout)
+        return _best_params(study)
 
-    study = optuna.create_study(direction="minimize")
-    study.optimize(objective, n_trials=10)
-    return study.best_params
+    study_name = study_name or f"{model_type}-{uuid.uuid4().hex}"
+    study = optuna.create_study(
+        direction="minimize",
+        pruner=make_pruner(pruner),
+        study_name=study_name,
+        storage=journal_storage(JOURNAL_PATH),
+        load_if_exists=True,
+    )
+    ctx = multiprocessing.get_context("spawn")  # TensorFlow is not fork-safe
+    workers = [
+        ctx.Process(
+            target=_optimize_worker,
+            args=(study_name, JOURNAL_PATH, model_type, data, n_trials, timeout, pruner),
+        )
+        for _ in range(processes)
+    ]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return _best_params(study)
@@ -1,4 +1,4 @@
-import os, json, time, subprocess, requests
+import os, json, time, requests
 from datetime import datetime
 from typing import Dict, List
 
@@ -18,7 +18,10 @@ sys.path.insert(0, str(BASE_DIR))
 sys.stdout.reconfigure(encoding='utf-8')
 
 
-from backend.agent_main_call import run_crew
+from backend.utils.data_store import price_history
+from backend.utils.artifact_store import get_artifact_store, DEFAULT_RUN_ID
+
+API_URL = os.getenv("API_URL", "http://localhost:8000")
 
 # Helper function to replace NaN with None for JSON compatibility
 def replace_nan_with_none(obj):
@@ -42,6 +45,9 @@ ss.setdefault("run_triggered",  False)
 ss.setdefault("backend_log",    "")
 ss.setdefault("pdf_content", None)
 ss.setdefault("pdf_filename", "")
+ss.setdefault("job",            None)
+ss.setdefault("job_events",     [])
+ss.setdefault("run_id",         DEFAULT_RUN_ID)
 
 # login / signup wall
 if not ss.get("authenticated", False):
@@ -56,10 +62,20 @@ st.title("Stock Analysis Pipeline")
 
 symbols_str = st.text_input("Stock Symbols (comma-separated)", "AAPL, AMD, GOOGL")
 user_pov    = "I'm a conservative investor looking for stable growth with low risk."
+fast_mode   = st.checkbox("Fast mode (skip agent orchestration; the LLM only writes the recommendations)", value=False)
 
 if st.button("Start Analysis Pipeline"):
     syms = [s.strip().upper() for s in symbols_str.split(",") if s.strip()]
     if syms:
+        # Queue the run on the API's background workers instead of blocking this script
+        try:
+            r = requests.post(f"{API_URL}/pipeline/jobs", json={"symbols": syms, "user_pov": user_pov, "fast": fast_mode}, timeout=10)
+            r.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            st.error(f"Could not start the pipeline via {API_URL}: {e}")
+            st.stop()
+        ss.job           = r.json()
+        ss.job_events    = []
         ss.run_triggered = True
         # Reset results and PDF content for a new run
         ss.results       = {"research": {}, "analysis": {}, "recommendations": [], "raw_price_data": [], "ticker_analysis": {}}
@@ -70,60 +86,60 @@ if st.button("Start Analysis Pipeline"):
 
 
 # ╭──────────────────────────────────────────────╮
-# │ 3. Run back-end scripts when triggered       │
+# │ 3. Follow the background pipeline job        │
 # ╰──────────────────────────────────────────────╯
 # st.sidebar.write(f"Debug: ss.run_triggered = {ss.run_triggered}") # Optional: for debugging
 
-if ss.run_triggered:
-    syms = [s.strip().upper() for s in symbols_str.split(",") if s.strip()]
-    if not syms:
-        st.error("No valid symbols supplied.")
+def fetch_job(job_id: str, after: int = 0) -> Dict:
+    r = requests.get(f"{API_URL}/pipeline/jobs/{job_id}", params={"after": after}, timeout=10)
+    r.raise_for_status()
+    return r.json()
+
+
+if ss.run_triggered and ss.job:
+    syms = ss.job["params"]["symbols"]
+    try:
+        job = fetch_job(ss.job["job_id"], after=ss.job_events[-1]["event_id"] if ss.job_events else 0)
+    except requests.exceptions.RequestException as e:
+        st.error(f"Could not reach the pipeline API at {API_URL}: {e}")
+        ss.run_triggered = False
+        st.stop()
+    ss.job_events.extend(job.pop("events"))
+    ss.job = job
+
+    if job["status"] in ("queued", "running"):
+        # Poll: show progress, then rerun the script in a second to fetch new events
+        with st.status(f"Running analysis … ({job['status']})", expanded=True):
+            for event in ss.job_events:
+                st.write(f"{time.strftime('%H:%M:%S', time.localtime(event['timestamp']))}  {event['message']}")
+            st.progress(min(float(job["progress"] or 0), 1.0))
+        if st.button("Cancel analysis"):
+            requests.post(f"{API_URL}/pipeline/jobs/{job['job_id']}/cancel", timeout=10)
+        time.sleep(1)
+        st.rerun()
+
+    if job["status"] != "succeeded":
+        with st.status(f"Pipeline {job['status']}", state="error", expanded=True):
+            for event in ss.job_events:
+                st.write(event["message"])
+        st.error(f"Pipeline {job['status']}: {job.get('error') or ''} (log: {os.path.join(job['output_dir'], 'job.log')})")
         ss.run_triggered = False
         st.stop()
 
-    result_json_path = "../backend/outputs/crew_result.json"
-    forecast_json_path = "../backend/outputs/forecast_results.json"
-    ticker_analysis_path = "../backend/outputs/ticker_analysis.json"
-    raw_prices_csv_path = "../backend/data/raw/World-Stock-Prices-Dataset.csv"
+    # The job saved its results as artifacts of its own run
+    ss.run_id = job["job_id"]
+    artifacts = get_artifact_store()
+    result_json_path = artifacts.path("crew_result.json", ss.run_id)
+    forecast_json_path = artifacts.path("forecast_results.json", ss.run_id)
+    ticker_analysis_path = artifacts.path("ticker_analysis.json", ss.run_id)
 
     # Initialize data containers for this run
     crew_data = None
     forecast_data = {} # Default to empty dict
 
     with st.status("Running analysis …", expanded=True) as status:
-        # Step-1: Kaggle dataset check / download
-        message_1 = st.empty()
-        message_1.write("⇣ Checking Kaggle dataset …")
-        t0 = time.time()
-        try:
-            subprocess.run(["python", "../backend/database/pipeline_dataset.py"], check=True, capture_output=True, text=True)
-            message_1.empty()
-            status.write(f"✔️ Dataset Updated - {datetime.now().strftime('%B %d, %Y')} ({time.time()-t0:.1f}s)")
-        except subprocess.CalledProcessError as e:
-            status.update(label="Dataset update script failed.", state="error", expanded=True)
-            st.error(f"Error during dataset update: {e}\nOutput:\n{e.stdout}\n{e.stderr}")
-            ss.run_triggered = False
-            st.stop()
-        except Exception as e:
-            status.update(label="Dataset update failed.", state="error", expanded=True)
-            st.error(f"Error during dataset update: {e}")
-            ss.run_triggered = False
-            st.stop()
-
-
-        # Step-2: Crew pipeline (run directly from Python)
-        message_2 = st.empty()
-        message_2.write("🤖 Launching Crew agents …")
-        t0 = time.time()
-        try:
-            run_crew(syms, user_pov) # This function should create/update the JSON files
-            message_2.empty()
-            status.write(f"✔️ Crew finished ({time.time()-t0:.1f}s)")
-        except Exception as e:
-            status.update(label="Crew pipeline failed.", state="error", expanded=True)
-            st.error(f"Error during Crew run: {e}")
-            ss.run_triggered = False
-            st.stop()
+        for event in ss.job_events:
+            status.write(f"✔️ {event['message']}")
 
         # Step-3: Load results from backend outputs
         message_3 = st.empty()
@@ -151,23 +167,15 @@ if ss.run_triggered:
             status.write(f"⚠️ Error decoding {os.path.basename(forecast_json_path)}. Forecast data may be missing or incomplete.")
             forecast_data = {} # Default to empty on error
 
-        # Load raw price data for the report payload
+        # Load raw price data for the report payload (only the selected symbols)
         try:
-            df_raw = pd.read_csv(raw_prices_csv_path)
-            if "Date" not in df_raw.columns:
-                status.write(f"⚠️ 'Date' column not found in {os.path.basename(raw_prices_csv_path)}. Raw price data for report will be empty or incomplete.")
-                ss.results["raw_price_data"] = [] 
-            else:
-                df_raw["Date"] = pd.to_datetime(df_raw["Date"], errors='coerce')
-                df_raw = df_raw.dropna(subset=['Date']) 
-                if not df_raw.empty:
-                    if pd.api.types.is_datetime64_any_dtype(df_raw['Date']):
-                        df_raw["Date"] = df_raw["Date"].dt.strftime('%Y-%m-%d')
-                    else:
-                        df_raw["Date"] = df_raw["Date"].astype(str)
-                ss.results["raw_price_data"] = df_raw.to_dict(orient="records")
+            df_raw = price_history(syms)
+            if not df_raw.empty:
+                df_raw["Date"] = df_raw["Date"].dt.strftime('%Y-%m-%d')
+                df_raw["Ticker"] = df_raw["Ticker"].astype(str)
+            ss.results["raw_price_data"] = df_raw.to_dict(orient="records")
         except FileNotFoundError:
-            status.write(f"⚠️ Raw data CSV ({os.path.basename(raw_prices_csv_path)}) not found. Raw price data will not be included in the report.")
+            status.write("⚠️ Raw price store not found. Raw price data will not be included in the report.")
             ss.results["raw_price_data"] = [] 
         except Exception as e:
             status.write(f"🚨 Critical error loading raw price data for report: {e}") 
@@ -236,16 +244,11 @@ if ss.run_triggered:
 # ╰──────────────────────────────────────────────╯
 st.subheader("1. Raw price data from CSV")
 
-csv_display_path = "../backend/data/raw/World-Stock-Prices-Dataset.csv" # Use a different var name if needed
 try:
-    df_raw_display = pd.read_csv(csv_display_path)
-    df_raw_display["Date"] = pd.to_datetime(df_raw_display["Date"], errors='coerce')
-    df_raw_display.dropna(subset=['Date'], inplace=True)
-
     user_symbols_for_display = [s.strip().upper() for s in symbols_str.split(",") if s.strip()]
 
     if user_symbols_for_display:
-        df_filtered_display = df_raw_display[df_raw_display["Ticker"].isin(user_symbols_for_display)].copy()
+        df_filtered_display = price_history(user_symbols_for_display)
         if not df_filtered_display.empty:
             fig = px.line(df_filtered_display, x="Date", y="Close", color="Ticker",
                           title="Raw Price Data for Selected Symbols")
@@ -255,7 +258,7 @@ try:
     else:
         st.info("Please enter stock symbols to display raw data.")
 except FileNotFoundError:
-    st.error(f"Raw data CSV for display not found at {csv_display_path}")
+    st.error("Raw price store not found - run the pipeline first")
 except Exception as e:
     st.error(f"Error loading or plotting raw data for display: {e}")
 
@@ -316,7 +319,7 @@ else:
 # │ 6.1 Forecast vs. Actual Prices               │
 # ╰──────────────────────────────────────────────╯
 st.subheader("3.1 Forecast vs. Actual Prices")
-forecast_plot_json_path = "../backend/outputs/forecast_results.json"
+forecast_plot_json_path = get_artifact_store().path("forecast_results.json", ss.run_id)
 plot_forecast_data = []
 user_symbols_for_forecast_plot = [s.strip().upper() for s in symbols_str.split(",") if s.strip()]
 
@@ -371,7 +374,7 @@ if st.button("Generate PDF Report"):
     
     # Prepare forecast data for PDF payload
     forecast_pdf_data = {}
-    forecast_data_path_for_pdf = "../backend/outputs/forecast_results.json" # Already defined above, ensure consistency
+    forecast_data_path_for_pdf = get_artifact_store().path("forecast_results.json", ss.run_id) # Already defined above, ensure consistency
     user_symbols_list_for_pdf = [s.strip().upper() for s in symbols_str.split(",") if s.strip()]
 
     if os.path.exists(forecast_data_path_for_pdf):
@@ -386,7 +389,7 @@ if st.button("Generate PDF Report"):
             # forecast_pdf_data will remain empty or partially filled
 
     try:
-        backend_url = "http://localhost:8000/reports/generate" # Ensure backend is running at this address
+        backend_url = f"{API_URL}/reports/generate" # Ensure backend is running at this address
         user_symbols_list = [s.strip().upper() for s in symbols_str.split(",") if s.strip()] # Redundant if using user_symbols_list_for_pdf
         payload = {
             "raw_price_data_payload": ss.results.get("raw_price_data", []),
@@ -436,7 +439,7 @@ if ss.pdf_content and ss.pdf_filename:
 # │ 8. Raw JSON download                         │
 # ╰──────────────────────────────────────────────╯
 st.header("5. Download raw JSON output from Crew")
-crew_output_path = "../backend/outputs/crew_result.json"
+crew_output_path = get_artifact_store().path("crew_result.json", ss.run_id)
 if os.path.exists(crew_output_path):
     try:
         with open(crew_output_path, "rb") as f: # Read as binary for download button
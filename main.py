@@ -4,7 +4,8 @@ from dotenv import load_dotenv
 import os
 
 # Import routes
-from backend.routes import auth, reports
+from backend.routes import auth, reports, pipeline
+from backend.utils.pipeline_jobs import WorkerPool, PIPELINE_WORKERS
 
 # Load environment variables
 load_dotenv()
@@ -28,6 +29,20 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 app.include_router(reports.router, prefix="/reports", tags=["Reports"])
+app.include_router(pipeline.router, prefix="/pipeline", tags=["Pipeline"])
+
+# Background workers for pipeline jobs (PIPELINE_WORKERS=0 to run them elsewhere)
+worker_pool = WorkerPool(pipeline.queue, workers=PIPELINE_WORKERS)
+
+
+@app.on_event("startup")
+def start_workers():
+    worker_pool.start()
+
+
+@app.on_event("shutdown")
+def stop_workers():
+    worker_pool.stop()
 
 # Health check endpoint
 